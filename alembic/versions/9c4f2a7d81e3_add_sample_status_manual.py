@@ -0,0 +1,27 @@
+"""Add sample manual status flag
+
+Revision ID: 9c4f2a7d81e3
+Revises: d6a3b5e81f40
+Create Date: 2026-10-18 10:14:27.530961
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "9c4f2a7d81e3"
+down_revision = "d6a3b5e81f40"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(
+        "sample",
+        sa.Column("status_manual", sa.Boolean(), nullable=True, server_default=sa.false()),
+    )
+
+
+def downgrade():
+    op.drop_column("sample", "status_manual")
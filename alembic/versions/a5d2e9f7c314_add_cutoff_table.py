@@ -0,0 +1,45 @@
+"""Add versioned cutoffs
+
+Revision ID: a5d2e9f7c314
+Revises: f3a8c61d0b92
+Create Date: 2026-10-17 15:48:36.204917
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "a5d2e9f7c314"
+down_revision = "f3a8c61d0b92"
+branch_labels = None
+depends_on = None
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    cutoff_table = op.create_table(
+        "cutoff",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("max_nocalls", sa.Integer(), nullable=True),
+        sa.Column("max_mismatch", sa.Integer(), nullable=True),
+        sa.Column("min_matches", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.add_column("sample", sa.Column("cutoff_version", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_sample_cutoff_version", "sample", "cutoff", ["cutoff_version"], ["id"]
+    )
+
+    # The existing statuses were computed with the hard-coded cutoffs, store them as version 1
+    cutoffs = dict(id=1, max_nocalls=15, max_mismatch=3, min_matches=35, created_at=datetime.now())
+    op.bulk_insert(cutoff_table, [cutoffs])
+    op.execute("UPDATE sample SET cutoff_version = 1 WHERE status IS NOT NULL")
+
+
+def downgrade():
+    op.drop_constraint("fk_sample_cutoff_version", "sample", type_="foreignkey")
+    op.drop_column("sample", "cutoff_version")
+    op.drop_table("cutoff")
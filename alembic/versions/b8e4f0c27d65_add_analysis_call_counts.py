@@ -0,0 +1,77 @@
+"""Add call counts to analysis
+
+Revision ID: b8e4f0c27d65
+Revises: a5d2e9f7c314
+Create Date: 2026-10-17 17:05:12.391842
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "b8e4f0c27d65"
+down_revision = "a5d2e9f7c314"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+# Copy of the allele alphabet at this revision. A call is unknown when an allele is a no-call
+# "0" or outside the alphabet, as counted for new uploads.
+ALLELE_ALPHABET = "0ACGTN.-123456"
+KNOWN_ALLELES = set(ALLELE_ALPHABET) - {"0"}
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.add_column("analysis", sa.Column("known_calls", sa.Integer(), nullable=True))
+    op.add_column("analysis", sa.Column("unknown_calls", sa.Integer(), nullable=True))
+    op.add_column("analysis", sa.Column("call_rate", sa.Float(), nullable=True))
+    op.create_index(op.f("ix_analysis_call_rate"), "analysis", ["call_rate"], unique=False)
+
+    # Count the calls of existing analyses from their genotype rows
+    connection = op.get_bind()
+    select_genotypes = sa.text(
+        "SELECT analysis_id, allele_1, allele_2 FROM genotype WHERE analysis_id IN :analysis_ids"
+    ).bindparams(sa.bindparam("analysis_ids", expanding=True))
+    update_analysis = sa.text(
+        "UPDATE analysis SET known_calls = :known_calls, unknown_calls = :unknown_calls, "
+        "call_rate = :call_rate WHERE id = :analysis_id"
+    )
+    last_id = 0
+    while True:
+        analysis_ids = (
+            connection.execute(
+                sa.text("SELECT id FROM analysis WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+            .scalars()
+            .all()
+        )
+        if not analysis_ids:
+            return
+        counts = {analysis_id: [0, 0] for analysis_id in analysis_ids}
+        for analysis_id, allele_1, allele_2 in connection.execute(
+            select_genotypes, {"analysis_ids": analysis_ids}
+        ):
+            known = allele_1 in KNOWN_ALLELES and allele_2 in KNOWN_ALLELES
+            counts[analysis_id][0 if known else 1] += 1
+        connection.execute(
+            update_analysis,
+            [
+                {
+                    "analysis_id": analysis_id,
+                    "known_calls": known,
+                    "unknown_calls": unknown,
+                    "call_rate": known / (known + unknown) if known + unknown else None,
+                }
+                for analysis_id, (known, unknown) in counts.items()
+            ],
+        )
+        last_id = analysis_ids[-1]
+
+
+def downgrade():
+    op.drop_index(op.f("ix_analysis_call_rate"), table_name="analysis")
+    op.drop_column("analysis", "call_rate")
+    op.drop_column("analysis", "unknown_calls")
+    op.drop_column("analysis", "known_calls")
@@ -0,0 +1,75 @@
+"""Add packed genotypes to analysis
+
+Revision ID: c4e1a9d2f6b7
+Revises: 7f77cbc00305
+Create Date: 2026-10-17 09:12:31.402117
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "c4e1a9d2f6b7"
+down_revision = "7f77cbc00305"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+# Copy of the allele encoding at this revision, the position of an allele is its 4-bit code.
+# Alleles outside the alphabet are stored as the no-call "0", SNPs without a genotype as 0xFF.
+ALLELE_ALPHABET = "0ACGTN.-123456"
+ALLELE_CODES = {allele: code for code, allele in enumerate(ALLELE_ALPHABET)}
+NO_CALL = 0
+MISSING_CALL = 255
+BATCH_SIZE = 1000
+
+
+def pack_alleles(allele_1, allele_2):
+    return ALLELE_CODES.get(allele_1, NO_CALL) << 4 | ALLELE_CODES.get(allele_2, NO_CALL)
+
+
+def upgrade():
+    op.add_column("analysis", sa.Column("genotype_blob", sa.LargeBinary(), nullable=True))
+
+    # Pack the genotypes of existing analyses in the layout of the current SNP panel, which
+    # orders the SNPs by rsnumber
+    connection = op.get_bind()
+    rsnumbers = sorted(set(connection.execute(sa.text("SELECT id FROM snp")).scalars()))
+    if not rsnumbers:
+        return
+    columns = {rsnumber: column for column, rsnumber in enumerate(rsnumbers)}
+    select_genotypes = sa.text(
+        "SELECT analysis_id, rsnumber, allele_1, allele_2 FROM genotype "
+        "WHERE analysis_id IN :analysis_ids ORDER BY id"
+    ).bindparams(sa.bindparam("analysis_ids", expanding=True))
+    last_id = 0
+    while True:
+        analysis_ids = (
+            connection.execute(
+                sa.text("SELECT id FROM analysis WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+            .scalars()
+            .all()
+        )
+        if not analysis_ids:
+            return
+        blobs = {
+            analysis_id: bytearray([MISSING_CALL] * len(rsnumbers)) for analysis_id in analysis_ids
+        }
+        rows = connection.execute(select_genotypes, {"analysis_ids": analysis_ids})
+        for analysis_id, rsnumber, allele_1, allele_2 in rows:
+            if rsnumber in columns:
+                blobs[analysis_id][columns[rsnumber]] = pack_alleles(allele_1, allele_2)
+        connection.execute(
+            sa.text("UPDATE analysis SET genotype_blob = :genotype_blob WHERE id = :analysis_id"),
+            [
+                {"genotype_blob": bytes(blob), "analysis_id": analysis_id}
+                for analysis_id, blob in blobs.items()
+            ],
+        )
+        last_id = analysis_ids[-1]
+
+
+def downgrade():
+    op.drop_column("analysis", "genotype_blob")
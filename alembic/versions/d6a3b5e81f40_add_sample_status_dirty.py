@@ -0,0 +1,29 @@
+"""Add sample status dirty flag
+
+Revision ID: d6a3b5e81f40
+Revises: b8e4f0c27d65
+Create Date: 2026-10-17 18:32:54.118306
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "d6a3b5e81f40"
+down_revision = "b8e4f0c27d65"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(
+        "sample",
+        sa.Column("status_dirty", sa.Boolean(), nullable=True, server_default=sa.false()),
+    )
+    op.create_index(op.f("ix_sample_status_dirty"), "sample", ["status_dirty"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_sample_status_dirty"), table_name="sample")
+    op.drop_column("sample", "status_dirty")
@@ -0,0 +1,37 @@
+"""Add match table
+
+Revision ID: e2b7d4a19c83
+Revises: c4e1a9d2f6b7
+Create Date: 2026-10-17 11:02:47.530914
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "e2b7d4a19c83"
+down_revision = "c4e1a9d2f6b7"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        "match",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("analysis_id", sa.Integer(), nullable=True),
+        sa.Column("matched_analysis_id", sa.Integer(), nullable=True),
+        sa.Column("match", sa.Integer(), nullable=True),
+        sa.Column("mismatch", sa.Integer(), nullable=True),
+        sa.Column("unknown", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["analysis_id"], ["analysis.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["matched_analysis_id"], ["analysis.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_match_analysis_id"), "match", ["analysis_id"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_match_analysis_id"), table_name="match")
+    op.drop_table("match")
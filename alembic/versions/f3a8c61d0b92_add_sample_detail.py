@@ -0,0 +1,147 @@
+"""Add sample QC detail
+
+Revision ID: f3a8c61d0b92
+Revises: e2b7d4a19c83
+Create Date: 2026-10-17 14:21:08.713552
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "f3a8c61d0b92"
+down_revision = "e2b7d4a19c83"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+DETAIL_COLUMNS: list[str] = [
+    "matches",
+    "mismatches",
+    "unknown",
+    "snps_status",
+    "nocalls_status",
+    "sex_status",
+    "failed_snps",
+]
+
+# Copy of the sample check at this revision. Genotypes are compared on the SNP panel, ordered
+# by rsnumber, or on the SNPs of the genotype analysis without a panel. A pair with a no-call or
+# an allele outside the alphabet is unknown, otherwise it matches if the sorted alleles are equal.
+ALLELE_ALPHABET = "0ACGTN.-123456"
+NO_CALL = "0"
+MAX_NOCALLS = 15
+MAX_MISMATCH = 3
+MIN_MATCHES = 35
+BATCH_SIZE = 1000
+
+
+def get_call(allele_1, allele_2):
+    """Return the sorted alleles of a genotype, None for an unknown call."""
+    alleles = (allele_1, allele_2)
+    if NO_CALL in alleles or not all(allele and allele in ALLELE_ALPHABET for allele in alleles):
+        return None
+    return tuple(sorted(alleles))
+
+
+def check_snps(rsnumbers, genotype_calls, sequence_calls):
+    matches, mismatches, unknown, failed_snps = 0, 0, 0, []
+    for rsnumber in rsnumbers:
+        if rsnumber not in genotype_calls or rsnumber not in sequence_calls:
+            continue
+        genotype_call, sequence_call = genotype_calls[rsnumber], sequence_calls[rsnumber]
+        if genotype_call is None or sequence_call is None:
+            unknown += 1
+        elif genotype_call == sequence_call:
+            matches += 1
+        else:
+            mismatches += 1
+            failed_snps.append(rsnumber)
+    return {
+        "matches": matches,
+        "mismatches": mismatches,
+        "unknown": unknown,
+        "snps_status": (
+            "pass" if matches >= MIN_MATCHES and mismatches <= MAX_MISMATCH else "fail"
+        ),
+        "nocalls_status": "pass" if unknown <= MAX_NOCALLS else "fail",
+        "failed_snps": failed_snps,
+    }
+
+
+def check_sex(sample_sex, genotype_sex, sequence_sex):
+    if not sample_sex or genotype_sex == "unknown":
+        return "fail"
+    if {"male", "female"}.issubset({genotype_sex, sequence_sex, sample_sex}):
+        return "fail"
+    return "pass"
+
+
+def upgrade():
+    op.add_column("sample", sa.Column("matches", sa.Integer(), nullable=True))
+    op.add_column("sample", sa.Column("mismatches", sa.Integer(), nullable=True))
+    op.add_column("sample", sa.Column("unknown", sa.Integer(), nullable=True))
+    op.add_column("sample", sa.Column("snps_status", sa.String(length=4), nullable=True))
+    op.add_column("sample", sa.Column("nocalls_status", sa.String(length=4), nullable=True))
+    op.add_column("sample", sa.Column("sex_status", sa.String(length=4), nullable=True))
+    op.add_column("sample", sa.Column("failed_snps", sa.JSON(), nullable=True))
+
+    # Compute the QC detail of existing samples with both a genotype and a sequence analysis
+    connection = op.get_bind()
+    panel = sorted(set(connection.execute(sa.text("SELECT id FROM snp")).scalars()))
+    select_analyses = sa.text(
+        "SELECT id, sample_id, type, sex FROM analysis WHERE sample_id IN :sample_ids"
+    ).bindparams(sa.bindparam("sample_ids", expanding=True))
+    select_genotypes = sa.text(
+        "SELECT analysis_id, rsnumber, allele_1, allele_2 FROM genotype "
+        "WHERE analysis_id IN :analysis_ids ORDER BY id"
+    ).bindparams(sa.bindparam("analysis_ids", expanding=True))
+    update_sample = sa.text(
+        "UPDATE sample SET matches = :matches, mismatches = :mismatches, unknown = :unknown, "
+        "snps_status = :snps_status, nocalls_status = :nocalls_status, "
+        "sex_status = :sex_status, failed_snps = :failed_snps WHERE id = :sample_id"
+    ).bindparams(sa.bindparam("failed_snps", type_=sa.JSON))
+    last_id = ""
+    while True:
+        samples = connection.execute(
+            sa.text("SELECT id, sex FROM sample WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not samples:
+            return
+        last_id = samples[-1][0]
+        analyses = {}
+        for analysis_id, sample_id, analysis_type, sex in connection.execute(
+            select_analyses, {"sample_ids": [sample_id for sample_id, _ in samples]}
+        ):
+            analyses[(sample_id, analysis_type)] = (analysis_id, sex)
+        calls = {analysis_id: {} for analysis_id, _ in analyses.values()}
+        if not calls:
+            continue
+        for analysis_id, rsnumber, allele_1, allele_2 in connection.execute(
+            select_genotypes, {"analysis_ids": list(calls)}
+        ):
+            calls[analysis_id][rsnumber] = get_call(allele_1, allele_2)
+        details = []
+        for sample_id, sample_sex in samples:
+            if (sample_id, "genotype") not in analyses or (sample_id, "sequence") not in analyses:
+                continue
+            genotype_id, genotype_sex = analyses[(sample_id, "genotype")]
+            sequence_id, sequence_sex = analyses[(sample_id, "sequence")]
+            detail = check_snps(
+                rsnumbers=panel or sorted(calls[genotype_id]),
+                genotype_calls=calls[genotype_id],
+                sequence_calls=calls[sequence_id],
+            )
+            detail["sex_status"] = check_sex(
+                sample_sex=sample_sex, genotype_sex=genotype_sex, sequence_sex=sequence_sex
+            )
+            detail["sample_id"] = sample_id
+            details.append(detail)
+        if details:
+            connection.execute(update_sample, details)
+
+
+def downgrade():
+    for column in reversed(DETAIL_COLUMNS):
+        op.drop_column("sample", column)
@@ -11,8 +11,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import NoResultFound, OperationalError
 
-from genotype_api.api.endpoints import analyses, plates, samples, snps, users
-from genotype_api.config import security_settings
+from genotype_api.api.endpoints import analyses, cutoffs, plates, samples, snps, users
+from genotype_api.config import security_settings, settings
+from genotype_api.database.database import get_session
+from genotype_api.database.store import Store
+from genotype_api.exceptions import ExecutorTimeoutError
+from genotype_api.services.executor_service.executor import executor_service
+from genotype_api.services.match_genotype_service.fingerprint_index import fingerprint_index
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.status_service.reevaluation import status_reevaluation
+from genotype_api.services.status_service.refresh_worker import status_refresh_worker
 
 LOG = logging.getLogger(__name__)
 
@@ -21,9 +29,20 @@ LOG = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup actions, like connecting to the database
     LOG.debug("Starting up...")
+    if settings.use_fingerprint_index:
+        async with get_session() as session:
+            store = Store(session)
+            analyses = await store.get_analyses_with_genotypes()
+            fingerprint_index.load(
+                analyses=analyses, panel=SNPPanel.from_snps(await store.get_snps())
+            )
+    status_refresh_worker.start()
     yield  # This is important, it must yield control
     # Shutdown actions, like closing the database connection
     LOG.debug("Shutting down...")
+    await status_reevaluation.stop()
+    await status_refresh_worker.stop()
+    executor_service.shutdown()
 
 
 app = FastAPI(lifespan=lifespan, root_path=security_settings.api_root_path)
@@ -45,6 +64,14 @@ async def db_connection_exception_handler(request: Request, exc: OperationalErro
     )
 
 
+@app.exception_handler(ExecutorTimeoutError)
+async def executor_timeout_exception_handler(request: Request, exc: ExecutorTimeoutError):
+    return JSONResponse(
+        content={"detail": "The request took too long to process. Please try again later."},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
 @app.exception_handler(NoResultFound)
 async def not_found_exception_handler(request: Request, exc: NoResultFound):
     return JSONResponse("Document not found", status_code=status.HTTP_404_NOT_FOUND)
@@ -89,3 +116,10 @@ app.include_router(
     tags=["analyses"],
     responses={status.HTTP_404_NOT_FOUND: {"description": "Not found"}},
 )
+
+app.include_router(
+    cutoffs.router,
+    prefix="/cutoffs",
+    tags=["cutoffs"],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Not found"}},
+)
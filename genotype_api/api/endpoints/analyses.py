@@ -77,7 +77,8 @@ async def upload_sequence_analysis(
     analysis_service: AnalysisService = Depends(get_analysis_service),
     current_user: CurrentUser = Depends(get_active_user),
 ):
-    """Reading VCF file, creating and uploading sequence analyses and sample objects to the database."""
+    """Reading a VCF file, plain or gzip/BGZF compressed, creating and uploading sequence analyses
+    and sample objects to the database."""
 
     analyses: list[AnalysisResponse] = await analysis_service.get_upload_sequence_analyses(file)
     return analyses
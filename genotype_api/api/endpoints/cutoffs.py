@@ -0,0 +1,69 @@
+"""Routes for the QC cutoffs"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from genotype_api.database.store import Store, get_store
+from genotype_api.dto.cutoff import CutoffCreate, CutoffResponse
+from genotype_api.dto.user import CurrentUser
+from genotype_api.exceptions import CutoffNotFoundError
+from genotype_api.models import StatusReevaluationProgress
+from genotype_api.security import get_active_user
+from genotype_api.services.endpoint_services.cutoff_service import CutoffService
+
+router = APIRouter()
+
+
+def get_cutoff_service(store: Store = Depends(get_store)) -> CutoffService:
+    return CutoffService(store)
+
+
+@router.get("/", response_model=list[CutoffResponse])
+async def read_cutoffs(
+    cutoff_service: CutoffService = Depends(get_cutoff_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    """Return all cutoff versions, oldest first."""
+    return await cutoff_service.get_cutoffs()
+
+
+@router.get("/current", response_model=CutoffResponse)
+async def read_current_cutoff(
+    cutoff_service: CutoffService = Depends(get_cutoff_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    try:
+        return await cutoff_service.get_current_cutoff()
+    except CutoffNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No cutoffs stored")
+
+
+@router.post("/", response_model=CutoffResponse)
+async def create_cutoff(
+    cutoff_create: CutoffCreate,
+    cutoff_service: CutoffService = Depends(get_cutoff_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    """Add a new cutoff version.
+
+    The statuses of samples evaluated with older cutoffs are re-evaluated in the background.
+    """
+    return await cutoff_service.create_cutoff(cutoff_create)
+
+
+@router.get("/reevaluation", response_model=StatusReevaluationProgress)
+async def read_reevaluation_progress(
+    cutoff_service: CutoffService = Depends(get_cutoff_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    """Return the progress of the background re-evaluation of this worker."""
+    return cutoff_service.get_reevaluation_progress()
+
+
+@router.post("/reevaluation", response_model=StatusReevaluationProgress)
+async def start_reevaluation(
+    cutoff_service: CutoffService = Depends(get_cutoff_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    """Re-evaluate samples on older cutoff versions in the background, if not already running."""
+    return cutoff_service.start_reevaluation()
@@ -1,5 +1,6 @@
 """Routes for plates"""
 
+from datetime import date
 from http import HTTPStatus
 from typing import Literal
 
@@ -8,9 +9,10 @@ from fastapi.responses import JSONResponse
 
 from genotype_api.database.filter_models.plate_models import PlateOrderParams
 from genotype_api.database.store import Store, get_store
-from genotype_api.dto.plate import PlateResponse
+from genotype_api.dto.plate import PlateResponse, PlateStatusCounts
 from genotype_api.dto.user import CurrentUser
 from genotype_api.exceptions import PlateExistsError, PlateNotFoundError
+from genotype_api.models import PlateSwapReport
 from genotype_api.security import get_active_user
 from genotype_api.services.endpoint_services.plate_service import PlateService
 
@@ -100,6 +102,43 @@ async def read_plate(
         )
 
 
+@router.get(
+    "/{plate_id}/status_counts", response_model=PlateStatusCounts, response_model_by_alias=False
+)
+async def read_plate_status_counts(
+    plate_id: int,
+    plate_service: PlateService = Depends(get_plate_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    """Count the sample statuses and comments of the analyses on a plate."""
+    try:
+        return await plate_service.get_plate_status_counts(plate_id=plate_id)
+    except PlateNotFoundError:
+        raise HTTPException(
+            detail=f"Could not find plate with id: {plate_id}", status_code=HTTPStatus.BAD_REQUEST
+        )
+
+
+@router.get("/{plate_id}/swap_report", response_model=PlateSwapReport)
+async def read_plate_swap_report(
+    plate_id: int,
+    date_min: date | None = date.min,
+    date_max: date | None = date.max,
+    plate_service: PlateService = Depends(get_plate_service),
+    current_user: CurrentUser = Depends(get_active_user),
+):
+    """Compare the genotype analyses on a plate against all sequence analyses in a date range
+    and report the samples whose best match is another sample."""
+    try:
+        return await plate_service.get_swap_report(
+            plate_id=plate_id, date_min=date_min, date_max=date_max
+        )
+    except PlateNotFoundError:
+        raise HTTPException(
+            detail=f"Could not find plate with id: {plate_id}", status_code=HTTPStatus.BAD_REQUEST
+        )
+
+
 @router.get(
     "/",
     response_model=list[PlateResponse],
@@ -107,19 +146,27 @@ async def read_plate(
     response_model_by_alias=False,
 )
 async def read_plates(
-    order_by: Literal["created_at", "plate_id", "signed_at", "id"] | None = "id",
+    order_by: Literal["created_at", "plate_id", "signed_at", "id", "call_rate"] | None = "id",
     sort_order: Literal["ascend", "descend"] | None = "descend",
     skip: int | None = 0,
     limit: int | None = 10,
+    max_call_rate: float | None = Query(default=None, ge=0, le=1),
+    status_counts: bool | None = True,
     plate_service: PlateService = Depends(get_plate_service),
     current_user: CurrentUser = Depends(get_active_user),
 ):
-    """Display all plates"""
+    """Display all plates, with the sample status counts of each plate unless disabled."""
     order_params = PlateOrderParams(
-        order_by=order_by, skip=skip, limit=limit, sort_order=sort_order
+        order_by=order_by,
+        skip=skip,
+        limit=limit,
+        sort_order=sort_order,
+        max_call_rate=max_call_rate,
     )
     try:
-        return await plate_service.get_plates(order_params=order_params)
+        return await plate_service.get_plates(
+            order_params=order_params, with_status_counts=status_counts
+        )
     except PlateNotFoundError:
         raise HTTPException(
             detail="Could not fetch plates from backend.", status_code=HTTPStatus.BAD_REQUEST
@@ -1,15 +1,16 @@
 from datetime import date
 from http import HTTPStatus
-from typing import Literal
+from typing import AsyncIterator, Literal
 
 from fastapi import APIRouter, Depends, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette import status
 
 from genotype_api.constants import Sexes, Types
+from genotype_api.database.database import get_session
 from genotype_api.database.filter_models.sample_models import SampleFilterParams
 from genotype_api.database.store import Store, get_store
-from genotype_api.dto.sample import SampleCreate, SampleResponse
+from genotype_api.dto.sample import SampleCreate, SampleMatchRequest, SampleResponse
 from genotype_api.dto.user import CurrentUser
 from genotype_api.exceptions import (
     GenotypeDBError,
@@ -17,7 +18,14 @@ from genotype_api.exceptions import (
     SampleExistsError,
     SampleNotFoundError,
 )
-from genotype_api.models import MatchResult, SampleDetail
+from genotype_api.models import (
+    ApproximateMatchStats,
+    MatchCacheStats,
+    MatchResult,
+    RelatednessResult,
+    SampleDetail,
+    SampleMatches,
+)
 from genotype_api.security import get_active_user
 from genotype_api.services.endpoint_services.sample_service import SampleService
 
@@ -90,6 +98,8 @@ async def read_samples(
     incomplete: bool | None = False,
     commented: bool | None = False,
     status_missing: bool | None = False,
+    max_call_rate: float | None = Query(default=None, ge=0, le=1),
+    sort_by_call_rate: bool | None = False,
     sample_service: SampleService = Depends(get_sample_service),
     current_user: CurrentUser = Depends(get_active_user),
 ):
@@ -100,6 +110,8 @@ async def read_samples(
         is_incomplete=incomplete,
         is_commented=commented,
         is_missing=status_missing,
+        max_call_rate=max_call_rate,
+        sort_by_call_rate=sort_by_call_rate,
         skip=skip,
         limit=limit,
     )
@@ -168,6 +180,24 @@ async def set_sample_status(
         )
 
 
+@router.get("/match/cache", response_model=MatchCacheStats)
+async def match_cache_stats(
+    sample_service: SampleService = Depends(get_sample_service),
+    current_user: CurrentUser = Depends(get_active_user),
+) -> MatchCacheStats:
+    """Return the hit and miss counters of the match result cache of this worker."""
+    return sample_service.get_match_cache_stats()
+
+
+@router.get("/match/approximate", response_model=ApproximateMatchStats)
+async def approximate_match_stats(
+    sample_service: SampleService = Depends(get_sample_service),
+    current_user: CurrentUser = Depends(get_active_user),
+) -> ApproximateMatchStats:
+    """Return the recall and latency of approximate matches of this worker against exact ones."""
+    return sample_service.get_approximate_match_stats()
+
+
 @router.get("/{sample_id}/match", response_model=list[MatchResult])
 async def match(
     sample_id: str,
@@ -175,19 +205,103 @@ async def match(
     comparison_set: Types,
     date_min: date | None = date.min,
     date_max: date | None = date.max,
+    top_k: int | None = Query(default=None, gt=0),
+    approximate: bool = False,
     sample_service: SampleService = Depends(get_sample_service),
     current_user: CurrentUser = Depends(get_active_user),
 ) -> list[MatchResult]:
-    """Match sample genotype against all other genotypes."""
+    """Match sample genotype against all other genotypes.
+    With top_k, only the k best matches are returned, ranked by matches and then mismatches.
+    With approximate, only a shortlist of candidates ranked on the most informative SNPs is
+    compared on all SNPs, when the fingerprint index is loaded."""
     return await sample_service.get_match_results(
         sample_id=sample_id,
         analysis_type=analysis_type,
         comparison_set=comparison_set,
         date_max=date_max,
         date_min=date_min,
+        top_k=top_k,
+        approximate=approximate,
+    )
+
+
+@router.get("/{sample_id}/match/stream", response_class=StreamingResponse)
+async def match_stream(
+    sample_id: str,
+    analysis_type: Types,
+    comparison_set: Types,
+    date_min: date | None = date.min,
+    date_max: date | None = date.max,
+    current_user: CurrentUser = Depends(get_active_user),
+) -> StreamingResponse:
+    """Match sample genotype against all other genotypes.
+    Each match result is streamed as one line of JSON as soon as its chunk of candidates is
+    compared."""
+    return StreamingResponse(
+        _stream_match_results(
+            sample_id=sample_id,
+            analysis_type=analysis_type,
+            comparison_set=comparison_set,
+            date_max=date_max,
+            date_min=date_min,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _stream_match_results(
+    sample_id: str, analysis_type: Types, comparison_set: Types, date_min: date, date_max: date
+) -> AsyncIterator[str]:
+    """Yield match results as JSON lines, with a session of their own.
+
+    The session of the request is closed before the response is streamed, so the stream opens
+    its own session and closes it when streaming ends.
+    """
+    async with get_session() as session:
+        sample_service = SampleService(Store(session))
+        async for match_result in sample_service.iter_match_results(
+            sample_id=sample_id,
+            analysis_type=analysis_type,
+            comparison_set=comparison_set,
+            date_max=date_max,
+            date_min=date_min,
+        ):
+            yield f"{match_result.model_dump_json()}\n"
+
+
+@router.get("/{sample_id}/relatedness", response_model=list[RelatednessResult])
+async def relatedness(
+    sample_id: str,
+    analysis_type: Types,
+    comparison_set: Types,
+    date_min: date | None = date.min,
+    date_max: date | None = date.max,
+    top_k: int | None = Query(default=None, gt=0),
+    sample_service: SampleService = Depends(get_sample_service),
+    current_user: CurrentUser = Depends(get_active_user),
+) -> list[RelatednessResult]:
+    """Score the relatedness of a sample with all other samples by identity by state.
+    The fractions of SNPs sharing 0, 1 or 2 alleles are returned, most shared alleles first."""
+    return await sample_service.get_relatedness_results(
+        sample_id=sample_id,
+        analysis_type=analysis_type,
+        comparison_set=comparison_set,
+        date_max=date_max,
+        date_min=date_min,
+        top_k=top_k,
     )
 
 
+@router.post("/match", response_model=list[SampleMatches])
+async def match_samples(
+    match_request: SampleMatchRequest,
+    sample_service: SampleService = Depends(get_sample_service),
+    current_user: CurrentUser = Depends(get_active_user),
+) -> list[SampleMatches]:
+    """Match the genotypes of several samples against the same comparison set."""
+    return await sample_service.get_batch_match_results(match_request=match_request)
+
+
 @router.get(
     "/{sample_id}/status_detail",
     response_model=SampleDetail,
@@ -0,0 +1,97 @@
+"""Command line interface for the genotype api batch jobs."""
+
+import asyncio
+import logging
+from datetime import date, datetime
+
+import click
+import coloredlogs
+
+from genotype_api.database.database import get_session
+from genotype_api.database.models import Plate
+from genotype_api.database.store import Store
+from genotype_api.models import PlateKinship, PlateSwapReport, StatusReevaluationProgress
+from genotype_api.services.endpoint_services.plate_service import PlateService
+from genotype_api.services.endpoint_services.sample_service import SampleService
+from genotype_api.services.status_service.reevaluation import status_reevaluation
+
+LOG = logging.getLogger(__name__)
+
+DATE_FORMAT: str = "%Y-%m-%d"
+
+
+@click.group()
+@click.option("--log-level", default="INFO", help="Log level of the batch job.")
+def cli(log_level: str):
+    """Batch jobs of the genotype api."""
+    coloredlogs.install(level=log_level)
+
+
+async def _screen_sample_swaps(plate_ids: list[int], date_min: date, date_max: date) -> None:
+    async with get_session() as session:
+        plate_service = PlateService(store=Store(session))
+        if not plate_ids:
+            plates: list[Plate] = await plate_service.store.get_plates()
+            plate_ids = [plate.id for plate in plates]
+        for plate_id in plate_ids:
+            report: PlateSwapReport = await plate_service.get_swap_report(
+                plate_id=plate_id, date_min=date_min, date_max=date_max
+            )
+            LOG.info(f"Plate {plate_id}: {len(report.swaps)} likely swaps")
+            click.echo(report.model_dump_json())
+
+
+@cli.command("swap-screen")
+@click.option("--plate-id", "plate_ids", type=int, multiple=True, help="Plates to screen.")
+@click.option("--date-min", type=click.DateTime([DATE_FORMAT]), default=date.min.isoformat())
+@click.option("--date-max", type=click.DateTime([DATE_FORMAT]), default=date.max.isoformat())
+def swap_screen(plate_ids: tuple[int], date_min: datetime, date_max: datetime):
+    """Screen plates for sample swaps against sequence analyses, all plates by default.
+
+    Prints one JSON swap report per plate.
+    """
+    asyncio.run(
+        _screen_sample_swaps(
+            plate_ids=list(plate_ids), date_min=date_min.date(), date_max=date_max.date()
+        )
+    )
+
+
+async def _report_kinship(plate_ids: list[int]) -> None:
+    async with get_session() as session:
+        plate_service = PlateService(store=Store(session))
+        if not plate_ids:
+            plates: list[Plate] = await plate_service.store.get_plates()
+            plate_ids = [plate.id for plate in plates]
+        for plate_id in plate_ids:
+            kinship: PlateKinship = await plate_service.get_kinship(plate_id=plate_id)
+            click.echo(kinship.model_dump_json())
+
+
+@cli.command("kinship")
+@click.option("--plate-id", "plate_ids", type=int, multiple=True, help="Plates to report.")
+def kinship(plate_ids: tuple[int]):
+    """Compute the kinship matrix of the genotype analyses on plates, all plates by default.
+
+    Prints one JSON kinship report per plate, with the fraction of shared alleles and of SNPs
+    sharing no allele for each pair of samples.
+    """
+    asyncio.run(_report_kinship(plate_ids=list(plate_ids)))
+
+
+async def _rebuild_matches() -> None:
+    async with get_session() as session:
+        await SampleService(store=Store(session)).rebuild_matches()
+
+
+@cli.command("rebuild-matches")
+def rebuild_matches():
+    """Recompute the match table, for instance after the cutoffs or the SNP panel changed."""
+    asyncio.run(_rebuild_matches())
+
+
+@cli.command("reevaluate-status")
+def reevaluate_status():
+    """Recompute the statuses of samples evaluated with an older cutoff version."""
+    progress: StatusReevaluationProgress = asyncio.run(status_reevaluation.run())
+    click.echo(progress.model_dump_json())
@@ -2,6 +2,8 @@ from pathlib import Path
 
 from pydantic_settings import BaseSettings
 
+from genotype_api.constants import ExecutorType
+
 GENOTYPE_PACKAGE = Path(__file__).parent
 PACKAGE_ROOT: Path = GENOTYPE_PACKAGE.parent
 ENV_FILE: Path = PACKAGE_ROOT / ".env"
@@ -17,6 +19,23 @@ class DBSettings(BaseSettings):
     echo_sql: bool = False
     max_retries: int = 5
     retry_delay: int = 120  # 2 minutes
+    use_fingerprint_index: bool = True
+    use_match_table: bool = False
+    match_table_top_k: int = 10
+    approximate_match_sketch_size: int = 24
+    approximate_match_shortlist_size: int = 1000
+    approximate_match_validation_interval: int = 20
+    match_scan_chunk_size: int = 1000
+    match_cache_size: int = 1024
+    match_cache_ttl: int = 600  # 10 minutes
+    status_reevaluation_batch_size: int = 200
+    status_reevaluation_pause: float = 1.0  # seconds between batches
+    status_refresh_batch_size: int = 200
+    status_refresh_interval: float = 30  # seconds between polls for dirty samples
+    upload_chunk_size: int = 1024 * 1024  # bytes read from an upload at a time
+    executor_type: ExecutorType = ExecutorType.THREAD
+    executor_max_workers: int = 4
+    executor_timeout: float | None = 300  # 5 minutes
 
     class Config:
         env_file = str(ENV_FILE)
@@ -6,6 +6,7 @@ from pydantic import BaseModel
 
 class FileExtension(StrEnum):
     VCF: str = ".vcf"
+    VCF_GZ: str = ".vcf.gz"
 
 
 class Types(str, Enum):
@@ -25,4 +26,9 @@ class Status(str, Enum):
     CANCEL = "cancel"
 
 
+class ExecutorType(StrEnum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
 CUTOFS = dict(max_nocalls=15, max_mismatch=3, min_matches=35)
@@ -3,7 +3,7 @@ from typing import Any, List, Type, Union
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import DeclarativeBase, Query
+from sqlalchemy.orm import DeclarativeBase, Query, selectinload
 
 from genotype_api.database.models import Analysis, Sample
 
@@ -22,6 +22,20 @@ class BaseHandler:
     def _get_join_analysis_on_sample(self) -> Query:
         return self._get_query(table=Sample).join(Analysis, Analysis.sample_id == Sample.id)
 
+    async def load_unpacked_genotypes(self, analyses: list[Analysis]) -> None:
+        """Load the genotype rows of the analyses that have no packed genotypes."""
+        analysis_ids: list[int] = [
+            analysis.id for analysis in analyses if analysis.genotype_blob is None
+        ]
+        if not analysis_ids:
+            return
+        query: Query = (
+            select(Analysis)
+            .options(selectinload(Analysis.genotypes))
+            .filter(Analysis.id.in_(analysis_ids))
+        )
+        await self.fetch_all_rows(query)
+
     # Full row fetch methods
     async def fetch_all_rows(self, query: Query) -> List[DeclarativeBase]:
         """Fetch all full rows matching the query."""
@@ -1,14 +1,37 @@
 import logging
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
 
+from sqlalchemy import Row, delete, insert, update
 from sqlalchemy.future import select
 from sqlalchemy.orm import Query
 
+from genotype_api.constants import Types
 from genotype_api.database.base_handler import BaseHandler
-from genotype_api.database.models import SNP, Analysis, Genotype, Plate, Sample, User
+from genotype_api.database.models import (
+    SNP,
+    Analysis,
+    Cutoff,
+    Genotype,
+    Match,
+    Plate,
+    Sample,
+    User,
+)
 from genotype_api.exceptions import SampleExistsError
 
 LOG = logging.getLogger(__name__)
 
+INSERT_BATCH_SIZE: int = 5000
+
+# The index of the analysis of a genotype in a batch of analyses, its rsnumber and alleles
+GenotypeRow = tuple[int, str, str, str]
+
+ANALYSIS_INSERT_COLUMNS: list[str] = [
+    column.key for column in Analysis.__table__.columns if column.key != "id"
+]
+
 
 class CreateHandler(BaseHandler):
 
@@ -36,22 +59,174 @@ class CreateHandler(BaseHandler):
         await self.session.refresh(sample)
         return sample
 
-    async def create_analyses_samples(self, analyses: list[Analysis]) -> list[Sample]:
-        """Creating samples in an analysis if not already in db."""
-        created_samples = []
+    async def create_plate_with_analyses(
+        self,
+        plate: Plate,
+        analyses: list[Analysis],
+        analysis_type: Types,
+        batch_size: int = INSERT_BATCH_SIZE,
+    ) -> Plate:
+        """Insert a plate with its analyses, samples and genotypes in one transaction.
+
+        Existing analyses of the same type for the samples are replaced and the samples are
+        flagged for a status refresh. The ids of the new plate and analyses are set on the given
+        objects, which are not added to the session. Nothing is written if any insert fails.
+        """
+        try:
+            plate.created_at = plate.created_at or datetime.now()
+            result = await self.session.execute(
+                insert(Plate.__table__).values(plate_id=plate.plate_id, created_at=plate.created_at)
+            )
+            plate.id = result.inserted_primary_key[0]
+            for analysis in analyses:
+                analysis.plate_id = plate.id
+            await self._insert_analyses(
+                analyses=analyses, analysis_type=analysis_type, batch_size=batch_size
+            )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        LOG.info(f"Created plate with id {plate.plate_id} and {len(analyses)} analyses.")
+        return plate
+
+    async def create_analyses_with_genotypes(
+        self,
+        analyses: list[Analysis],
+        analysis_type: Types,
+        genotype_rows: Iterable[GenotypeRow] | None = None,
+        batch_size: int = INSERT_BATCH_SIZE,
+    ) -> list[Analysis]:
+        """Insert analyses with their samples and genotypes in one transaction.
+
+        Genotype rows are given by the index of their analysis in the list, and default to the
+        genotypes of the analyses. Replaces analyses like create_plate_with_analyses.
+        """
+        try:
+            await self._insert_analyses(
+                analyses=analyses,
+                analysis_type=analysis_type,
+                genotype_rows=genotype_rows,
+                batch_size=batch_size,
+            )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return analyses
+
+    async def _insert_analyses(
+        self,
+        analyses: list[Analysis],
+        analysis_type: Types,
+        genotype_rows: Iterable[GenotypeRow] | None = None,
+        batch_size: int = INSERT_BATCH_SIZE,
+    ) -> None:
+        sample_ids: list[str] = list(dict.fromkeys(analysis.sample_id for analysis in analyses))
+        await self._delete_analyses_of_samples(sample_ids=sample_ids, analysis_type=analysis_type)
+        await self._insert_samples(sample_ids=sample_ids)
+        await self._insert_in_batches(
+            model=Analysis,
+            rows=(self._get_analysis_row(analysis) for analysis in analyses),
+            batch_size=batch_size,
+        )
+        await self._set_analysis_ids(analyses=analyses, analysis_type=analysis_type)
+        if genotype_rows is None:
+            genotype_rows = (
+                (index, genotype.rsnumber, genotype.allele_1, genotype.allele_2)
+                for index, analysis in enumerate(analyses)
+                for genotype in analysis.genotypes
+            )
+        await self._insert_in_batches(
+            model=Genotype,
+            rows=(
+                {
+                    "analysis_id": analyses[index].id,
+                    "rsnumber": rsnumber,
+                    "allele_1": allele_1,
+                    "allele_2": allele_2,
+                }
+                for index, rsnumber, allele_1, allele_2 in genotype_rows
+            ),
+            batch_size=batch_size,
+        )
 
+    async def _set_analysis_ids(self, analyses: list[Analysis], analysis_type: Types) -> None:
+        """Set the ids of inserted analyses, the only ones of their type for their samples.
+
+        Ids are read back since MySQL can not return them from a batch insert.
+        """
+        analysis_ids: dict[str, list[int]] = {}
+        rows: list[Row] = await self.fetch_column_values(
+            select(Analysis.sample_id, Analysis.id)
+            .filter(
+                Analysis.sample_id.in_({analysis.sample_id for analysis in analyses}),
+                Analysis.type == analysis_type,
+            )
+            .order_by(Analysis.id)
+        )
+        for sample_id, analysis_id in rows:
+            analysis_ids.setdefault(sample_id, []).append(analysis_id)
         for analysis in analyses:
-            # Sample already exists in the database
-            sample_query = select(Sample).filter(Sample.id == analysis.sample_id)
-            sample_in_db = await self.fetch_one_or_none(sample_query)
+            analysis.id = analysis_ids[analysis.sample_id].pop(0)
+
+    async def _delete_analyses_of_samples(
+        self, sample_ids: list[str], analysis_type: Types
+    ) -> None:
+        replaced_analyses: Query = select(Analysis.id).filter(
+            Analysis.sample_id.in_(sample_ids), Analysis.type == analysis_type
+        )
+        await self.session.execute(
+            delete(Genotype)
+            .where(Genotype.analysis_id.in_(replaced_analyses))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(
+            delete(Analysis)
+            .where(Analysis.sample_id.in_(sample_ids), Analysis.type == analysis_type)
+            .execution_options(synchronize_session=False)
+        )
 
-            # Sample doesn't exist
-            if not sample_in_db:
-                sample = Sample(id=analysis.sample_id)
-                created_sample = await self.create_sample(sample=sample)
-                created_samples.append(created_sample)
+    async def _insert_samples(self, sample_ids: list[str]) -> None:
+        """Insert the missing samples and flag all of them for a status refresh."""
+        existing_ids: list[str] = await self.fetch_all_rows(
+            select(Sample.id).filter(Sample.id.in_(sample_ids))
+        )
+        if existing_ids:
+            await self.session.execute(
+                update(Sample)
+                .where(Sample.id.in_(existing_ids))
+                .values(status_dirty=True)
+                .execution_options(synchronize_session=False)
+            )
+        new_ids: set[str] = set(sample_ids) - set(existing_ids)
+        await self._insert_in_batches(
+            model=Sample,
+            rows=(
+                {"id": sample_id, "status_dirty": True}
+                for sample_id in sample_ids
+                if sample_id in new_ids
+            ),
+        )
 
-        return created_samples
+    async def _insert_in_batches(
+        self, model: type, rows: Iterable[dict], batch_size: int = INSERT_BATCH_SIZE
+    ) -> None:
+        """Insert the rows with one executemany statement per batch."""
+        for batch in self._batched(rows=rows, batch_size=batch_size):
+            await self.session.execute(insert(model.__table__), batch)
+
+    @staticmethod
+    def _batched(rows: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+        iterator: Iterator[dict] = iter(rows)
+        while batch := list(islice(iterator, batch_size)):
+            yield batch
+
+    @staticmethod
+    def _get_analysis_row(analysis: Analysis) -> dict:
+        """Return the column values of a new analysis, setting its creation time if missing."""
+        analysis.created_at = analysis.created_at or datetime.now()
+        return {column: getattr(analysis, column) for column in ANALYSIS_INSERT_COLUMNS}
 
     async def create_user(self, user: User) -> User:
         self.session.add(user)
@@ -59,11 +234,52 @@ class CreateHandler(BaseHandler):
         await self.session.refresh(user)
         return user
 
+    async def create_cutoff(self, cutoff: Cutoff) -> Cutoff:
+        self.session.add(cutoff)
+        await self.session.commit()
+        await self.session.refresh(cutoff)
+        return cutoff
+
     async def create_snps(self, snps: list[SNP]) -> list[SNP]:
         self.session.add_all(snps)
         await self.session.commit()
         return snps
 
+    async def create_matches(self, matches: list[Match]) -> list[Match]:
+        self.session.add_all(matches)
+        await self.session.commit()
+        return matches
+
+    async def replace_matches(self, match_batches: AsyncIterator[list[Match]]) -> int:
+        """Replace all stored matches by the batches of matches in one transaction.
+
+        Readers keep seeing the previous matches until the new ones are committed, and nothing
+        is changed if a batch fails. Returns the number of stored matches.
+        """
+        count: int = 0
+        try:
+            await self.session.execute(delete(Match).execution_options(synchronize_session=False))
+            async for matches in match_batches:
+                await self._insert_in_batches(
+                    model=Match, rows=(self._get_match_row(match) for match in matches)
+                )
+                count += len(matches)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return count
+
+    @staticmethod
+    def _get_match_row(match: Match) -> dict:
+        return {
+            "analysis_id": match.analysis_id,
+            "matched_analysis_id": match.matched_analysis_id,
+            "match": match.match,
+            "mismatch": match.mismatch,
+            "unknown": match.unknown,
+        }
+
     async def create_genotype(self, genotype: Genotype) -> Genotype:
         self.session.add(genotype)
         await self.session.commit()
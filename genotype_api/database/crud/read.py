@@ -1,9 +1,10 @@
 import logging
 from datetime import date
+from typing import AsyncIterator
 
-from sqlalchemy import asc, desc, func
+from sqlalchemy import Row, asc, desc, func
 from sqlalchemy.future import select
-from sqlalchemy.orm import Query, selectinload
+from sqlalchemy.orm import Query, aliased, contains_eager, selectinload
 
 from genotype_api.constants import Types
 from genotype_api.database.base_handler import BaseHandler
@@ -25,7 +26,10 @@ from genotype_api.database.filters.plate_filters import (
     filter_plates_by_id,
     filter_plates_by_plate_id,
 )
-from genotype_api.database.filters.sample_filters import filter_samples_by_id
+from genotype_api.database.filters.sample_filters import (
+    filter_samples_by_id,
+    filter_samples_with_outdated_cutoff,
+)
 from genotype_api.database.filters.snp_filters import SNPFilter, apply_snp_filter
 from genotype_api.database.filters.user_filters import (
     UserFilter,
@@ -33,7 +37,16 @@ from genotype_api.database.filters.user_filters import (
     filter_users_by_email,
     filter_users_by_id,
 )
-from genotype_api.database.models import SNP, Analysis, Genotype, Plate, Sample, User
+from genotype_api.database.models import (
+    SNP,
+    Analysis,
+    Cutoff,
+    Genotype,
+    Match,
+    Plate,
+    Sample,
+    User,
+)
 
 LOG = logging.getLogger(__name__)
 
@@ -41,9 +54,11 @@ LOG = logging.getLogger(__name__)
 class ReadHandler(BaseHandler):
 
     async def get_analyses_by_plate_id(self, plate_id: int) -> list[Analysis]:
-        analyses: Query = self._get_analysis_with_genotypes()
+        analyses: Query = select(Analysis)
         filtered_query = filter_analyses_by_plate_id(plate_id=plate_id, analyses=analyses)
-        return await self.fetch_all_rows(filtered_query)
+        analyses: list[Analysis] = await self.fetch_all_rows(filtered_query)
+        await self.load_unpacked_genotypes(analyses)
+        return analyses
 
     async def get_analysis_by_id(self, analysis_id: int) -> Analysis:
         analyses: Query = select(Analysis)
@@ -54,6 +69,23 @@ class ReadHandler(BaseHandler):
         filtered_query = select(Analysis)
         return await self.fetch_all_rows(filtered_query)
 
+    async def get_analyses_with_genotypes(self) -> list[Analysis]:
+        """Return all analyses with their packed genotypes or their genotype rows."""
+        analyses: list[Analysis] = await self.get_analyses()
+        await self.load_unpacked_genotypes(analyses)
+        return analyses
+
+    async def get_analyses_with_genotype_rows(self, after_id: int, limit: int) -> list[Analysis]:
+        """Return up to limit analyses after an id in id order, with their genotype rows."""
+        query: Query = (
+            select(Analysis)
+            .options(selectinload(Analysis.genotypes))
+            .filter(Analysis.id > after_id)
+            .order_by(Analysis.id)
+            .limit(limit)
+        )
+        return await self.fetch_all_rows(query)
+
     async def get_analyses_with_skip_and_limit(self, skip: int, limit: int) -> list[Analysis]:
         analyses: Query = select(Analysis)
         filter_functions = [AnalysisFilter.SKIP_AND_LIMIT]
@@ -74,10 +106,87 @@ class ReadHandler(BaseHandler):
             date_max=date_max,
             type=analysis_type,
         )
+        analyses: list[Analysis] = await self.fetch_all_rows(filtered_query)
+        await self.load_unpacked_genotypes(analyses)
+        return analyses
 
-        filtered_query = filtered_query.options(selectinload(Analysis.genotypes))
+    async def get_analyses_by_type(self, analysis_type: Types) -> list[Analysis]:
+        analyses: Query = select(Analysis)
+        filter_functions = [AnalysisFilter.BY_TYPE]
+        filtered_query = apply_analysis_filter(
+            analyses=analyses, filter_functions=filter_functions, type=analysis_type
+        )
+        analyses: list[Analysis] = await self.fetch_all_rows(filtered_query)
+        await self.load_unpacked_genotypes(analyses)
+        return analyses
+
+    async def get_matches_by_type_and_sample_id(
+        self,
+        sample_id: str,
+        analysis_type: Types,
+        comparison_set: Types,
+        date_min: date,
+        date_max: date,
+        limit: int | None = None,
+    ) -> list[Match]:
+        """Return the stored matches of the analysis of a sample, best match first.
+
+        The matched analyses are filtered on the comparison set and the dates.
+        """
+        sample_analysis_ids: Query = apply_analysis_filter(
+            analyses=select(Analysis.id),
+            filter_functions=[AnalysisFilter.BY_TYPE, AnalysisFilter.BY_SAMPLE_ID],
+            sample_id=sample_id,
+            type=analysis_type,
+        )
+        matches: Query = (
+            select(Match)
+            .join(Match.matched_analysis)
+            .options(contains_eager(Match.matched_analysis))
+            .filter(Match.analysis_id.in_(sample_analysis_ids))
+        )
+        filtered_query = apply_analysis_filter(
+            analyses=matches,
+            filter_functions=[AnalysisFilter.BY_TYPE, AnalysisFilter.BETWEEN_DATES],
+            type=comparison_set,
+            date_min=date_min,
+            date_max=date_max,
+        )
+        filtered_query = filtered_query.order_by(desc(Match.match), asc(Match.mismatch)).limit(
+            limit
+        )
         return await self.fetch_all_rows(filtered_query)
 
+    async def stream_packed_analyses_by_type_between_dates(
+        self, analysis_type: Types, date_min: date, date_max: date, chunk_size: int
+    ) -> AsyncIterator[list[Row]]:
+        """Yield chunks of the ids, sample ids and packed genotypes of analyses between dates.
+
+        The rows are read with a server side cursor, so only one chunk is held in memory.
+        """
+        analyses: Query = select(Analysis.id, Analysis.sample_id, Analysis.genotype_blob)
+        filter_functions = [AnalysisFilter.BY_TYPE, AnalysisFilter.BETWEEN_DATES]
+        filtered_query = apply_analysis_filter(
+            analyses=analyses,
+            filter_functions=filter_functions,
+            date_min=date_min,
+            date_max=date_max,
+            type=analysis_type,
+        )
+        result = await self.session.stream(filtered_query.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield rows
+
+    async def get_analyses_by_ids(self, analysis_ids: list[int]) -> list[Analysis]:
+        analyses: Query = select(Analysis)
+        filter_functions = [AnalysisFilter.BY_IDS]
+        filtered_query = apply_analysis_filter(
+            analyses=analyses, filter_functions=filter_functions, analysis_ids=analysis_ids
+        )
+        analyses: list[Analysis] = await self.fetch_all_rows(filtered_query)
+        await self.load_unpacked_genotypes(analyses)
+        return analyses
+
     async def get_analysis_by_type_and_sample_id(
         self, sample_id: str, analysis_type: Types
     ) -> Analysis:
@@ -92,6 +201,21 @@ class ReadHandler(BaseHandler):
         filtered_query = filtered_query.options(selectinload(Analysis.genotypes))
         return await self.fetch_first_row(filtered_query)
 
+    async def get_analyses_by_type_and_sample_ids(
+        self, sample_ids: list[str], analysis_type: Types
+    ) -> list[Analysis]:
+        analyses: Query = select(Analysis)
+        filter_functions = [AnalysisFilter.BY_TYPE, AnalysisFilter.BY_SAMPLE_IDS]
+        filtered_query = apply_analysis_filter(
+            analyses=analyses,
+            filter_functions=filter_functions,
+            sample_ids=sample_ids,
+            type=analysis_type,
+        )
+        analyses: list[Analysis] = await self.fetch_all_rows(filtered_query)
+        await self.load_unpacked_genotypes(analyses)
+        return analyses
+
     async def get_plate_by_id(self, plate_id: int) -> Plate:
         plates: Query = self._get_plate_with_analyses_and_samples()
         filtered_query = filter_plates_by_id(entry_id=plate_id, plates=plates)
@@ -102,10 +226,18 @@ class ReadHandler(BaseHandler):
         filtered_query = filter_plates_by_plate_id(plate_id=plate_id, plates=plates)
         return await self.fetch_first_row(filtered_query)
 
+    async def get_plates(self) -> list[Plate]:
+        filtered_query = select(Plate)
+        return await self.fetch_all_rows(filtered_query)
+
     async def get_ordered_plates(self, order_params: PlateOrderParams) -> list[Plate]:
         sort_func = desc if order_params.sort_order == "descend" else asc
-        plates: Query = self._get_plate_with_analyses_and_samples()
-        filter_functions = [PlateFilter.ORDER, PlateFilter.SKIP_AND_LIMIT]
+        plates: Query = select(Plate)
+        filter_functions = [
+            PlateFilter.LOW_CALL_RATE,
+            PlateFilter.ORDER,
+            PlateFilter.SKIP_AND_LIMIT,
+        ]
         filtered_query = apply_plate_filter(
             plates=plates,
             filter_functions=filter_functions,
@@ -113,9 +245,25 @@ class ReadHandler(BaseHandler):
             skip=order_params.skip,
             limit=order_params.limit,
             sort_func=sort_func,
+            max_call_rate=order_params.max_call_rate,
         )
         return await self.fetch_all_rows(filtered_query)
 
+    async def get_plate_status_counts(self, plate_ids: list[int]) -> list[Row]:
+        """Return the number of analyses and commented samples per plate and sample status."""
+        query: Query = (
+            select(
+                Analysis.plate_id,
+                Sample.status,
+                func.count(Analysis.id).label("total"),
+                func.count(func.nullif(Sample.comment, "")).label("commented"),
+            )
+            .join(Sample, Analysis.sample_id == Sample.id)
+            .filter(Analysis.plate_id.in_(plate_ids))
+            .group_by(Analysis.plate_id, Sample.status)
+        )
+        return await self.fetch_column_values(query)
+
     async def get_genotype_by_id(self, entry_id: int) -> Genotype:
         genotypes: Query = self._get_genotype_with_analysis()
         filter_functions = [GenotypeFilter.BY_ID]
@@ -125,7 +273,7 @@ class ReadHandler(BaseHandler):
         return await self.fetch_first_row(filtered_query)
 
     async def get_filtered_samples(self, filter_params: SampleFilterParams) -> list[Sample]:
-        query = self._get_samples_with_analyses_and_genotypes()
+        query = self._get_joined_samples_with_analyses()
         if filter_params.sample_id:
             query = self._get_samples(query, filter_params.sample_id)
         if filter_params.plate_id:
@@ -136,12 +284,20 @@ class ReadHandler(BaseHandler):
             query = self._get_commented_samples(query)
         if filter_params.is_missing:
             query = self._get_status_missing_samples(query)
+        if filter_params.max_call_rate is not None:
+            query = self._get_low_call_rate_samples(query, filter_params.max_call_rate)
+        if filter_params.sort_by_call_rate:
+            query = self._order_samples_by_call_rate(query)
         filtered_query = (
             query.order_by(Sample.created_at.desc())
             .offset(filter_params.skip)
             .limit(filter_params.limit)
         )
-        return await self.fetch_all_rows(filtered_query)
+        samples: list[Sample] = await self.fetch_all_rows(filtered_query)
+        await self.load_unpacked_genotypes(
+            [analysis for sample in samples for analysis in sample.analyses]
+        )
+        return samples
 
     # pylint: disable=E1102
     @staticmethod
@@ -168,15 +324,50 @@ class ReadHandler(BaseHandler):
         """Returning sample query statement for samples with no comment."""
         return query.filter(Sample.status.is_(None))
 
+    @staticmethod
+    def _get_low_call_rate_samples(query: Query, max_call_rate: float) -> Query:
+        """Returning sample query statement for samples with an analysis below the call rate."""
+        return query.filter(Analysis.call_rate < max_call_rate)
+
+    @staticmethod
+    def _order_samples_by_call_rate(query: Query) -> Query:
+        """Returning sample query statement ordered by the lowest call rate of the sample."""
+        sample_analysis = aliased(Analysis)
+        call_rate = (
+            select(func.min(sample_analysis.call_rate))
+            .where(sample_analysis.sample_id == Sample.id)
+            .correlate(Sample)
+            .scalar_subquery()
+            .label("call_rate")
+        )
+        return query.add_columns(call_rate).order_by(call_rate)
+
     @staticmethod
     def _get_samples(query: Query, sample_id: str) -> Query:
         """Returns a query for samples containing the given sample_id."""
         return query.filter(Sample.id.contains(sample_id))
 
     async def get_sample_by_id(self, sample_id: str) -> Sample:
-        samples: Query = self._get_samples_with_analyses_and_genotypes()
+        samples: Query = self._get_joined_samples_with_analyses()
         filtered_query = filter_samples_by_id(sample_id=sample_id, samples=samples)
-        return await self.fetch_first_row(filtered_query)
+        sample: Sample = await self.fetch_first_row(filtered_query)
+        if sample:
+            await self.load_unpacked_genotypes(sample.analyses)
+        return sample
+
+    async def get_samples_with_analyses(self, sample_ids: list[str]) -> list[Sample]:
+        """Return the samples with their analyses and genotypes, reloaded from the database."""
+        query: Query = (
+            select(Sample)
+            .options(selectinload(Sample.analyses))
+            .filter(Sample.id.in_(sample_ids))
+            .execution_options(populate_existing=True)
+        )
+        samples: list[Sample] = await self.fetch_all_rows(query)
+        await self.load_unpacked_genotypes(
+            [analysis for sample in samples for analysis in sample.analyses]
+        )
+        return samples
 
     async def get_user_by_id(self, user_id: int) -> User:
         users: Query = self._get_user_with_plates()
@@ -196,16 +387,26 @@ class ReadHandler(BaseHandler):
         )
         return await self.fetch_all_rows(filtered_query)
 
-    async def check_analyses_objects(self, analyses: list[Analysis], analysis_type: Types) -> None:
-        """Raising 400 if any analysis in the list already exist in the database"""
-        for analysis_obj in analyses:
-            existing_analysis = await self.get_analysis_by_type_and_sample_id(
-                sample_id=analysis_obj.sample_id,
-                analysis_type=analysis_type,
-            )
-            if existing_analysis:
-                await self.session.delete(existing_analysis)
-                await self.session.commit()
+    async def get_current_cutoff(self) -> Cutoff | None:
+        return await self.fetch_first_row(select(Cutoff).order_by(Cutoff.id.desc()))
+
+    async def get_cutoffs(self) -> list[Cutoff]:
+        return await self.fetch_all_rows(select(Cutoff).order_by(Cutoff.id))
+
+    async def get_outdated_sample_ids(self, cutoff_version: int, limit: int) -> list[str]:
+        """Return ids of samples with a status evaluated with an older cutoff version."""
+        samples: Query = select(Sample.id).order_by(Sample.id).limit(limit)
+        filtered_query = filter_samples_with_outdated_cutoff(
+            cutoff_version=cutoff_version, samples=samples
+        )
+        return await self.fetch_all_rows(filtered_query)
+
+    async def count_outdated_samples(self, cutoff_version: int) -> int:
+        samples: Query = select(func.count(Sample.id))
+        filtered_query = filter_samples_with_outdated_cutoff(
+            cutoff_version=cutoff_version, samples=samples
+        )
+        return await self.fetch_one_value(filtered_query)
 
     async def get_snps(self) -> list[SNP]:
         filtered_query = select(SNP)
@@ -243,11 +444,11 @@ class ReadHandler(BaseHandler):
         return select(Genotype).options(selectinload(Genotype.analysis))
 
     @staticmethod
-    def _get_samples_with_analyses_and_genotypes() -> Query:
+    def _get_joined_samples_with_analyses() -> Query:
         return (
             select(Sample)
             .distinct()
-            .options(selectinload(Sample.analyses).selectinload(Analysis.genotypes))
+            .options(selectinload(Sample.analyses))
             .join(Analysis, Analysis.sample_id == Sample.id)
         )
 
@@ -1,4 +1,5 @@
 from pydantic import EmailStr
+from sqlalchemy import bindparam, update
 from sqlalchemy.future import select
 from sqlalchemy.orm import Query, selectinload
 
@@ -6,40 +7,52 @@ from genotype_api.constants import Types
 from genotype_api.database.base_handler import BaseHandler
 from genotype_api.database.filter_models.plate_models import PlateSignOff
 from genotype_api.database.filter_models.sample_models import SampleSexesUpdate
-from genotype_api.database.models import Analysis, Plate, Sample, User
+from genotype_api.database.models import Analysis, Cutoff, Plate, Sample, User
 from genotype_api.exceptions import SampleNotFoundError
-from genotype_api.services.match_genotype_service.match_genotype import (
-    MatchGenotypeService,
-)
+from genotype_api.models import SampleDetail
 
 
 class UpdateHandler(BaseHandler):
 
-    async def refresh_sample_status(
-        self,
-        sample: Sample,
-    ) -> Sample:
-        if len(sample.analyses) != 2:
+    async def update_samples_status(
+        self, samples: list[Sample], results: list[SampleDetail | None], cutoff: Cutoff | None
+    ) -> list[Sample]:
+        """Store the checked statuses of the samples and commit them together."""
+        for sample, sample_results in zip(samples, results):
+            self._set_sample_results(sample=sample, results=sample_results, cutoff=cutoff)
+        self.session.add_all(samples)
+        await self.session.commit()
+        return samples
+
+    @staticmethod
+    def _set_sample_results(
+        sample: Sample, results: SampleDetail | None, cutoff: Cutoff | None
+    ) -> None:
+        """Store the status and the QC detail of a sample, clearing them when it is not checked."""
+        sample.cutoff_version = cutoff.id if cutoff else None
+        sample.status_manual = False
+        if results is None:
             sample.status = None
+            results = SampleDetail()
         else:
-            results = MatchGenotypeService.check_sample(sample=sample)
             sample.status = "fail" if "fail" in results.model_dump().values() else "pass"
-
-        self.session.add(sample)
-        await self.session.commit()
-        await self.session.refresh(sample)
-        return sample
+        sample.matches = results.matches
+        sample.mismatches = results.mismatches
+        sample.unknown = results.unknown
+        sample.snps_status = results.snps
+        sample.nocalls_status = results.nocalls
+        sample.sex_status = results.sex
+        sample.failed_snps = results.failed_snps
 
     async def update_sample_comment(self, sample_id: str, comment: str) -> Sample:
         query: Query = (
-            select(Sample)
-            .options(selectinload(Sample.analyses).selectinload(Analysis.genotypes))
-            .filter(Sample.id == sample_id)
+            select(Sample).options(selectinload(Sample.analyses)).filter(Sample.id == sample_id)
         )
         sample: Sample = await self.fetch_one_or_none(query)
 
         if not sample:
             raise SampleNotFoundError
+        await self.load_unpacked_genotypes(sample.analyses)
 
         sample.comment = comment
         self.session.add(sample)
@@ -48,19 +61,18 @@ class UpdateHandler(BaseHandler):
         return sample
 
     async def update_sample_status(self, sample_id: str, status: str | None) -> Sample:
+        """Set the status of a sample by hand, re-evaluations leave it until it is cleared."""
         query: Query = select(Sample).distinct().filter(Sample.id == sample_id)
         sample: Sample = await self.fetch_one_or_none(query)
         if not sample:
             raise SampleNotFoundError
         sample.status = status
+        sample.status_manual = status is not None
         self.session.add(sample)
         await self.session.commit()
         await self.session.refresh(sample)
         return sample
 
-    async def refresh_plate(self, plate: Plate) -> None:
-        await self.session.refresh(plate)
-
     async def update_plate_sign_off(self, plate: Plate, plate_sign_off: PlateSignOff) -> Plate:
         plate.signed_by = plate_sign_off.user_id
         plate.signed_at = plate_sign_off.signed_at
@@ -74,7 +86,7 @@ class UpdateHandler(BaseHandler):
         query: Query = (
             select(Sample)
             .distinct()
-            .options(selectinload(Sample.analyses).selectinload(Analysis.genotypes))
+            .options(selectinload(Sample.analyses))
             .join(Analysis, Analysis.sample_id == Sample.id)
             .filter(Sample.id == sexes_update.sample_id)
         )
@@ -82,18 +94,50 @@ class UpdateHandler(BaseHandler):
         if not sample:
             raise SampleNotFoundError
         sample.sex = sexes_update.sex
+        sample.status_dirty = True
         for analysis in sample.analyses:
             if sexes_update.genotype_sex and analysis.type == Types.GENOTYPE:
                 analysis.sex = sexes_update.genotype_sex
             elif sexes_update.sequence_sex and analysis.type == Types.SEQUENCE:
                 analysis.sex = sexes_update.sequence_sex
             self.session.add(analysis)
-        self.session.add_all(sample)
+        self.session.add(sample)
         await self.session.commit()
         await self.session.refresh(sample)
-        sample = await self.refresh_sample_status(sample)
         return sample
 
+    async def mark_samples_status_dirty(self, sample_ids: list[str], dirty: bool = True) -> None:
+        """Flag the statuses of the samples as pending a refresh, or clear the flag."""
+        await self.session.execute(
+            update(Sample).where(Sample.id.in_(sample_ids)).values(status_dirty=dirty)
+        )
+        await self.session.commit()
+
+    async def claim_dirty_samples(self, limit: int) -> list[str]:
+        """Clear the dirty flag of up to limit samples and return their ids."""
+        sample_ids: list[str] = await self.fetch_all_rows(
+            select(Sample.id).filter(Sample.status_dirty.is_(True)).order_by(Sample.id).limit(limit)
+        )
+        if sample_ids:
+            await self.mark_samples_status_dirty(sample_ids=sample_ids, dirty=False)
+        return sample_ids
+
+    async def update_analyses_genotype_blobs(self, genotype_blobs: dict[int, bytes | None]) -> None:
+        """Store the packed genotypes by analysis id with one executemany update and commit."""
+        if not genotype_blobs:
+            return
+        analysis_table = Analysis.__table__
+        await self.session.execute(
+            update(analysis_table)
+            .where(analysis_table.c.id == bindparam("analysis_id"))
+            .values(genotype_blob=bindparam("packed_genotypes")),
+            [
+                {"analysis_id": analysis_id, "packed_genotypes": genotype_blob}
+                for analysis_id, genotype_blob in genotype_blobs.items()
+            ],
+        )
+        await self.session.commit()
+
     async def update_user_email(self, user: User, email: EmailStr) -> User:
         user.email = email
         self.session.add(user)
@@ -18,3 +18,4 @@ class PlateOrderParams(BaseModel):
     skip: int | None = None
     limit: int | None = None
     order_by: str | None = None
+    max_call_rate: float | None = None
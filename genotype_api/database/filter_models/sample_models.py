@@ -11,6 +11,8 @@ class SampleFilterParams(BaseModel):
     is_incomplete: bool | None = None
     is_commented: bool | None = None
     is_missing: bool | None = None
+    max_call_rate: float | None = None
+    sort_by_call_rate: bool | None = None
     skip: int
     limit: int
 
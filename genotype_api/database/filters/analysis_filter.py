@@ -13,6 +13,11 @@ def filter_analyses_by_id(analysis_id: int, analyses: Query, **kwargs) -> Query:
     return analyses.filter(Analysis.id == analysis_id)
 
 
+def filter_analyses_by_ids(analysis_ids: list[int], analyses: Query, **kwargs) -> Query:
+    """Return analyses by ids."""
+    return analyses.filter(Analysis.id.in_(analysis_ids))
+
+
 def filter_analyses_by_type(type: str, analyses: Query, **kwargs) -> Query:
     """Return analysis by type."""
     return analyses.filter(Analysis.type == type)
@@ -28,6 +33,11 @@ def filter_analyses_by_sample_id(sample_id: str, analyses: Query, **kwargs) -> Q
     return analyses.filter(Analysis.sample_id == sample_id)
 
 
+def filter_analyses_by_sample_ids(sample_ids: list[str], analyses: Query, **kwargs) -> Query:
+    """Return analyses by sample ids."""
+    return analyses.filter(Analysis.sample_id.in_(sample_ids))
+
+
 def add_skip_and_limit(analyses: Query, skip: int, limit: int, **kwargs) -> Query:
     """Add skip and limit to the query."""
     return analyses.offset(skip).limit(limit)
@@ -47,9 +57,11 @@ def apply_analysis_filter(
     filter_functions: list[callable],
     analyses: Query,
     analysis_id: int = None,
+    analysis_ids: list[int] = None,
     type: str = None,
     plate_id: int = None,
     sample_id: str = None,
+    sample_ids: list[str] = None,
     skip: int = None,
     limit: int = None,
     date_min: date = None,
@@ -61,9 +73,11 @@ def apply_analysis_filter(
         analyses: Query = filter_function(
             analyses=analyses,
             analysis_id=analysis_id,
+            analysis_ids=analysis_ids,
             type=type,
             plate_id=plate_id,
             sample_id=sample_id,
+            sample_ids=sample_ids,
             skip=skip,
             limit=limit,
             date_min=date_min,
@@ -76,8 +90,10 @@ class AnalysisFilter(Enum):
     """Define Analysis filter functions."""
 
     BY_ID: callable = filter_analyses_by_id
+    BY_IDS: callable = filter_analyses_by_ids
     BY_TYPE: callable = filter_analyses_by_type
     BY_PLATE_ID: callable = filter_analyses_by_plate_id
     BY_SAMPLE_ID: callable = filter_analyses_by_sample_id
+    BY_SAMPLE_IDS: callable = filter_analyses_by_sample_ids
     SKIP_AND_LIMIT: callable = add_skip_and_limit
     BETWEEN_DATES: callable = filter_analyses_between_dates
@@ -1,8 +1,19 @@
 """Module for the plate filters."""
 
+from sqlalchemy import ScalarSelect, func, select
 from sqlalchemy.orm import Query
 
-from genotype_api.database.models import Plate
+from genotype_api.database.models import Analysis, Plate
+
+
+def get_plate_call_rate() -> ScalarSelect:
+    """Return the lowest call rate of the analyses on a plate."""
+    return (
+        select(func.min(Analysis.call_rate))
+        .where(Analysis.plate_id == Plate.id)
+        .correlate(Plate)
+        .scalar_subquery()
+    )
 
 
 def filter_plates_by_id(entry_id: int, plates: Query, **kwargs) -> Query:
@@ -20,9 +31,18 @@ def add_skip_and_limit(plates: Query, skip: int, limit: int, **kwargs) -> Query:
     return plates.offset(skip).limit(limit)
 
 
+def filter_plates_with_low_call_rate(plates: Query, max_call_rate: float | None, **kwargs) -> Query:
+    """Return plates with an analysis with a call rate below the given one."""
+    if max_call_rate is None:
+        return plates
+    return plates.filter(Plate.analyses.any(Analysis.call_rate < max_call_rate))
+
+
 def order_plates(plates: Query, order_by: str, sort_func: callable, **kwargs) -> Query:
-    """Order the plates by the given column."""
-    return plates.order_by(sort_func(order_by))
+    """Order the plates by the given column, or by their lowest call rate."""
+    return plates.order_by(
+        sort_func(get_plate_call_rate() if order_by == "call_rate" else order_by)
+    )
 
 
 def apply_plate_filter(
@@ -34,6 +54,7 @@ def apply_plate_filter(
     limit: int = None,
     order_by: str = None,
     sort_func: callable = None,
+    max_call_rate: float | None = None,
 ) -> Query:
     """Apply filtering functions to the plate queries and return filtered results."""
 
@@ -46,6 +67,7 @@ def apply_plate_filter(
             limit=limit,
             order_by=order_by,
             sort_func=sort_func,
+            max_call_rate=max_call_rate,
         )
     return plates
 
@@ -57,3 +79,4 @@ class PlateFilter:
     BY_PLATE_ID: callable = filter_plates_by_plate_id
     SKIP_AND_LIMIT: callable = add_skip_and_limit
     ORDER: callable = order_plates
+    LOW_CALL_RATE: callable = filter_plates_with_low_call_rate
@@ -3,9 +3,10 @@
 from enum import Enum
 from typing import Callable
 
-from sqlalchemy import func
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Query
 
+from genotype_api.constants import Status
 from genotype_api.database.models import Analysis, Sample
 
 
@@ -49,6 +50,22 @@ def filter_samples_analysed_on_plate(samples: Query, plate_id: str | None, **kwa
     return samples.filter(Analysis.plate_id == plate_id) if plate_id else samples
 
 
+def filter_samples_with_outdated_cutoff(
+    samples: Query, cutoff_version: int | None, **kwargs
+) -> Query:
+    """Return samples with a computed pass or fail status evaluated with an older cutoff version.
+
+    Statuses set by hand are left out, so a re-evaluation does not overwrite them.
+    """
+    if cutoff_version is None:
+        return samples
+    return samples.filter(
+        Sample.status.in_([Status.PASS, Status.FAIL]),
+        Sample.status_manual.is_not(True),
+        or_(Sample.cutoff_version.is_(None), Sample.cutoff_version < cutoff_version),
+    )
+
+
 def add_skip_and_limit(samples: Query, skip: int, limit: int, **kwargs) -> Query:
     """Add skip and limit to the query."""
     return samples.offset(skip).limit(limit)
@@ -62,6 +79,7 @@ def apply_sample_filter(
     is_commented: bool | None = None,
     is_missing: bool | None = None,
     is_incomplete: bool | None = None,
+    cutoff_version: int | None = None,
     skip: int = None,
     limit: int = None,
 ) -> Query:
@@ -74,6 +92,7 @@ def apply_sample_filter(
             is_commented=is_commented,
             is_missing=is_missing,
             is_incomplete=is_incomplete,
+            cutoff_version=cutoff_version,
             skip=skip,
             limit=limit,
         )
@@ -89,4 +108,5 @@ class SampleFilter(Enum):
     WITHOUT_STATUS: Callable = filter_samples_without_status
     INCOMPLETE: Callable = filter_incomplete_samples
     ANALYSED_ON_PLATE: Callable = filter_samples_analysed_on_plate
+    OUTDATED_CUTOFF: Callable = filter_samples_with_outdated_cutoff
     SKIP_AND_LIMIT: Callable = add_skip_and_limit
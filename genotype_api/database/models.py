@@ -1,7 +1,17 @@
 from collections import Counter
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+)
 from sqlalchemy.orm import DeclarativeBase, relationship
 from sqlalchemy_utils import EmailType
 
@@ -40,16 +50,35 @@ class Analysis(Base):
     created_at = Column(DateTime, default=datetime.now)
     sample_id = Column(String(length=32), ForeignKey("sample.id"))
     plate_id = Column(Integer, ForeignKey("plate.id"))
+    genotype_blob = Column(LargeBinary)
+    known_calls = Column(Integer)
+    unknown_calls = Column(Integer)
+    call_rate = Column(Float, index=True)
 
     sample = relationship("Sample", back_populates="analyses")
     plate = relationship("Plate", back_populates="analyses")
     genotypes = relationship("Genotype", back_populates="analysis")
 
     def check_no_calls(self):
+        if self.known_calls is not None:
+            return Counter(known=self.known_calls, unknown=self.unknown_calls)
         calls = ["known" if genotype.is_ok else "unknown" for genotype in self.genotypes]
         return Counter(calls)
 
 
+class Match(Base):
+    __tablename__ = "match"
+
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(Integer, ForeignKey("analysis.id", ondelete="CASCADE"), index=True)
+    matched_analysis_id = Column(Integer, ForeignKey("analysis.id", ondelete="CASCADE"))
+    match = Column(Integer)
+    mismatch = Column(Integer)
+    unknown = Column(Integer)
+
+    matched_analysis = relationship("Analysis", foreign_keys=[matched_analysis_id])
+
+
 class Sample(Base):
     __tablename__ = "sample"
 
@@ -58,6 +87,16 @@ class Sample(Base):
     comment = Column(String)
     sex = Column(String)
     created_at = Column(DateTime, default=datetime.now)
+    matches = Column(Integer)
+    mismatches = Column(Integer)
+    unknown = Column(Integer)
+    snps_status = Column(String(length=4))
+    nocalls_status = Column(String(length=4))
+    sex_status = Column(String(length=4))
+    failed_snps = Column(JSON)
+    cutoff_version = Column(Integer, ForeignKey("cutoff.id"))
+    status_dirty = Column(Boolean, default=False, index=True)
+    status_manual = Column(Boolean, default=False)
 
     analyses = relationship("Analysis", back_populates="sample")
 
@@ -76,6 +115,24 @@ class Sample(Base):
         return None
 
 
+class Cutoff(Base):
+    __tablename__ = "cutoff"
+
+    id = Column(Integer, primary_key=True)
+    max_nocalls = Column(Integer)
+    max_mismatch = Column(Integer)
+    min_matches = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+
+    @property
+    def values(self) -> dict:
+        return dict(
+            max_nocalls=self.max_nocalls,
+            max_mismatch=self.max_mismatch,
+            min_matches=self.min_matches,
+        )
+
+
 class SNP(Base):
     __tablename__ = "snp"
 
@@ -16,4 +16,5 @@ class AnalysisResponse(BaseModel):
     sample_id: str | None = None
     plate_id: int | None = None
     id: int | None = None
+    call_rate: float | None = None
     genotypes: list[GenotypeResponse] | None = None
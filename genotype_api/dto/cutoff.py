@@ -0,0 +1,19 @@
+"""Module for the cutoff DTOs."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class CutoffCreate(BaseModel):
+    max_nocalls: int = Field(ge=0)
+    max_mismatch: int = Field(ge=0)
+    min_matches: int = Field(ge=0)
+
+
+class CutoffResponse(BaseModel):
+    id: int
+    max_nocalls: int
+    max_mismatch: int
+    min_matches: int
+    created_at: datetime | None = None
@@ -30,6 +30,7 @@ class UserOnPlate(BaseModel):
 class SampleStatus(BaseModel):
     status: Status | None = None
     comment: str | None = None
+    status_pending: bool = False
 
 
 class AnalysisOnPlate(BaseModel):
@@ -40,6 +41,7 @@ class AnalysisOnPlate(BaseModel):
     sample_id: str | None = None
     plate_id: int | None = None
     id: int | None = None
+    call_rate: float | None = None
     sample: SampleStatus | None = None
 
 
@@ -57,6 +59,8 @@ class PlateResponse(BaseModel):
 
     @validator("plate_status_counts")
     def check_detail(cls, value, values):
+        if value is not None:
+            return value
         analyses = values.get("analyses")
         if not analyses:
             return None
@@ -1,12 +1,11 @@
 """Module for the sample DTOs."""
 
-from datetime import datetime
-from pydantic import BaseModel, computed_field
+from datetime import date, datetime
+from pydantic import BaseModel, Field
 from genotype_api.constants import Sexes, Status, Types
 from genotype_api.dto.genotype import GenotypeResponse
 
 from genotype_api.models import SampleDetail
-from genotype_api.services.match_genotype_service.utils import check_snps, check_sex
 
 
 class AnalysisOnSample(BaseModel):
@@ -15,6 +14,7 @@ class AnalysisOnSample(BaseModel):
     sample_id: str | None = None
     plate_id: int | None = None
     id: int | None = None
+    call_rate: float | None = None
     genotypes: list[GenotypeResponse]
 
 
@@ -25,29 +25,9 @@ class SampleResponse(BaseModel):
     sex: Sexes | None = None
     created_at: datetime | None = datetime.now()
     analyses: list[AnalysisOnSample] | None = None
-
-    @computed_field(alias="detail")
-    def get_detail(self) -> SampleDetail | None:
-        analyses = self.analyses
-        if analyses:
-            if len(analyses) != 2:
-                return SampleDetail()
-            genotype_analysis: AnalysisOnSample = [
-                analysis for analysis in analyses if analysis.type == "genotype"
-            ][0]
-            sequence_analysis: AnalysisOnSample = [
-                analysis for analysis in analyses if analysis.type == "sequence"
-            ][0]
-            status: dict = check_snps(
-                genotype_analysis=genotype_analysis, sequence_analysis=sequence_analysis
-            )
-            sex: str = check_sex(
-                sample_sex=self.sex,
-                genotype_analysis=genotype_analysis,
-                sequence_analysis=sequence_analysis,
-            )
-            return SampleDetail(**status, sex=sex)
-        return None
+    detail: SampleDetail | None = None
+    cutoff_version: int | None = None
+    status_pending: bool = False
 
 
 class SampleCreate(BaseModel):
@@ -56,3 +36,12 @@ class SampleCreate(BaseModel):
     comment: str | None = None
     sex: Sexes
     created_at: datetime = datetime.now()
+
+
+class SampleMatchRequest(BaseModel):
+    sample_ids: list[str] = Field(min_length=1)
+    analysis_type: Types
+    comparison_set: Types
+    date_min: date | None = date.min
+    date_max: date | None = date.max
+    top_k: int | None = Field(default=None, gt=0)
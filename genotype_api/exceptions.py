@@ -53,5 +53,13 @@ class SNPExistsError(Exception):
     pass
 
 
+class ExecutorTimeoutError(Exception):
+    pass
+
+
+class CutoffNotFoundError(Exception):
+    pass
+
+
 class PlateExistsError(Exception):
     pass
@@ -2,6 +2,7 @@
 
 import logging
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 from typing import ByteString, Iterable
 
@@ -24,15 +25,23 @@ class GenotypeAnalysis:
 
     The second columns holds the sample IDs
 
+    In read only mode the sheet is streamed row by row instead of being loaded into memory.
     """
 
-    def __init__(self, excel_file: ByteString, file_name: str, include_key: str | None = None):
+    def __init__(
+        self,
+        excel_file: ByteString,
+        file_name: str,
+        include_key: str | None = None,
+        read_only: bool = False,
+    ):
         LOG.info("Loading genotype information from %s", excel_file)
         self.source: str = file_name
-        self.wb: Workbook = openpyxl.load_workbook(filename=excel_file)
+        self.wb: Workbook = openpyxl.load_workbook(filename=excel_file, read_only=read_only)
         self.include_key: str | None = include_key
         self.work_sheet: Worksheet = self.find_sheet(excel_db=self.wb)
         self.header_row: list[str] = self.get_header_cols(self.work_sheet)
+        self.sample_col: int = self.header_row.index("SAMPLE")
         self.snp_start: int = GenotypeAnalysis.find_column(self.header_row, pattern="rs")
         self.sex_start: int = GenotypeAnalysis.find_column(self.header_row, pattern="ZF_")
         self.sex_cols: slice = slice(self.sex_start, self.sex_start + 3)
@@ -40,7 +49,7 @@ class GenotypeAnalysis:
 
     @staticmethod
     def get_header_cols(sheet: Worksheet) -> list[str]:
-        return [col.value for col in sheet[1]]
+        return list(next(sheet.iter_rows(max_row=1, values_only=True)))
 
     @staticmethod
     def find_sheet(excel_db: Workbook, sheet_nr: int = -1) -> Worksheet:
@@ -74,20 +83,21 @@ class GenotypeAnalysis:
     def generate_analyses(self, plate_id: int) -> Iterable[Analysis]:
         """Loop over the rows and create one analysis for each individual"""
         nr_row: int
-        row: list[str]
-        for nr_row, row in enumerate(self.work_sheet.iter_rows()):
-            if nr_row == 0:
-                continue
-            row_values = [cell.value for cell in row]
-            ind_info = dict(zip(self.header_row, row_values))
-            sample_id = GenotypeAnalysis.parse_sample_id(ind_info["SAMPLE"], self.include_key)
+        row_values: tuple
+        for nr_row, row_values in enumerate(
+            self.work_sheet.iter_rows(min_row=2, values_only=True), start=1
+        ):
+            sample_id = GenotypeAnalysis.parse_sample_id(
+                row_values[self.sample_col], self.include_key
+            )
             if not sample_id:
                 LOG.warning("Could not parse sample from row %s", nr_row)
                 continue
 
             sex = GenotypeAnalysis.parse_sex(row_values[self.sex_cols])
             genotypes = [
-                GenotypeAnalysis.build_genotype(rs_id, ind_info[rs_id]) for rs_id in self.rs_numbers
+                GenotypeAnalysis.build_genotype(rs_id, row_value)
+                for rs_id, row_value in zip(self.rs_numbers, row_values[self.snp_start :])
             ]
 
             yield Analysis(
@@ -100,6 +110,22 @@ class GenotypeAnalysis:
                 created_at=datetime.now(),
             )
 
+    @staticmethod
+    def read_analyses(
+        excel_file: bytes, file_name: str, include_key: str | None, plate_id: int | None
+    ) -> list[Analysis]:
+        """Parse all analyses of an Excel file, so that parsing can run in a worker."""
+        excel_parser = GenotypeAnalysis(
+            excel_file=BytesIO(excel_file),
+            file_name=file_name,
+            include_key=include_key,
+            read_only=True,
+        )
+        try:
+            return list(excel_parser.generate_analyses(plate_id=plate_id))
+        finally:
+            excel_parser.wb.close()
+
     @staticmethod
     def build_genotype(rs_id: str, row_value: str) -> Genotype:
         """Build genotype from Excel info."""
@@ -1,14 +1,84 @@
+import codecs
+import zlib
 from pathlib import Path
-from fastapi import HTTPException, status
+from typing import AsyncIterator
 
+from fastapi import HTTPException, UploadFile, status
 
-def check_file(file_path: str, extension: str) -> Path:
+from genotype_api.config import settings
+
+# Window bits of a zlib decompressor reading a gzip header and trailer
+GZIP_WBITS: int = zlib.MAX_WBITS | 16
+
+
+def check_file(file_path: str, extension: str | tuple[str, ...]) -> Path:
     """Check file and file extension"""
 
     file_name: Path = Path(file_path)
     if not file_name.name.endswith(extension):
+        extensions: str = extension if isinstance(extension, str) else " or ".join(extension)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Please select a valid {extension} file for upload",
+            detail=f"Please select a valid {extensions} file for upload",
         )
     return file_name
+
+
+async def read_upload_chunks(file: UploadFile, chunk_size: int) -> AsyncIterator[bytes]:
+    while chunk := await file.read(chunk_size):
+        yield chunk
+
+
+async def decompress_gzip_chunks(
+    chunks: AsyncIterator[bytes], chunk_size: int
+) -> AsyncIterator[bytes]:
+    """Yield the decompressed data of gzip chunks, at most chunk_size bytes at a time.
+
+    Concatenated gzip members, such as the blocks of a BGZF file, are decompressed in turn.
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    try:
+        async for data in chunks:
+            while data:
+                if decompressor.eof:
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+                decompressed: bytes = decompressor.decompress(data, chunk_size)
+                data = decompressor.unconsumed_tail or decompressor.unused_data
+                if decompressed:
+                    yield decompressed
+    except zlib.error as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not decompress the file: {error}",
+        )
+    if not decompressor.eof:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="The compressed file is truncated"
+        )
+
+
+async def read_upload_lines(
+    file: UploadFile,
+    chunk_size: int | None = None,
+    encoding: str = "utf-8",
+    compressed: bool = False,
+) -> AsyncIterator[list[str]]:
+    """Yield the complete text lines of an upload, read one chunk at a time.
+
+    A gzip or BGZF compressed upload is decompressed chunk by chunk. Only a chunk and the line
+    it ends in are held in memory.
+    """
+    chunk_size = chunk_size or settings.upload_chunk_size
+    chunks: AsyncIterator[bytes] = read_upload_chunks(file=file, chunk_size=chunk_size)
+    if compressed:
+        chunks = decompress_gzip_chunks(chunks=chunks, chunk_size=chunk_size)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    partial_line: str = ""
+    async for chunk in chunks:
+        lines: list[str] = (partial_line + decoder.decode(chunk)).split("\n")
+        partial_line = lines.pop()
+        if lines:
+            yield lines
+    partial_line += decoder.decode(b"", final=True)
+    if partial_line:
+        yield [partial_line]
@@ -1,88 +1,142 @@
 """Functions to work with VCF files"""
 
-from typing import Iterable, TextIO
+from typing import Iterable, Iterator
 
-from pydantic import BaseModel
+import numpy as np
 
-from genotype_api.database.models import Analysis
-from genotype_api.database.models import Genotype as DBGenotype
+from genotype_api.database.models import Analysis, Genotype
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    GENOTYPE_CODE_DTYPE,
+    count_calls,
+    pack_alleles,
+    unpack_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
 
-
-class Genotype(BaseModel):
-    sample_id: str
-    allele_1: str
-    allele_2: str
-
-
-class Variant(BaseModel):
-    chrom: str
-    pos: int
-    id: str
-    ref: str
-    alt: str
-    genotypes: list[Genotype]
+ID_COLUMN: int = 2
+FORMAT_COLUMN: int = 8
+FIRST_SAMPLE_COLUMN: int = 9
+GT_FIELD: str = "GT"
+GT_CALL_DTYPE = np.uint32
 
 
 class SequenceAnalysis:
-    """Class for generating analyses from a VCF"""
+    """Class for generating analyses from the lines of a VCF, read once and in order.
+
+    The lines can be fed a chunk at a time. Each distinct GT field is parsed once into its
+    alleles, and the genotype calls of each variant are stored as indexes of the parsed GT
+    fields, one column of a samples by variants array. Packed allele codes and genotype rows
+    with the parsed alleles are only built from the array.
+    """
 
-    def __init__(self, vcf_file: TextIO, source: str):
-        self.vcf = vcf_file
+    def __init__(self, source: str, vcf_file: str | None = None):
         self.source = source
         self.header = []
-        self.set_header()
-        self.sample_ids = self.header[9:]
-        self.header_columns = [col.lower() for col in self.header[:8]]
-
-    def set_header(self) -> None:
-        for line in self.vcf.split("\n"):
+        self.sample_ids = []
+        self.rs_numbers: list[str] = []
+        self.variant_calls: list[np.ndarray] = []
+        self._gt_indexes: dict[str, int] = {}
+        self._gt_calls: dict[str, int] = {}
+        self._gt_alleles: list[tuple[str, str]] = []
+        if vcf_file is not None:
+            self.read_lines(vcf_file.split("\n"))
+
+    def set_header(self, line: str) -> None:
+        self.header = line[1:].split("\t")
+        self.sample_ids = self.header[FIRST_SAMPLE_COLUMN:]
+
+    def read_lines(self, lines: Iterable[str]) -> None:
+        """Read the next lines of the VCF, the header line before any variant."""
+        for line in lines:
             if line.startswith("##"):
                 continue
-            if not len(line) > 10:
-                continue
             line = line.rstrip()
+            if len(line) < 10:
+                continue
             if line.startswith("#"):
-                self.header = line[1:].split("\t")
-                return
-
-    def generate_analyses(self) -> Iterable[Analysis]:
-        analyses: dict[str, Analysis] = {
-            sample_id: Analysis(type="sequence", source=self.source, sample_id=sample_id)
-            for sample_id in self.sample_ids
-        }
-
-        variant_object: Variant
-        for variant_object in self.generate_variants():
-            gt_info: Genotype
-            for gt_info in variant_object.genotypes:
-                db_genotype = DBGenotype(
-                    rsnumber=variant_object.id,
-                    allele_1=gt_info.allele_1,
-                    allele_2=gt_info.allele_2,
+                self.set_header(line)
+                continue
+            self.add_variant(line.split("\t"))
+
+    def add_variant(self, fields: list[str]) -> None:
+        """Add the parsed GT field of each sample call as a variant column."""
+        gt_index: int = self._get_gt_index(fields[FORMAT_COLUMN])
+        calls: list[str] = fields[FIRST_SAMPLE_COLUMN:]
+        self.rs_numbers.append(fields[ID_COLUMN])
+        self.variant_calls.append(
+            np.fromiter(
+                (self._get_gt_call(call.split(":", gt_index + 1)[gt_index]) for call in calls),
+                dtype=GT_CALL_DTYPE,
+                count=len(calls),
+            )
+        )
+
+    def _get_gt_index(self, format_field: str) -> int:
+        if format_field not in self._gt_indexes:
+            self._gt_indexes[format_field] = format_field.split(":").index(GT_FIELD)
+        return self._gt_indexes[format_field]
+
+    def _get_gt_call(self, gt: str) -> int:
+        if gt not in self._gt_calls:
+            allele_1, allele_2 = gt.replace("|", "/").split("/")
+            self._gt_calls[gt] = len(self._gt_alleles)
+            self._gt_alleles.append((allele_1, allele_2))
+        return self._gt_calls[gt]
+
+    def get_calls(self) -> np.ndarray:
+        """Return the indexes of the parsed GT fields of the samples by variants read so far."""
+        if not self.variant_calls:
+            return np.empty((len(self.sample_ids), 0), dtype=GT_CALL_DTYPE)
+        return np.stack(self.variant_calls, axis=1)
+
+    def get_allele_codes(self) -> np.ndarray:
+        """Return the packed alleles of the samples by variants read so far."""
+        packed_alleles = np.fromiter(
+            (pack_alleles(allele_1, allele_2) for allele_1, allele_2 in self._gt_alleles),
+            dtype=GENOTYPE_CODE_DTYPE,
+            count=len(self._gt_alleles),
+        )
+        return packed_alleles[self.get_calls()]
+
+    def generate_analyses(
+        self, panel: SNPPanel | None = None, with_genotypes: bool = True
+    ) -> Iterable[Analysis]:
+        """Return an analysis per sample with its call counts, its packed genotypes when given a
+        panel and its genotype rows unless left for generate_genotype_rows."""
+        allele_codes: np.ndarray = self.get_allele_codes()
+        genotype_codes: np.ndarray = unpack_genotype_codes(allele_codes)
+        analyses: dict[str, Analysis] = {}
+        for sample_id, sample_alleles, sample_codes in zip(
+            self.sample_ids, allele_codes, genotype_codes
+        ):
+            known, unknown = count_calls(sample_codes)
+            analyses[sample_id] = Analysis(
+                type="sequence",
+                source=self.source,
+                sample_id=sample_id,
+                genotype_blob=(
+                    panel.pack_allele_codes(
+                        rsnumbers=self.rs_numbers, packed_alleles=sample_alleles
+                    )
+                    if panel is not None
+                    else None
+                ),
+                known_calls=known,
+                unknown_calls=unknown,
+                call_rate=known / (known + unknown) if known + unknown else None,
+            )
+        if with_genotypes:
+            for index, rsnumber, allele_1, allele_2 in self.generate_genotype_rows():
+                analyses[self.sample_ids[index]].genotypes.append(
+                    Genotype(rsnumber=rsnumber, allele_1=allele_1, allele_2=allele_2)
                 )
-                analyses[gt_info.sample_id].genotypes.append(db_genotype)
         return [analysis for analysis in analyses.values()]
 
-    def generate_variants(self) -> Iterable[Variant]:
-        for line in self.vcf.split("\n"):
-            if line.startswith("#"):
-                continue
-            if len(line) < 10:
-                continue
-            line = line.rstrip()
-            variant_line = line.split("\t")
-            variant_info = dict(zip(self.header_columns, variant_line))
-            gt_info: list[str] = [gt_call.split(":")[0] for gt_call in variant_line[9:]]
-
-            variant_info["genotypes"] = self.variant_genotypes(gt_info=gt_info)
-            yield Variant(**variant_info)
-
-    def variant_genotypes(self, gt_info: list[str]) -> Iterable[dict]:
-        """Build Genotype objects from vcf information."""
-        for sample_id, bases in zip(self.sample_ids, gt_info):
-            bases = bases.replace("|", "/")
-            allele_1, allele_2 = bases.split("/")
-            yield {"sample_id": sample_id, "allele_1": allele_1, "allele_2": allele_2}
+    def generate_genotype_rows(self) -> Iterator[tuple[int, str, str, str]]:
+        """Yield the sample index, rsnumber and parsed alleles of each call, sample by sample."""
+        for index, sample_calls in enumerate(self.get_calls()):
+            for rsnumber, call in zip(self.rs_numbers, sample_calls.tolist()):
+                yield index, rsnumber, *self._gt_alleles[call]
 
 
 if __name__ == "__main__":
@@ -91,7 +145,7 @@ if __name__ == "__main__":
     vcf = "../tests/fixtures/vcfs/sequence.vcf"
     vcf_path = Path(vcf)
     with open(vcf, "r") as infile:
-        file_obj = infile.read()
-        sequence_obj = SequenceAnalysis(file_obj, source=vcf_path.name)
+        sequence_obj = SequenceAnalysis(source=vcf_path.name)
+        sequence_obj.read_lines(infile)
         for analysis in sequence_obj.generate_analyses():
             print(analysis)
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, validator
 
 
@@ -52,3 +54,61 @@ class MatchCounts(BaseModel):
 class MatchResult(BaseModel):
     sample_id: str
     match_results: MatchCounts | None = None
+
+
+class MatchCacheStats(BaseModel):
+    hits: int
+    misses: int
+    size: int
+
+
+class ApproximateMatchStats(BaseModel):
+    queries: int
+    validated: int
+    mean_recall: float | None = None
+    mean_approximate_ms: float | None = None
+    mean_exact_ms: float | None = None
+
+
+class StatusReevaluationProgress(BaseModel):
+    cutoff_version: int | None = None
+    running: bool = False
+    total: int = 0
+    done: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+
+
+class RelatednessResult(BaseModel):
+    sample_id: str
+    compared: int
+    ibs0: float
+    ibs1: float
+    ibs2: float
+    shared_alleles: float
+
+
+class PlateKinship(BaseModel):
+    plate_id: int
+    sample_ids: list[str]
+    shared_alleles: list[list[float | None]]
+    ibs0: list[list[float | None]]
+
+
+class SampleMatches(BaseModel):
+    sample_id: str
+    matches: list[MatchResult] = []
+
+
+class SampleSwap(BaseModel):
+    sample_id: str
+    matched_sample_id: str
+    match_results: MatchCounts
+    own_match_results: MatchCounts | None = None
+
+
+class PlateSwapReport(BaseModel):
+    plate_id: int
+    screened: int = 0
+    swaps: list[SampleSwap] = []
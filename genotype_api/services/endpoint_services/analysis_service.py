@@ -2,22 +2,34 @@
 
 from pathlib import Path
 
+import numpy as np
 from fastapi import UploadFile
 
+from genotype_api.config import settings
 from genotype_api.constants import FileExtension, Types
 from genotype_api.database.models import Analysis
 from genotype_api.dto.analysis import AnalysisResponse
+from genotype_api.dto.genotype import GenotypeResponse
 from genotype_api.exceptions import AnalysisNotFoundError
-from genotype_api.file_parsing.files import check_file
+from genotype_api.file_parsing.files import check_file, read_upload_lines
 from genotype_api.file_parsing.vcf import SequenceAnalysis
 from genotype_api.services.endpoint_services.base_service import BaseService
+from genotype_api.services.match_genotype_service.fingerprint_index import fingerprint_index
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    get_analysis_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.match_cache import match_cache
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.status_service.refresh_worker import status_refresh_worker
 
 
 class AnalysisService(BaseService):
     """This service acts as a translational layer between the CRUD and the API."""
 
     @staticmethod
-    def _create_analysis_response(analysis: Analysis) -> AnalysisResponse:
+    def _create_analysis_response(
+        analysis: Analysis, genotypes: list[GenotypeResponse] | None = None
+    ) -> AnalysisResponse:
         return AnalysisResponse(
             type=analysis.type,
             source=analysis.source,
@@ -26,14 +38,19 @@ class AnalysisService(BaseService):
             sample_id=analysis.sample_id,
             plate_id=analysis.plate_id,
             id=analysis.id,
-            genotypes=analysis.genotypes,
+            call_rate=analysis.call_rate,
+            genotypes=genotypes,
         )
 
     async def get_analysis(self, analysis_id: int) -> AnalysisResponse:
         analysis: Analysis = await self.store.get_analysis_by_id(analysis_id=analysis_id)
         if not analysis:
             raise AnalysisNotFoundError
-        return self._create_analysis_response(analysis)
+        await self.store.load_unpacked_genotypes([analysis])
+        panel: SNPPanel = await self.get_snp_panel()
+        return self._create_analysis_response(
+            analysis=analysis, genotypes=panel.get_genotypes(analysis)
+        )
 
     async def get_analyses(self, skip: int, limit: int) -> list[AnalysisResponse]:
         analyses: list[Analysis] = await self.store.get_analyses_with_skip_and_limit(
@@ -46,18 +63,37 @@ class AnalysisService(BaseService):
     async def get_upload_sequence_analyses(self, file: UploadFile) -> list[AnalysisResponse]:
         """
         Reading VCF file, creating and uploading sequence analyses and sample objects to the database.
+        Without SNPs, the genotypes are stored unpacked, like those of plates.
         """
-        file_name: Path = check_file(file_path=file.filename, extension=FileExtension.VCF)
-        content = await file.file.read()
-        sequence_analysis = SequenceAnalysis(
-            vcf_file=content.decode("utf-8"), source=str(file_name)
+        file_name: Path = check_file(
+            file_path=file.filename, extension=(FileExtension.VCF, FileExtension.VCF_GZ)
+        )
+        sequence_analysis = SequenceAnalysis(source=str(file_name))
+        async for lines in read_upload_lines(
+            file=file, compressed=file_name.name.endswith(FileExtension.VCF_GZ)
+        ):
+            sequence_analysis.read_lines(lines)
+        panel: SNPPanel = await self.get_snp_panel()
+        analyses: list[Analysis] = list(
+            sequence_analysis.generate_analyses(panel=panel, with_genotypes=not len(panel))
+        )
+        genotype_codes = [
+            get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+        ]
+        await self.store.create_analyses_with_genotypes(
+            analyses=analyses,
+            analysis_type=Types.SEQUENCE,
+            genotype_rows=sequence_analysis.generate_genotype_rows() if len(panel) else None,
         )
-        analyses: list[Analysis] = list(sequence_analysis.generate_analyses())
-        await self.store.check_analyses_objects(analyses=analyses, analysis_type=Types.SEQUENCE)
-        await self.store.create_analyses_samples(analyses=analyses)
-        for analysis in analyses:
-            analysis: Analysis = await self.store.create_analysis(analysis=analysis)
-            await self.store.refresh_sample_status(sample=analysis.sample)
+        status_refresh_worker.notify()
+        fingerprint_index.add_analyses(analyses=analyses, genotype_codes=genotype_codes)
+        match_cache.invalidate_analyses(analyses)
+        if settings.use_match_table:
+            await self.create_matches(
+                analysis_ids=np.array([analysis.id for analysis in analyses], dtype=np.int64),
+                genotype_codes=genotype_codes,
+                comparison_set=Types.GENOTYPE,
+            )
 
         return [self._create_analysis_response(analysis) for analysis in analyses]
 
@@ -66,3 +102,6 @@ class AnalysisService(BaseService):
         if not analysis:
             raise AnalysisNotFoundError
         await self.store.delete_analysis(analysis=analysis)
+        await self.mark_samples_status_dirty(sample_ids=[analysis.sample_id])
+        fingerprint_index.remove_analyses(analysis_ids=[analysis_id])
+        match_cache.invalidate_analyses([analysis])
@@ -1,8 +1,190 @@
 """Module for the endpoint service."""
 
+from datetime import date
+from typing import AsyncIterator
+
+import numpy as np
+from sqlalchemy import Row
+
+from genotype_api.config import settings
+from genotype_api.constants import Types
+from genotype_api.database.models import Analysis, Match
 from genotype_api.database.store import Store
+from genotype_api.services.executor_service.executor import executor_service
+from genotype_api.services.match_genotype_service.fingerprint_index import fingerprint_index
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    count_calls,
+    encode_genotypes,
+    get_analysis_genotype_codes,
+    get_packed_genotype_codes,
+    stack_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.match_genotype import (
+    MatchGenotypeService,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.status_service.refresh_worker import status_refresh_worker
 
 
 class BaseService:
     def __init__(self, store: Store):
         self.store: Store = store
+
+    async def get_snp_panel(self) -> SNPPanel:
+        return SNPPanel.from_snps(await self.store.get_snps())
+
+    async def mark_samples_status_dirty(self, sample_ids: list[str]) -> None:
+        """Flag the statuses of the samples for a refresh by the background worker."""
+        await self.store.mark_samples_status_dirty(sample_ids=sample_ids)
+        status_refresh_worker.notify()
+
+    @staticmethod
+    def set_call_counts(analyses: list[Analysis]) -> None:
+        """Set the known and unknown call counts and the call rate of new analyses."""
+        for analysis in analyses:
+            known, unknown = count_calls(encode_genotypes(analysis.genotypes))
+            analysis.known_calls = known
+            analysis.unknown_calls = unknown
+            analysis.call_rate = known / (known + unknown) if known + unknown else None
+
+    async def get_analysis_codes(self, sample_id: str, analysis_type: Types) -> np.ndarray | None:
+        """Return the genotype codes of the analysis of a sample, None if there is none."""
+        if fingerprint_index.is_loaded:
+            return fingerprint_index.get_analysis_codes(
+                sample_id=sample_id, analysis_type=analysis_type
+            )
+        analysis: Analysis = await self.store.get_analysis_by_type_and_sample_id(
+            sample_id=sample_id, analysis_type=analysis_type
+        )
+        if not analysis:
+            return None
+        return get_analysis_genotype_codes(analysis=analysis, panel=await self.get_snp_panel())
+
+    async def get_analyses_codes(
+        self, sample_ids: list[str], analysis_type: Types
+    ) -> dict[str, np.ndarray]:
+        """Return the genotype codes of the analyses of the samples, by sample id."""
+        if fingerprint_index.is_loaded:
+            return fingerprint_index.get_analyses_codes(
+                sample_ids=sample_ids, analysis_type=analysis_type
+            )
+        analyses: list[Analysis] = await self.store.get_analyses_by_type_and_sample_ids(
+            sample_ids=sample_ids, analysis_type=analysis_type
+        )
+        panel: SNPPanel = await self.get_snp_panel()
+        return {
+            analysis.sample_id: get_analysis_genotype_codes(analysis=analysis, panel=panel)
+            for analysis in analyses
+        }
+
+    async def get_comparison_codes(
+        self, analysis_type: Types, date_min: date, date_max: date
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the sample ids and genotype codes of the analyses of a type between dates.
+
+        The fingerprint index is used when it is loaded, otherwise the analyses are read from the
+        database.
+        """
+        if fingerprint_index.is_loaded:
+            return fingerprint_index.get_analyses_between_dates(
+                analysis_type=analysis_type, date_min=date_min, date_max=date_max
+            )
+        analyses: list[Analysis] = await self.store.get_analyses_by_type_between_dates(
+            analysis_type=analysis_type, date_min=date_min, date_max=date_max
+        )
+        panel: SNPPanel = await self.get_snp_panel()
+        codes: list[np.ndarray] = [
+            get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+        ]
+        sample_ids = np.array([analysis.sample_id for analysis in analyses], dtype=object)
+        return sample_ids, stack_genotype_codes(
+            codes=codes, width=max((len(analysis_codes) for analysis_codes in codes), default=0)
+        )
+
+    async def iter_comparison_codes(
+        self, analysis_type: Types, date_min: date, date_max: date
+    ) -> AsyncIterator[tuple[np.ndarray, np.ndarray]]:
+        """Yield the sample ids and genotype codes of the analyses of a type between dates in chunks.
+
+        Without the fingerprint index, the analyses are streamed from the database, so that memory
+        does not grow with the date range. Analyses without packed genotypes are read by id after
+        the stream.
+        """
+        chunk_size: int = settings.match_scan_chunk_size
+        if fingerprint_index.is_loaded:
+            sample_ids, codes = fingerprint_index.get_analyses_between_dates(
+                analysis_type=analysis_type, date_min=date_min, date_max=date_max
+            )
+            for start in range(0, len(sample_ids), chunk_size):
+                yield sample_ids[start : start + chunk_size], codes[start : start + chunk_size]
+            return
+        unpacked_analysis_ids: list[int] = []
+        async for rows in self.store.stream_packed_analyses_by_type_between_dates(
+            analysis_type=analysis_type, date_min=date_min, date_max=date_max, chunk_size=chunk_size
+        ):
+            packed_rows: list[Row] = [row for row in rows if row.genotype_blob is not None]
+            unpacked_analysis_ids.extend(row.id for row in rows if row.genotype_blob is None)
+            if packed_rows:
+                yield np.array([row.sample_id for row in packed_rows], dtype=object), np.array(
+                    [get_packed_genotype_codes(row.genotype_blob) for row in packed_rows]
+                )
+        panel: SNPPanel = await self.get_snp_panel()
+        for start in range(0, len(unpacked_analysis_ids), chunk_size):
+            analyses: list[Analysis] = await self.store.get_analyses_by_ids(
+                unpacked_analysis_ids[start : start + chunk_size]
+            )
+            codes: list[np.ndarray] = [
+                get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+            ]
+            yield np.array([analysis.sample_id for analysis in analyses], dtype=object), (
+                stack_genotype_codes(
+                    codes=codes, width=max(len(analysis_codes) for analysis_codes in codes)
+                )
+            )
+
+    async def get_type_codes(self, analysis_type: Types) -> tuple[np.ndarray, np.ndarray]:
+        """Return the analysis ids and genotype codes of all analyses of a type."""
+        if fingerprint_index.is_loaded:
+            return fingerprint_index.get_analyses_by_type(analysis_type)
+        analyses: list[Analysis] = await self.store.get_analyses_by_type(analysis_type)
+        panel: SNPPanel = await self.get_snp_panel()
+        codes: list[np.ndarray] = [
+            get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+        ]
+        analysis_ids = np.array([analysis.id for analysis in analyses], dtype=np.int64)
+        return analysis_ids, stack_genotype_codes(
+            codes=codes, width=max((len(analysis_codes) for analysis_codes in codes), default=0)
+        )
+
+    async def create_matches(
+        self,
+        analysis_ids: np.ndarray,
+        genotype_codes: list[np.ndarray],
+        comparison_set: Types,
+    ) -> None:
+        """Store the top matches between the analyses and the analyses of the comparison set."""
+        candidate_analysis_ids, candidate_codes = await self.get_type_codes(comparison_set)
+        matches: list[Match] = await self.get_top_matches(
+            analysis_ids=analysis_ids,
+            genotype_codes=genotype_codes,
+            candidate_analysis_ids=candidate_analysis_ids,
+            candidate_codes=candidate_codes,
+        )
+        await self.store.create_matches(matches)
+
+    @staticmethod
+    async def get_top_matches(
+        analysis_ids: np.ndarray,
+        genotype_codes: list[np.ndarray],
+        candidate_analysis_ids: np.ndarray,
+        candidate_codes: np.ndarray,
+    ) -> list[Match]:
+        """Return the top matches between the analyses and the candidate analyses."""
+        return await executor_service.run(
+            MatchGenotypeService.get_top_match_pairs,
+            analysis_ids=analysis_ids,
+            codes=genotype_codes,
+            candidate_analysis_ids=candidate_analysis_ids,
+            candidate_codes=candidate_codes,
+            top_k=settings.match_table_top_k,
+        )
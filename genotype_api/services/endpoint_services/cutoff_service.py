@@ -0,0 +1,46 @@
+"""Module to hold the cutoff service."""
+
+from genotype_api.database.models import Cutoff
+from genotype_api.dto.cutoff import CutoffCreate, CutoffResponse
+from genotype_api.exceptions import CutoffNotFoundError
+from genotype_api.models import StatusReevaluationProgress
+from genotype_api.services.endpoint_services.base_service import BaseService
+from genotype_api.services.status_service.reevaluation import status_reevaluation
+
+
+class CutoffService(BaseService):
+
+    @staticmethod
+    def _get_cutoff_response(cutoff: Cutoff) -> CutoffResponse:
+        return CutoffResponse(
+            id=cutoff.id,
+            max_nocalls=cutoff.max_nocalls,
+            max_mismatch=cutoff.max_mismatch,
+            min_matches=cutoff.min_matches,
+            created_at=cutoff.created_at,
+        )
+
+    async def get_cutoffs(self) -> list[CutoffResponse]:
+        cutoffs: list[Cutoff] = await self.store.get_cutoffs()
+        return [self._get_cutoff_response(cutoff) for cutoff in cutoffs]
+
+    async def get_current_cutoff(self) -> CutoffResponse:
+        cutoff: Cutoff | None = await self.store.get_current_cutoff()
+        if not cutoff:
+            raise CutoffNotFoundError
+        return self._get_cutoff_response(cutoff)
+
+    async def create_cutoff(self, cutoff_create: CutoffCreate) -> CutoffResponse:
+        """Add a new cutoff version and re-evaluate the sample statuses in the background."""
+        cutoff: Cutoff = await self.store.create_cutoff(cutoff=Cutoff(**cutoff_create.model_dump()))
+        status_reevaluation.start()
+        return self._get_cutoff_response(cutoff)
+
+    @staticmethod
+    def start_reevaluation() -> StatusReevaluationProgress:
+        status_reevaluation.start()
+        return status_reevaluation.progress
+
+    @staticmethod
+    def get_reevaluation_progress() -> StatusReevaluationProgress:
+        return status_reevaluation.progress
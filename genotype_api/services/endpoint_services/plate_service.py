@@ -1,21 +1,49 @@
 """Module to holds the plate service."""
 
 import logging
-from datetime import datetime
-from io import BytesIO
+from collections import Counter
+from datetime import date, datetime
 from pathlib import Path
 
+import numpy as np
 from fastapi import UploadFile
 from pydantic import EmailStr
+from sqlalchemy import Row
 
-from genotype_api.constants import Types
+from genotype_api.config import settings
+from genotype_api.constants import Status, Types
 from genotype_api.database.filter_models.plate_models import PlateOrderParams, PlateSignOff
-from genotype_api.database.models import Analysis, Plate, Sample, User
-from genotype_api.dto.plate import AnalysisOnPlate, PlateResponse, SampleStatus, UserOnPlate
+from genotype_api.database.models import Analysis, Plate, User
+from genotype_api.dto.plate import (
+    AnalysisOnPlate,
+    PlateResponse,
+    PlateStatusCounts,
+    SampleStatus,
+    UserOnPlate,
+)
 from genotype_api.exceptions import PlateExistsError, PlateNotFoundError, UserNotFoundError
 from genotype_api.file_parsing.excel import GenotypeAnalysis
 from genotype_api.file_parsing.files import check_file
+from genotype_api.models import PlateKinship, PlateSwapReport, SampleSwap
 from genotype_api.services.endpoint_services.base_service import BaseService
+from genotype_api.services.executor_service.executor import executor_service
+from genotype_api.services.match_genotype_service.fingerprint_index import fingerprint_index
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    get_analysis_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.match_cache import match_cache
+from genotype_api.services.match_genotype_service.match_genotype import (
+    MatchGenotypeService,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.status_service.refresh_worker import status_refresh_worker
+
+STATUS_COUNT_FIELDS: dict[Status | None, str] = {
+    Status.PASS: "passed",
+    Status.FAIL: "failed",
+    Status.CANCEL: "cancelled",
+    None: "unknown",
+}
 
 
 class PlateService(BaseService):
@@ -26,7 +54,9 @@ class PlateService(BaseService):
         for analysis in plate.analyses:
             if analysis:
                 sample_status = SampleStatus(
-                    status=analysis.sample.status, comment=analysis.sample.comment
+                    status=analysis.sample.status,
+                    comment=analysis.sample.comment,
+                    status_pending=bool(analysis.sample.status_dirty),
                 )
                 analysis_response = AnalysisOnPlate(
                     type=analysis.type,
@@ -36,6 +66,7 @@ class PlateService(BaseService):
                     sample_id=analysis.sample_id,
                     plate_id=analysis.plate_id,
                     id=analysis.id,
+                    call_rate=analysis.call_rate,
                     sample=sample_status,
                 )
                 analyses_response.append(analysis_response)
@@ -47,8 +78,15 @@ class PlateService(BaseService):
             return UserOnPlate(email=user.email, name=user.name, id=user.id)
         return None
 
-    async def _create_plate_response(self, plate: Plate) -> PlateResponse:
-        analyses_response: list[AnalysisOnPlate] = self._get_analyses_on_plate(plate)
+    async def _create_plate_response(
+        self,
+        plate: Plate,
+        with_analyses: bool = True,
+        plate_status_counts: PlateStatusCounts | None = None,
+    ) -> PlateResponse:
+        analyses_response: list[AnalysisOnPlate] | None = (
+            self._get_analyses_on_plate(plate) if with_analyses else None
+        )
         user: UserOnPlate = await self._get_plate_user(plate)
         return PlateResponse(
             created_at=plate.created_at,
@@ -60,6 +98,7 @@ class PlateService(BaseService):
             id=plate.id,
             user=user,
             analyses=analyses_response,
+            plate_status_counts=plate_status_counts,
         )
 
     @staticmethod
@@ -74,25 +113,33 @@ class PlateService(BaseService):
         if db_plate:
             raise PlateExistsError
 
-        excel_parser = GenotypeAnalysis(
-            excel_file=BytesIO(file.file.read()),
+        analyses: list[Analysis] = await executor_service.run(
+            GenotypeAnalysis.read_analyses,
+            excel_file=file.file.read(),
             file_name=str(file_name),
             include_key="-CG-",
+            plate_id=None,
         )
 
-        plate_obj = Plate(plate_id=plate_id)
-        plate: Plate = await self.store.create_plate(plate=plate_obj)
-        new_plate: Plate = await self.store.get_plate_by_plate_id(plate_id=plate_id)
-        analyses: list[Analysis] = list(excel_parser.generate_analyses(plate_id=new_plate.id))
-        await self.store.check_analyses_objects(analyses=analyses, analysis_type=Types.GENOTYPE)
-        await self.store.create_analyses_samples(analyses=analyses)
-        for analysis in analyses:
-            await self.store.create_analysis(analysis=analysis)
-        plate_obj.analyses = analyses
+        panel: SNPPanel = await self.get_snp_panel()
         for analysis in analyses:
-            sample: Sample = await self.store.get_sample_by_id(sample_id=analysis.sample_id)
-            await self.store.refresh_sample_status(sample=sample)
-        await self.store.refresh_plate(plate=plate)
+            analysis.genotype_blob = panel.pack_genotypes(analysis.genotypes)
+        self.set_call_counts(analyses)
+        genotype_codes = [
+            get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+        ]
+        await self.store.create_plate_with_analyses(
+            plate=Plate(plate_id=plate_id), analyses=analyses, analysis_type=Types.GENOTYPE
+        )
+        status_refresh_worker.notify()
+        fingerprint_index.add_analyses(analyses=analyses, genotype_codes=genotype_codes)
+        match_cache.invalidate_analyses(analyses)
+        if settings.use_match_table:
+            await self.create_matches(
+                analysis_ids=np.array([analysis.id for analysis in analyses], dtype=np.int64),
+                genotype_codes=genotype_codes,
+                comparison_set=Types.SEQUENCE,
+            )
 
     async def update_plate_sign_off(
         self, plate_id: int, user_email: EmailStr, method_document: str, method_version: str
@@ -120,11 +167,45 @@ class PlateService(BaseService):
 
         return await self._create_plate_response(plate)
 
-    async def get_plates(self, order_params: PlateOrderParams) -> list[PlateResponse]:
+    async def get_plates(
+        self, order_params: PlateOrderParams, with_status_counts: bool = True
+    ) -> list[PlateResponse]:
+        """Return the ordered plates without their analyses, with their status counts if asked."""
         plates: list[Plate] = await self.store.get_ordered_plates(order_params=order_params)
         if not plates:
             raise PlateNotFoundError
-        return [await self._create_plate_response(plate) for plate in plates]
+        plates_status_counts: dict[int, PlateStatusCounts] = (
+            await self.get_plates_status_counts(plate_ids=[plate.id for plate in plates])
+            if with_status_counts
+            else {}
+        )
+        return [
+            await self._create_plate_response(
+                plate, with_analyses=False, plate_status_counts=plates_status_counts.get(plate.id)
+            )
+            for plate in plates
+        ]
+
+    async def get_plate_status_counts(self, plate_id: int) -> PlateStatusCounts:
+        plate: Plate = await self.store.get_plate_by_id(plate_id=plate_id)
+        if not plate:
+            raise PlateNotFoundError
+        plates_status_counts = await self.get_plates_status_counts(plate_ids=[plate_id])
+        return plates_status_counts.get(plate_id, PlateStatusCounts())
+
+    async def get_plates_status_counts(self, plate_ids: list[int]) -> dict[int, PlateStatusCounts]:
+        """Return the sample status counts of the plates with analyses, counted in the database."""
+        counts: dict[int, Counter] = {}
+        rows: list[Row] = await self.store.get_plate_status_counts(plate_ids=plate_ids)
+        for plate_id, sample_status, total, commented in rows:
+            plate_counts: Counter = counts.setdefault(plate_id, Counter())
+            plate_counts["total"] += total
+            plate_counts["commented"] += commented
+            if sample_status in STATUS_COUNT_FIELDS:
+                plate_counts[STATUS_COUNT_FIELDS[sample_status]] += total
+        return {
+            plate_id: PlateStatusCounts(**plate_counts) for plate_id, plate_counts in counts.items()
+        }
 
     async def delete_plate(self, plate_id) -> list[int]:
         """Delete a plate with the given plate id and return associated analysis ids."""
@@ -136,4 +217,56 @@ class PlateService(BaseService):
         for analysis in analyses:
             await self.store.delete_analysis(analysis=analysis)
         await self.store.delete_plate(plate=plate)
+        await self.mark_samples_status_dirty(
+            sample_ids=[analysis.sample_id for analysis in analyses]
+        )
+        fingerprint_index.remove_analyses(analysis_ids=analysis_ids)
+        match_cache.invalidate_analyses(analyses)
         return analysis_ids
+
+    async def get_swap_report(
+        self, plate_id: int, date_min: date, date_max: date
+    ) -> PlateSwapReport:
+        """Screen the genotype analyses on a plate against all sequence analyses between dates."""
+        plate: Plate = await self.store.get_plate_by_id(plate_id=plate_id)
+        if not plate:
+            raise PlateNotFoundError
+        analyses: list[Analysis] = await self.store.get_analyses_by_plate_id(plate_id=plate_id)
+        panel: SNPPanel = await self.get_snp_panel()
+        candidate_sample_ids, candidate_codes = await self.get_comparison_codes(
+            analysis_type=Types.SEQUENCE, date_min=date_min, date_max=date_max
+        )
+        swaps: list[SampleSwap] = await executor_service.run(
+            MatchGenotypeService.get_sample_swaps,
+            sample_ids=np.array([analysis.sample_id for analysis in analyses], dtype=object),
+            codes=[
+                get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+            ],
+            candidate_sample_ids=candidate_sample_ids,
+            candidate_codes=candidate_codes,
+        )
+        return PlateSwapReport(plate_id=plate_id, screened=len(analyses), swaps=swaps)
+
+    async def get_kinship(self, plate_id: int) -> PlateKinship:
+        """Return the kinship matrices of the genotype analyses on a plate."""
+        plate: Plate = await self.store.get_plate_by_id(plate_id=plate_id)
+        if not plate:
+            raise PlateNotFoundError
+        analyses: list[Analysis] = await self.store.get_analyses_by_plate_id(plate_id=plate_id)
+        panel: SNPPanel = await self.get_snp_panel()
+        shared_alleles, ibs0 = await executor_service.run(
+            MatchGenotypeService.get_kinship,
+            codes=[
+                get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+            ],
+        )
+        return PlateKinship(
+            plate_id=plate_id,
+            sample_ids=[analysis.sample_id for analysis in analyses],
+            shared_alleles=self._get_matrix_values(shared_alleles),
+            ibs0=self._get_matrix_values(ibs0),
+        )
+
+    @staticmethod
+    def _get_matrix_values(matrix: np.ndarray) -> list[list[float | None]]:
+        return np.where(np.isnan(matrix), None, matrix.round(4)).tolist()
@@ -1,60 +1,89 @@
 """Module for the sample service."""
 
+import logging
+import time
 from datetime import date
-from typing import Literal
+from typing import AsyncIterator, Literal
 
-from genotype_api.constants import Sexes, Types
+import numpy as np
+
+from genotype_api.config import settings
+from genotype_api.constants import CUTOFS, Sexes, Types
 from genotype_api.database.filter_models.sample_models import (
     SampleFilterParams,
     SampleSexesUpdate,
 )
-from genotype_api.database.models import Analysis, Sample
+from genotype_api.database.models import Analysis, Cutoff, Match, Sample
 from genotype_api.dto.genotype import GenotypeResponse
-from genotype_api.dto.sample import AnalysisOnSample, SampleCreate, SampleResponse
+from genotype_api.dto.sample import (
+    AnalysisOnSample,
+    SampleCreate,
+    SampleMatchRequest,
+    SampleResponse,
+)
 from genotype_api.exceptions import SampleNotFoundError
-from genotype_api.models import MatchResult, SampleDetail
+from genotype_api.models import (
+    ApproximateMatchStats,
+    MatchCacheStats,
+    MatchCounts,
+    MatchResult,
+    RelatednessResult,
+    SampleDetail,
+    SampleMatches,
+)
 from genotype_api.services.endpoint_services.base_service import BaseService
+from genotype_api.services.executor_service.executor import executor_service
+from genotype_api.services.match_genotype_service.fingerprint_index import fingerprint_index
+from genotype_api.services.match_genotype_service.match_cache import (
+    MatchCacheKey,
+    match_cache,
+)
 from genotype_api.services.match_genotype_service.match_genotype import (
     MatchGenotypeService,
 )
+from genotype_api.services.match_genotype_service.match_metrics import (
+    approximate_match_metrics,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.status_service.refresh_worker import status_refresh_worker
+from genotype_api.services.status_service.sample_status import SampleStatusService
+
+LOG = logging.getLogger(__name__)
 
 
 class SampleService(BaseService):
 
     @staticmethod
-    def _get_genotype_on_analysis(analysis: Analysis) -> list[GenotypeResponse] | None:
-        genotypes: list[GenotypeResponse] = []
-        if not analysis.genotypes:
-            return None
-        for genotype_on_analysis in analysis.genotypes:
-            genotype = GenotypeResponse(
-                rsnumber=genotype_on_analysis.rsnumber,
-                analysis_id=genotype_on_analysis.analysis_id,
-                allele_1=genotype_on_analysis.allele_1,
-                allele_2=genotype_on_analysis.allele_2,
-            )
-            genotypes.append(genotype)
-        return genotypes
+    def _get_genotype_on_analysis(
+        analysis: Analysis, panel: SNPPanel
+    ) -> list[GenotypeResponse] | None:
+        genotypes: list[GenotypeResponse] = panel.get_genotypes(analysis)
+        return genotypes if genotypes else None
 
-    def _get_analyses_on_sample(self, sample: Sample) -> list[AnalysisOnSample] | None:
+    def _get_analyses_on_sample(
+        self, sample: Sample, panel: SNPPanel
+    ) -> list[AnalysisOnSample] | None:
         analyses: list[AnalysisOnSample] = []
         if not sample.analyses:
             return None
         for analysis in sample.analyses:
-            genotypes: list[GenotypeResponse] = self._get_genotype_on_analysis(analysis)
+            genotypes: list[GenotypeResponse] = self._get_genotype_on_analysis(
+                analysis=analysis, panel=panel
+            )
             analysis_on_sample = AnalysisOnSample(
                 type=analysis.type,
                 sex=analysis.sex,
                 sample_id=analysis.sample_id,
                 plate_id=analysis.plate_id,
                 id=analysis.id,
+                call_rate=analysis.call_rate,
                 genotypes=genotypes,
             )
             analyses.append(analysis_on_sample)
         return analyses
 
-    def _get_sample_response(self, sample: Sample) -> SampleResponse:
-        analyses: list[AnalysisOnSample] = self._get_analyses_on_sample(sample=sample)
+    def _get_sample_response(self, sample: Sample, panel: SNPPanel) -> SampleResponse:
+        analyses: list[AnalysisOnSample] = self._get_analyses_on_sample(sample=sample, panel=panel)
         return SampleResponse(
             id=sample.id,
             status=sample.status,
@@ -62,6 +91,24 @@ class SampleService(BaseService):
             sex=sample.sex,
             created_at=sample.created_at,
             analyses=analyses,
+            detail=self._get_sample_detail(sample),
+            cutoff_version=sample.cutoff_version,
+            status_pending=bool(sample.status_dirty),
+        )
+
+    @staticmethod
+    def _get_sample_detail(sample: Sample) -> SampleDetail | None:
+        """Return the QC detail stored on the sample."""
+        if not sample.analyses:
+            return None
+        return SampleDetail(
+            sex=sample.sex_status,
+            snps=sample.snps_status,
+            nocalls=sample.nocalls_status,
+            matches=sample.matches,
+            mismatches=sample.mismatches,
+            unknown=sample.unknown,
+            failed_snps=sample.failed_snps,
         )
 
     async def get_sample(self, sample_id: str) -> SampleResponse:
@@ -70,14 +117,15 @@ class SampleService(BaseService):
         if not sample:
             raise SampleNotFoundError
 
-        if len(sample.analyses) == 2 and not sample.status:
-            sample: Sample = await self.store.refresh_sample_status(sample=sample)
+        if len(sample.analyses) == 2 and not sample.status and not sample.status_dirty:
+            await SampleStatusService(self.store).refresh_status(samples=[sample])
 
-        return self._get_sample_response(sample)
+        return self._get_sample_response(sample=sample, panel=await self.get_snp_panel())
 
     async def get_samples(self, filter_params: SampleFilterParams) -> list[SampleResponse]:
         samples: list[Sample] = await self.store.get_filtered_samples(filter_params=filter_params)
-        return [self._get_sample_response(sample) for sample in samples]
+        panel: SNPPanel = await self.get_snp_panel()
+        return [self._get_sample_response(sample=sample, panel=panel) for sample in samples]
 
     async def create_sample(self, sample_create: SampleCreate) -> None:
         sample = Sample(
@@ -91,15 +139,25 @@ class SampleService(BaseService):
 
     async def delete_sample(self, sample_id: str) -> None:
         sample: Sample = await self.store.get_sample_by_id(sample_id=sample_id)
-        for analysis in sample.analyses:
+        analyses: list[Analysis] = list(sample.analyses)
+        analysis_ids: list[int] = [analysis.id for analysis in analyses]
+        for analysis in analyses:
             await self.store.delete_analysis(analysis=analysis)
         await self.store.delete_sample(sample=sample)
+        fingerprint_index.remove_analyses(analysis_ids=analysis_ids)
+        match_cache.invalidate_analyses(analyses)
 
     async def get_status_detail(self, sample_id: str) -> SampleDetail:
         sample: Sample = await self.store.get_sample_by_id(sample_id=sample_id)
         if len(sample.analyses) != 2:
             return SampleDetail()
-        return MatchGenotypeService.check_sample(sample=sample)
+        cutoff: Cutoff | None = await self.store.get_current_cutoff()
+        return await executor_service.run(
+            MatchGenotypeService.check_sample,
+            sample=sample,
+            panel=await self.get_snp_panel(),
+            cutoffs=cutoff.values if cutoff else CUTOFS,
+        )
 
     async def get_match_results(
         self,
@@ -108,33 +166,274 @@ class SampleService(BaseService):
         comparison_set: Types,
         date_min: date,
         date_max: date,
+        top_k: int | None = None,
+        approximate: bool = False,
     ) -> list[MatchResult]:
         """
         Get the match results for a specific analysis type and comparison set within a date range.
+
+        Approximate matching needs the fingerprint index, without it all candidates are matched
+        exactly and the results are cached as exact matches.
         """
-        analyses = await self.store.get_analyses_by_type_between_dates(
-            analysis_type=comparison_set, date_min=date_min, date_max=date_max
+        approximate = approximate and fingerprint_index.is_loaded
+        if settings.use_match_table and analysis_type != comparison_set:
+            return await self._get_stored_match_results(
+                sample_id=sample_id,
+                analysis_type=analysis_type,
+                comparison_set=comparison_set,
+                date_min=date_min,
+                date_max=date_max,
+                top_k=top_k,
+            )
+        cache_key = MatchCacheKey(
+            sample_id=sample_id,
+            analysis_type=analysis_type,
+            comparison_set=comparison_set,
+            date_min=date_min,
+            date_max=date_max,
+            top_k=top_k,
+            approximate=approximate,
         )
-        sample_analysis = await self.store.get_analysis_by_type_and_sample_id(
+        matches: list[MatchResult] | None = match_cache.get(cache_key)
+        if matches is not None:
+            return matches
+        query: np.ndarray | None = await self.get_analysis_codes(
             sample_id=sample_id, analysis_type=analysis_type
         )
-        matches: list[MatchResult] = MatchGenotypeService.get_matches(
-            analyses=analyses, sample_analysis=sample_analysis
+        if query is None:
+            matches = []
+        elif not fingerprint_index.is_loaded:
+            matches = await self._get_streamed_match_results(
+                query=query,
+                comparison_set=comparison_set,
+                date_min=date_min,
+                date_max=date_max,
+                top_k=top_k,
+            )
+        else:
+            sample_ids, candidate_codes = fingerprint_index.get_analyses_between_dates(
+                analysis_type=comparison_set, date_min=date_min, date_max=date_max
+            )
+            if approximate:
+                matches = await self._get_approximate_match_results(
+                    query=query, candidate_codes=candidate_codes, sample_ids=sample_ids, top_k=top_k
+                )
+            else:
+                matches = await executor_service.run(
+                    MatchGenotypeService.get_code_matches,
+                    query=query,
+                    candidate_codes=candidate_codes,
+                    sample_ids=sample_ids,
+                    top_k=top_k,
+                )
+        match_cache.set(key=cache_key, matches=matches)
+        return matches
+
+    async def _get_streamed_match_results(
+        self,
+        query: np.ndarray,
+        comparison_set: Types,
+        date_min: date,
+        date_max: date,
+        top_k: int | None,
+    ) -> list[MatchResult]:
+        """Match against the candidates chunk by chunk, keeping at most the top k results."""
+        matches: list[MatchResult] = []
+        async for sample_ids, candidate_codes in self.iter_comparison_codes(
+            analysis_type=comparison_set, date_min=date_min, date_max=date_max
+        ):
+            chunk_matches: list[MatchResult] = await executor_service.run(
+                MatchGenotypeService.get_code_matches,
+                query=query,
+                candidate_codes=candidate_codes,
+                sample_ids=sample_ids,
+                top_k=top_k,
+            )
+            matches = MatchGenotypeService.merge_match_results(
+                matches=matches, chunk_matches=chunk_matches, top_k=top_k
+            )
+        return matches
+
+    async def iter_match_results(
+        self,
+        sample_id: str,
+        analysis_type: Types,
+        comparison_set: Types,
+        date_min: date,
+        date_max: date,
+    ) -> AsyncIterator[MatchResult]:
+        """Yield the match results of a sample as soon as each chunk of candidates is compared."""
+        query: np.ndarray | None = await self.get_analysis_codes(
+            sample_id=sample_id, analysis_type=analysis_type
         )
+        if query is None:
+            return
+        async for sample_ids, candidate_codes in self.iter_comparison_codes(
+            analysis_type=comparison_set, date_min=date_min, date_max=date_max
+        ):
+            chunk_matches: list[MatchResult] = await executor_service.run(
+                MatchGenotypeService.get_code_matches,
+                query=query,
+                candidate_codes=candidate_codes,
+                sample_ids=sample_ids,
+            )
+            for match in chunk_matches:
+                yield match
 
+    @staticmethod
+    async def _get_approximate_match_results(
+        query: np.ndarray, candidate_codes: np.ndarray, sample_ids: np.ndarray, top_k: int | None
+    ) -> list[MatchResult]:
+        """Match in two stages, validating some queries against the exact match."""
+        start: float = time.perf_counter()
+        matches: list[MatchResult] = await executor_service.run(
+            MatchGenotypeService.get_approximate_code_matches,
+            query=query,
+            candidate_codes=candidate_codes,
+            sample_ids=sample_ids,
+            top_k=top_k,
+            sketch_size=settings.approximate_match_sketch_size,
+            shortlist_size=settings.approximate_match_shortlist_size,
+        )
+        if approximate_match_metrics.add_query(time.perf_counter() - start):
+            start = time.perf_counter()
+            exact_matches: list[MatchResult] = await executor_service.run(
+                MatchGenotypeService.get_code_matches,
+                query=query,
+                candidate_codes=candidate_codes,
+                sample_ids=sample_ids,
+                top_k=top_k,
+            )
+            approximate_match_metrics.add_validation(
+                matches=matches,
+                exact_matches=exact_matches,
+                exact_seconds=time.perf_counter() - start,
+            )
         return matches
 
+    @staticmethod
+    def get_approximate_match_stats() -> ApproximateMatchStats:
+        return approximate_match_metrics.get_stats()
+
+    async def get_relatedness_results(
+        self,
+        sample_id: str,
+        analysis_type: Types,
+        comparison_set: Types,
+        date_min: date,
+        date_max: date,
+        top_k: int | None = None,
+    ) -> list[RelatednessResult]:
+        """Get the identity by state of a sample with a comparison set, most related first."""
+        query: np.ndarray | None = await self.get_analysis_codes(
+            sample_id=sample_id, analysis_type=analysis_type
+        )
+        if query is None:
+            return []
+        sample_ids, candidate_codes = await self.get_comparison_codes(
+            analysis_type=comparison_set, date_min=date_min, date_max=date_max
+        )
+        return await executor_service.run(
+            MatchGenotypeService.get_relatedness,
+            query=query,
+            candidate_codes=candidate_codes,
+            sample_ids=sample_ids,
+            top_k=top_k,
+        )
+
+    async def _get_stored_match_results(
+        self,
+        sample_id: str,
+        analysis_type: Types,
+        comparison_set: Types,
+        date_min: date,
+        date_max: date,
+        top_k: int | None,
+    ) -> list[MatchResult]:
+        """Read the match results from the match table, best match first."""
+        matches: list[Match] = await self.store.get_matches_by_type_and_sample_id(
+            sample_id=sample_id,
+            analysis_type=analysis_type,
+            comparison_set=comparison_set,
+            date_min=date_min,
+            date_max=date_max,
+            limit=top_k,
+        )
+        return [
+            MatchResult(
+                sample_id=match.matched_analysis.sample_id,
+                match_results=MatchCounts(
+                    match=match.match, mismatch=match.mismatch, unknown=match.unknown
+                ),
+            )
+            for match in matches
+        ]
+
+    async def rebuild_matches(self, chunk_size: int = 256) -> None:
+        """Recompute the match table, comparing all genotype analyses to all sequence analyses.
+
+        The sequence analyses are loaded once and the genotype analyses are compared to them in
+        chunks to bound memory. The table is replaced in one transaction.
+        """
+        analysis_ids, codes = await self.get_type_codes(Types.GENOTYPE)
+        candidate_analysis_ids, candidate_codes = await self.get_type_codes(Types.SEQUENCE)
+
+        async def get_match_batches() -> AsyncIterator[list[Match]]:
+            for start in range(0, len(analysis_ids), chunk_size):
+                yield await self.get_top_matches(
+                    analysis_ids=analysis_ids[start : start + chunk_size],
+                    genotype_codes=list(codes[start : start + chunk_size]),
+                    candidate_analysis_ids=candidate_analysis_ids,
+                    candidate_codes=candidate_codes,
+                )
+                LOG.info(f"Matched {min(start + chunk_size, len(analysis_ids))} genotype analyses")
+
+        count: int = await self.store.replace_matches(match_batches=get_match_batches())
+        LOG.info(f"Stored {count} matches")
+
+    @staticmethod
+    def get_match_cache_stats() -> MatchCacheStats:
+        return match_cache.get_stats()
+
+    async def get_batch_match_results(
+        self, match_request: SampleMatchRequest
+    ) -> list[SampleMatches]:
+        """Get the match results of several samples against one comparison set."""
+        queries: dict[str, np.ndarray] = await self.get_analyses_codes(
+            sample_ids=match_request.sample_ids, analysis_type=match_request.analysis_type
+        )
+        sample_ids, candidate_codes = await self.get_comparison_codes(
+            analysis_type=match_request.comparison_set,
+            date_min=match_request.date_min,
+            date_max=match_request.date_max,
+        )
+        matched_sample_ids: list[str] = [
+            sample_id for sample_id in match_request.sample_ids if sample_id in queries
+        ]
+        matches: list[list[MatchResult]] = await executor_service.run(
+            MatchGenotypeService.get_batch_matches,
+            queries=[queries[sample_id] for sample_id in matched_sample_ids],
+            candidate_codes=candidate_codes,
+            sample_ids=sample_ids,
+            top_k=match_request.top_k,
+        )
+        sample_matches: dict[str, list[MatchResult]] = dict(zip(matched_sample_ids, matches))
+        return [
+            SampleMatches(sample_id=sample_id, matches=sample_matches.get(sample_id, []))
+            for sample_id in match_request.sample_ids
+        ]
+
     async def set_sample_status(
         self, sample_id: str, status: Literal["pass", "fail", "cancel"] | None
     ) -> SampleResponse:
         sample: Sample = await self.store.update_sample_status(sample_id=sample_id, status=status)
-        return self._get_sample_response(sample)
+        return self._get_sample_response(sample=sample, panel=await self.get_snp_panel())
 
     async def set_sample_comment(self, sample_id: str, comment: str) -> SampleResponse:
         sample: Sample = await self.store.update_sample_comment(
             sample_id=sample_id, comment=comment
         )
-        return self._get_sample_response(sample)
+        return self._get_sample_response(sample=sample, panel=await self.get_snp_panel())
 
     async def set_sex(
         self, sample_id: str, sex: Sexes, genotype_sex: Sexes, sequence_sex: Sexes
@@ -143,3 +442,4 @@ class SampleService(BaseService):
             sample_id=sample_id, sex=sex, genotype_sex=genotype_sex, sequence_sex=sequence_sex
         )
         await self.store.update_sample_sex(sexes_update=sexes_update)
+        status_refresh_worker.notify()
@@ -6,8 +6,14 @@ from genotype_api.database.models import SNP
 from genotype_api.dto.snp import SNPResponse
 from genotype_api.exceptions import SNPExistsError
 from genotype_api.services.endpoint_services.base_service import BaseService
+from genotype_api.services.match_genotype_service.fingerprint_index import fingerprint_index
+from genotype_api.services.match_genotype_service.genotype_codes import get_analysis_genotype_codes
+from genotype_api.services.match_genotype_service.match_cache import match_cache
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
 from genotype_api.services.snp_reader_service.snp_reader import SNPReaderService
 
+REPACK_BATCH_SIZE: int = 1000
+
 
 class SNPService(BaseService):
 
@@ -26,8 +32,39 @@ class SNPService(BaseService):
             raise SNPExistsError
         snps: list[SNP] = await SNPReaderService.read_snps_from_file(snps_file)
         new_snps: list[SNP] = await self.store.create_snps(snps=snps)
+        await self._repack_genotypes()
         return [self._get_snp_response(new_snp) for new_snp in new_snps]
 
     async def delete_all_snps(self) -> int:
         result = await self.store.delete_snps()
+        await self._repack_genotypes()
         return result.rowcount
+
+    async def _repack_genotypes(self) -> None:
+        """Pack the genotypes of all analyses in the layout of the current SNP panel.
+
+        Analyses are repacked in id ordered batches so only one batch is held in memory.
+        """
+        panel: SNPPanel = await self.get_snp_panel()
+        match_cache.clear()
+        reindex: bool = fingerprint_index.is_loaded
+        if reindex:
+            fingerprint_index.load(analyses=[], panel=panel)
+        last_id: int = 0
+        while analyses := await self.store.get_analyses_with_genotype_rows(
+            after_id=last_id, limit=REPACK_BATCH_SIZE
+        ):
+            for analysis in analyses:
+                analysis.genotype_blob = panel.pack_genotypes(analysis.genotypes)
+            await self.store.update_analyses_genotype_blobs(
+                genotype_blobs={analysis.id: analysis.genotype_blob for analysis in analyses}
+            )
+            if reindex:
+                fingerprint_index.add_analyses(
+                    analyses=analyses,
+                    genotype_codes=[
+                        get_analysis_genotype_codes(analysis=analysis, panel=panel)
+                        for analysis in analyses
+                    ],
+                )
+            last_id = analyses[-1].id
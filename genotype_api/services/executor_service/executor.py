@@ -0,0 +1,88 @@
+"""Module for the executor that runs CPU heavy work off the event loop."""
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from genotype_api.config import settings
+from genotype_api.constants import ExecutorType
+from genotype_api.exceptions import ExecutorTimeoutError
+
+LOG = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorService:
+    """Run blocking functions in a thread or process pool with bounded concurrency.
+
+    At most max_workers jobs are in flight, further jobs wait for a slot without blocking the
+    event loop. A job that does not finish within the timeout raises ExecutorTimeoutError.
+    With a process pool the function, its arguments and its result must be picklable.
+    """
+
+    def __init__(self, executor_type: ExecutorType, max_workers: int, timeout: float | None):
+        self.executor_type: ExecutorType = executor_type
+        self.max_workers: int = max_workers
+        self.timeout: float | None = timeout
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            pool = (
+                ProcessPoolExecutor
+                if self.executor_type == ExecutorType.PROCESS
+                else ThreadPoolExecutor
+            )
+            self._executor = pool(max_workers=self.max_workers)
+        return self._executor
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+
+    async def run(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run the function in the pool and return its result.
+
+        The slot of a job is released when the job finishes, so a job that timed out keeps
+        its slot while it is still running in the pool.
+        """
+        await self.slots.acquire()
+        try:
+            job = asyncio.get_running_loop().run_in_executor(
+                self.executor, partial(function, *args, **kwargs)
+            )
+        except BaseException:
+            self.slots.release()
+            raise
+        job.add_done_callback(self._release_slot)
+        try:
+            return await asyncio.wait_for(asyncio.shield(job), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            LOG.error(f"{function.__qualname__} did not finish within {self.timeout} seconds")
+            raise ExecutorTimeoutError(function.__qualname__)
+
+    def _release_slot(self, job: asyncio.Future) -> None:
+        self.slots.release()
+        if not job.cancelled():
+            # Retrieve the error of a job nobody waits for anymore, so it is not logged as lost
+            job.exception()
+
+    def shutdown(self) -> None:
+        """Stop the pool, cancelling the jobs that have not started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+executor_service = ExecutorService(
+    executor_type=settings.executor_type,
+    max_workers=settings.executor_max_workers,
+    timeout=settings.executor_timeout,
+)
@@ -0,0 +1,153 @@
+"""Module for the in memory genotype fingerprint index."""
+
+import logging
+from datetime import date
+
+import numpy as np
+
+from genotype_api.constants import Types
+from genotype_api.database.models import Analysis
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    GENOTYPE_CODE_DTYPE,
+    MISSING_CALL,
+    get_analysis_genotype_codes,
+    stack_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+
+LOG = logging.getLogger(__name__)
+
+DATETIME_DTYPE = "datetime64[us]"
+
+
+class FingerprintIndex:
+    """Dense analysis by SNP matrix of genotype codes for all analyses in the database.
+
+    The index is loaded once when the app starts and kept up to date by the endpoints that
+    upload or delete analyses, so that matching is a date sliced lookup in memory.
+    Each worker process holds its own index.
+    """
+
+    def __init__(self):
+        self.is_loaded: bool = False
+        self._clear()
+
+    def _clear(self) -> None:
+        self.analysis_ids: np.ndarray = np.empty(0, dtype=np.int64)
+        self.sample_ids: np.ndarray = np.empty(0, dtype=object)
+        self.types: np.ndarray = np.empty(0, dtype=object)
+        self.created_at: np.ndarray = np.empty(0, dtype=DATETIME_DTYPE)
+        self.codes: np.ndarray = np.empty((0, 0), dtype=GENOTYPE_CODE_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.analysis_ids)
+
+    def load(self, analyses: list[Analysis], panel: SNPPanel | None = None) -> None:
+        """Replace the content of the index with the given analyses in the panel layout."""
+        self._clear()
+        self.add_analyses(
+            analyses=analyses,
+            genotype_codes=[
+                get_analysis_genotype_codes(analysis=analysis, panel=panel) for analysis in analyses
+            ],
+        )
+        self.is_loaded = True
+        LOG.info(f"Loaded {len(self)} analyses into the fingerprint index.")
+
+    def add_analyses(self, analyses: list[Analysis], genotype_codes: list[np.ndarray]) -> None:
+        """Add persisted analyses and their genotype codes to the index.
+
+        Analyses already indexed for the same sample and type are replaced, as they are in the
+        database when a new analysis is uploaded.
+        """
+        if not analyses:
+            return
+        keys: set[tuple[str, str]] = {
+            (analysis.sample_id, self._type_value(analysis.type)) for analysis in analyses
+        }
+        replaced: np.ndarray = np.fromiter(
+            (key in keys for key in zip(self.sample_ids, self.types)), dtype=bool, count=len(self)
+        )
+        self._keep_rows(~replaced)
+        width: int = max(self.codes.shape[1], *(len(codes) for codes in genotype_codes))
+        self.codes = np.vstack(
+            [
+                self._pad_codes(width=width),
+                stack_genotype_codes(codes=genotype_codes, width=width),
+            ]
+        )
+        self.analysis_ids = np.append(self.analysis_ids, [analysis.id for analysis in analyses])
+        self.sample_ids = np.append(
+            self.sample_ids, np.array([analysis.sample_id for analysis in analyses], dtype=object)
+        )
+        self.types = np.append(
+            self.types,
+            np.array([self._type_value(analysis.type) for analysis in analyses], dtype=object),
+        )
+        self.created_at = np.append(
+            self.created_at,
+            np.array([analysis.created_at for analysis in analyses], dtype=DATETIME_DTYPE),
+        )
+
+    def remove_analyses(self, analysis_ids: list[int]) -> None:
+        """Remove deleted analyses from the index."""
+        self._keep_rows(~np.isin(self.analysis_ids, analysis_ids))
+
+    def get_analysis_codes(self, sample_id: str, analysis_type: Types) -> np.ndarray | None:
+        """Return the genotype codes of the analysis of a sample, None if it is not indexed."""
+        rows: np.ndarray = np.flatnonzero(
+            (self.sample_ids == sample_id) & (self.types == self._type_value(analysis_type))
+        )
+        if not rows.size:
+            return None
+        return self.codes[rows[0]]
+
+    def get_analyses_codes(
+        self, sample_ids: list[str], analysis_type: Types
+    ) -> dict[str, np.ndarray]:
+        """Return the genotype codes of the analyses of the samples that are indexed."""
+        rows: np.ndarray = np.flatnonzero(
+            np.isin(self.sample_ids, sample_ids) & (self.types == self._type_value(analysis_type))
+        )
+        return {self.sample_ids[row]: self.codes[row] for row in rows}
+
+    def get_analyses_by_type(self, analysis_type: Types) -> tuple[np.ndarray, np.ndarray]:
+        """Return the analysis ids and genotype codes of all analyses of a type."""
+        selected: np.ndarray = self.types == self._type_value(analysis_type)
+        return self.analysis_ids[selected], self.codes[selected]
+
+    def get_analyses_between_dates(
+        self, analysis_type: Types, date_min: date, date_max: date
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the sample ids and genotype codes of analyses of a type between dates.
+
+        The date range follows the analysis filter, both end dates are included.
+        """
+        one_day = np.timedelta64(1, "D")
+        selected: np.ndarray = (
+            (self.types == self._type_value(analysis_type))
+            & (self.created_at > np.datetime64(date_min, "D") - one_day)
+            & (self.created_at < np.datetime64(date_max, "D") + one_day)
+        )
+        return self.sample_ids[selected], self.codes[selected]
+
+    @staticmethod
+    def _type_value(analysis_type: Types | str) -> str:
+        """Return the plain string of an analysis type, numpy compares enums by their name."""
+        return getattr(analysis_type, "value", analysis_type)
+
+    def _keep_rows(self, keep: np.ndarray) -> None:
+        self.analysis_ids = self.analysis_ids[keep]
+        self.sample_ids = self.sample_ids[keep]
+        self.types = self.types[keep]
+        self.created_at = self.created_at[keep]
+        self.codes = self.codes[keep]
+
+    def _pad_codes(self, width: int) -> np.ndarray:
+        padding = np.full(
+            (len(self), width - self.codes.shape[1]), MISSING_CALL, dtype=GENOTYPE_CODE_DTYPE
+        )
+        return np.hstack([self.codes, padding])
+
+
+fingerprint_index = FingerprintIndex()
@@ -0,0 +1,222 @@
+"""Integer encoding of genotype calls used for vectorised genotype comparisons."""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from genotype_api.database.models import Analysis, Genotype
+
+if TYPE_CHECKING:
+    from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+
+# The position of an allele in the alphabet is its 4-bit code, "0" is a no-call.
+# The alphabet is kept below 16 alleles, so that 0xFF never is a valid allele pair.
+ALLELE_ALPHABET: str = "0ACGTN.-123456"
+ALLELE_CODES: dict[str, int] = {allele: code for code, allele in enumerate(ALLELE_ALPHABET)}
+
+UNKNOWN_CALL: int = 0
+MISSING_CALL: int = 255
+GENOTYPE_CODE_DTYPE = np.uint8
+
+
+def _get_allele_codes(allele_1: str | None, allele_2: str | None) -> tuple[int, int]:
+    """Return the codes of the alleles, alleles outside the alphabet are no-calls."""
+    return ALLELE_CODES.get(allele_1, UNKNOWN_CALL), ALLELE_CODES.get(allele_2, UNKNOWN_CALL)
+
+
+def encode_alleles(allele_1: str, allele_2: str) -> int:
+    """Return an order independent code for an allele pair, 0 when any allele is a no-call."""
+    code_1, code_2 = _get_allele_codes(allele_1=allele_1, allele_2=allele_2)
+    if UNKNOWN_CALL in (code_1, code_2):
+        return UNKNOWN_CALL
+    low, high = sorted((code_1, code_2))
+    return low << 4 | high
+
+
+def encode_genotypes(genotypes: list[Genotype]) -> np.ndarray:
+    """Return the allele pair codes of the genotypes in the order they are given."""
+    return np.fromiter(
+        (encode_alleles(genotype.allele_1, genotype.allele_2) for genotype in genotypes),
+        dtype=GENOTYPE_CODE_DTYPE,
+        count=len(genotypes),
+    )
+
+
+def count_calls(codes: np.ndarray) -> tuple[int, int]:
+    """Return the number of known and unknown calls, missing calls are not counted."""
+    unknown: int = int(np.count_nonzero(codes == UNKNOWN_CALL))
+    return int(np.count_nonzero(codes != MISSING_CALL)) - unknown, unknown
+
+
+def pack_alleles(allele_1: str, allele_2: str) -> int:
+    """Return both allele codes of a genotype packed in one byte, keeping the allele order."""
+    code_1, code_2 = _get_allele_codes(allele_1=allele_1, allele_2=allele_2)
+    return code_1 << 4 | code_2
+
+
+def unpack_alleles(packed_alleles: int) -> tuple[str, str]:
+    """Return the alleles of a genotype packed in one byte."""
+    return ALLELE_ALPHABET[packed_alleles >> 4], ALLELE_ALPHABET[packed_alleles & 0xF]
+
+
+def get_packed_genotype_codes(genotype_blob: bytes) -> np.ndarray:
+    """Return the allele pair codes of genotypes packed one byte per SNP."""
+    return unpack_genotype_codes(np.frombuffer(genotype_blob, dtype=GENOTYPE_CODE_DTYPE))
+
+
+def unpack_genotype_codes(packed: np.ndarray) -> np.ndarray:
+    """Return the allele pair codes of an array of packed alleles, of any shape."""
+    code_1: np.ndarray = packed >> 4
+    code_2: np.ndarray = packed & 0xF
+    codes: np.ndarray = np.minimum(code_1, code_2) << 4 | np.maximum(code_1, code_2)
+    codes[(code_1 == UNKNOWN_CALL) | (code_2 == UNKNOWN_CALL)] = UNKNOWN_CALL
+    codes[packed == MISSING_CALL] = MISSING_CALL
+    return codes
+
+
+def get_analysis_genotype_codes(analysis: Analysis, panel: "SNPPanel | None" = None) -> np.ndarray:
+    """Return the genotype codes of an analysis in the layout of the SNP panel.
+
+    Packed genotypes already are in the panel layout. Genotype rows are projected on the panel
+    by rsnumber, and only taken in row order when there is no panel.
+    """
+    if analysis.genotype_blob is not None:
+        return get_packed_genotype_codes(analysis.genotype_blob)
+    if panel is not None and len(panel):
+        return panel.project_genotypes(analysis.genotypes)
+    return encode_genotypes(analysis.genotypes)
+
+
+def stack_genotype_codes(codes: list[np.ndarray], width: int) -> np.ndarray:
+    """Stack code arrays into a matrix of the given width, padding short rows as missing."""
+    matrix = np.full((len(codes), width), MISSING_CALL, dtype=GENOTYPE_CODE_DTYPE)
+    for row, row_codes in enumerate(codes):
+        row_width: int = min(width, len(row_codes))
+        matrix[row, :row_width] = row_codes[:row_width]
+    return matrix
+
+
+def select_informative_columns(
+    codes: np.ndarray, size: int, query: np.ndarray | None = None, max_rows: int = 2048
+) -> np.ndarray:
+    """Return the columns whose genotype codes vary most between analyses, in column order.
+
+    Columns are ranked by the entropy of their called genotype codes over at most max_rows
+    evenly spaced rows. Columns the query has no call for are ranked last.
+    """
+    width: int = codes.shape[1]
+    rows: np.ndarray = codes[:: max(1, len(codes) // max_rows)].astype(np.int64)
+    counts: np.ndarray = np.bincount(
+        (rows + 256 * np.arange(width)).ravel(), minlength=256 * width
+    ).reshape(width, 256)
+    counts[:, [UNKNOWN_CALL, MISSING_CALL]] = 0
+    frequencies: np.ndarray = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    entropy: np.ndarray = -(frequencies * np.log(np.where(frequencies > 0, frequencies, 1))).sum(
+        axis=1
+    )
+    if query is not None:
+        entropy[(query == UNKNOWN_CALL) | (query == MISSING_CALL)] = -1
+    return np.sort(np.argsort(-entropy, kind="stable")[:size])
+
+
+def compare_genotype_codes(
+    query: np.ndarray, candidates: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the match, mismatch and unknown masks of the query against the candidates.
+
+    Follows the semantics of utils.compare_genotypes: a pair with a no-call is unknown,
+    otherwise it is a match if the sorted alleles are equal. Missing calls are not compared.
+    """
+    compared: np.ndarray = (candidates != MISSING_CALL) & (query != MISSING_CALL)
+    unknown: np.ndarray = compared & ((candidates == UNKNOWN_CALL) | (query == UNKNOWN_CALL))
+    called: np.ndarray = compared & ~unknown
+    equal: np.ndarray = candidates == query
+    return called & equal, called & ~equal, unknown
+
+
+def count_genotype_matches(
+    query: np.ndarray, candidates: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the match, mismatch and unknown counts of the query against each candidate row."""
+    return tuple(
+        np.count_nonzero(mask, axis=-1)
+        for mask in compare_genotype_codes(query=query, candidates=candidates)
+    )
+
+
+def count_shared_alleles(
+    query: np.ndarray, candidates: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the number of SNPs sharing 0, 1 and 2 alleles with each candidate row.
+
+    Identity by state counts the alleles two genotypes share regardless of allele order, as
+    Genotype.alleles does. Only SNPs called in both analyses are counted.
+    """
+    called: np.ndarray = (
+        (candidates != MISSING_CALL)
+        & (candidates != UNKNOWN_CALL)
+        & (query != MISSING_CALL)
+        & (query != UNKNOWN_CALL)
+    )
+    query_low, query_high = query >> 4, query & 0xF
+    candidate_low, candidate_high = candidates >> 4, candidates & 0xF
+    shared: np.ndarray = np.maximum(
+        (query_low == candidate_low).astype(np.uint8) + (query_high == candidate_high),
+        (query_low == candidate_high).astype(np.uint8) + (query_high == candidate_low),
+    )
+    return tuple(
+        np.count_nonzero(called & (shared == nr_shared), axis=-1) for nr_shared in range(3)
+    )
+
+
+def count_genotype_match_matrix(
+    queries: np.ndarray, candidates: np.ndarray, max_chunk_cells: int = 2**22
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the match, mismatch and unknown counts of every query row against every candidate.
+
+    The candidates are compared in chunks, so that memory is bounded by max_chunk_cells.
+    """
+    shape: tuple[int, int] = (len(queries), len(candidates))
+    counts = [np.zeros(shape, dtype=np.int32) for _ in range(3)]
+    chunk_size: int = max(1, max_chunk_cells // max(1, queries.size))
+    for start in range(0, len(candidates), chunk_size):
+        chunk: np.ndarray = candidates[start : start + chunk_size]
+        chunk_counts = count_genotype_matches(query=queries[:, None, :], candidates=chunk[None])
+        for count, chunk_count in zip(counts, chunk_counts):
+            count[:, start : start + chunk_size] = chunk_count
+    return tuple(counts)
+
+
+def _get_called_allele_dosages(codes: np.ndarray, allele_code: int) -> np.ndarray:
+    """Return how many copies of an allele each called genotype holds, 0 for no-calls."""
+    called: np.ndarray = (codes != MISSING_CALL) & (codes != UNKNOWN_CALL)
+    return ((codes >> 4 == allele_code).astype(np.uint8) + (codes & 0xF == allele_code)) * called
+
+
+def count_shared_allele_matrix(
+    queries: np.ndarray, candidates: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the IBS0, IBS1 and IBS2 counts of every query row against every candidate.
+
+    The counts are sums of products of indicator matrices, so that thousands of analyses are
+    compared with a few matrix multiplications: the SNPs called in both, the SNPs with equal
+    genotypes (IBS2), and the alleles shared, which count IBS1 once and IBS2 twice.
+    """
+
+    def product(query_indicator: np.ndarray, candidate_indicator: np.ndarray) -> np.ndarray:
+        return query_indicator.astype(np.float32) @ candidate_indicator.astype(np.float32).T
+
+    query_called: np.ndarray = (queries != MISSING_CALL) & (queries != UNKNOWN_CALL)
+    candidate_called: np.ndarray = (candidates != MISSING_CALL) & (candidates != UNKNOWN_CALL)
+    compared: np.ndarray = product(query_called, candidate_called)
+    ibs2 = np.zeros_like(compared)
+    shared_alleles = np.zeros_like(compared)
+    for code in np.intersect1d(queries[query_called], candidates[candidate_called]):
+        ibs2 += product(queries == code, candidates == code)
+    for allele_code in range(1, len(ALLELE_ALPHABET)):
+        query_dosages: np.ndarray = _get_called_allele_dosages(queries, allele_code)
+        candidate_dosages: np.ndarray = _get_called_allele_dosages(candidates, allele_code)
+        for nr_copies in (1, 2):
+            shared_alleles += product(query_dosages >= nr_copies, candidate_dosages >= nr_copies)
+    ibs1: np.ndarray = shared_alleles - 2 * ibs2
+    return tuple(np.rint(count).astype(np.int32) for count in (compared - ibs1 - ibs2, ibs1, ibs2))
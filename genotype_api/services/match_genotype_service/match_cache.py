@@ -0,0 +1,123 @@
+"""Module for the cache of sample match results."""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from genotype_api.config import settings
+from genotype_api.constants import Types
+from genotype_api.database.models import Analysis
+from genotype_api.models import MatchCacheStats, MatchResult
+
+LOG = logging.getLogger(__name__)
+
+
+class MatchCacheKey(NamedTuple):
+    sample_id: str
+    analysis_type: Types
+    comparison_set: Types
+    date_min: date
+    date_max: date
+    top_k: int | None = None
+    approximate: bool = False
+
+
+@dataclass
+class MatchCacheEntry:
+    matches: list[MatchResult]
+    expires_at: float
+    matched_sample_ids: set[str] = field(default_factory=set)
+
+
+class MatchCache:
+    """LRU cache of match results with a time to live.
+
+    An entry is invalidated when an analysis is written that can change its results: the analysis
+    of the queried sample, or an analysis of the comparison set created within the date window or
+    already among the matches. Each worker process holds its own cache.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[MatchCacheKey, MatchCacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: MatchCacheKey) -> list[MatchResult] | None:
+        """Return the cached match results of the key, None when they are not cached."""
+        entry: MatchCacheEntry | None = self._entries.get(key)
+        if entry is None or entry.expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.matches
+
+    def set(self, key: MatchCacheKey, matches: list[MatchResult]) -> None:
+        """Cache the match results of the key, evicting the least recently used entries."""
+        if not self.max_size:
+            return
+        self._entries[key] = MatchCacheEntry(
+            matches=matches,
+            expires_at=time.monotonic() + self.ttl,
+            matched_sample_ids={match.sample_id for match in matches},
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_analyses(self, analyses: list[Analysis]) -> None:
+        """Drop the entries whose results can change by creating or deleting the analyses."""
+        stale: list[MatchCacheKey] = [
+            key
+            for key, entry in self._entries.items()
+            if any(
+                self._is_affected(key=key, entry=entry, analysis=analysis) for analysis in analyses
+            )
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            LOG.debug(f"Invalidated {len(stale)} cached match results")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> MatchCacheStats:
+        return MatchCacheStats(hits=self.hits, misses=self.misses, size=len(self))
+
+    @staticmethod
+    def _is_affected(key: MatchCacheKey, entry: MatchCacheEntry, analysis: Analysis) -> bool:
+        if analysis.type == key.analysis_type and analysis.sample_id == key.sample_id:
+            return True
+        if analysis.type != key.comparison_set:
+            return False
+        return analysis.sample_id in entry.matched_sample_ids or MatchCache._is_in_window(
+            created_at=analysis.created_at, date_min=key.date_min, date_max=key.date_max
+        )
+
+    @staticmethod
+    def _is_in_window(created_at: datetime | None, date_min: date, date_max: date) -> bool:
+        """Return whether a creation time is in the date window, as the analysis filter reads it."""
+        if created_at is None:
+            return True
+        one_day = np.timedelta64(1, "D")
+        created: np.datetime64 = np.datetime64(created_at, "us")
+        return bool(
+            np.datetime64(date_min, "D") - one_day
+            < created
+            < np.datetime64(date_max, "D") + one_day
+        )
+
+
+match_cache = MatchCache(max_size=settings.match_cache_size, ttl=settings.match_cache_ttl)
@@ -1,55 +1,466 @@
 """Module for the match genotype services."""
 
-from collections import Counter
+import numpy as np
 
-from genotype_api.database.models import Analysis, Sample
-from genotype_api.models import MatchCounts, MatchResult, SampleDetail
+from genotype_api.constants import CUTOFS
+from genotype_api.database.models import Analysis, Match, Sample
+from genotype_api.models import (
+    MatchCounts,
+    MatchResult,
+    RelatednessResult,
+    SampleDetail,
+    SampleSwap,
+)
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    compare_genotype_codes,
+    count_genotype_match_matrix,
+    count_genotype_matches,
+    count_shared_allele_matrix,
+    count_shared_alleles,
+    get_analysis_genotype_codes,
+    select_informative_columns,
+    stack_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
 from genotype_api.services.match_genotype_service.utils import (
     check_sex,
-    check_snps,
-    compare_genotypes,
+    check_snp_codes,
+    get_snps_status,
 )
 
+MIN_MATCHING_CALLS: int = 40
+
 
 class MatchGenotypeService:
     @staticmethod
-    def get_matches(analyses: list[Analysis], sample_analysis: Analysis) -> list[MatchResult]:
-        if sample_analysis is None or sample_analysis.genotypes is None:
+    def get_matches(
+        analyses: list[Analysis], sample_analysis: Analysis, panel: SNPPanel | None = None
+    ) -> list[MatchResult]:
+        """Compare the sample analysis against all analyses in a single vectorised operation.
+
+        Genotype rows are aligned on the SNP panel by rsnumber when a panel is given.
+        """
+        if sample_analysis is None:
             return []
 
-        match_results = []
-        for genotype in analyses:
-            if genotype is None or genotype.genotypes is None:
-                continue
-            genotype_pairs = zip(genotype.genotypes, sample_analysis.genotypes)
-            results = dict(
-                compare_genotypes(genotype_1, genotype_2)
-                for genotype_1, genotype_2 in genotype_pairs
-            )
-            count = Counter([val for key, val in results.items()])
-            if count.get("match", 0) + count.get("unknown", 0) > 40:
-                match_results.append(
-                    MatchResult(
-                        sample_id=genotype.sample_id,
-                        match_results=MatchCounts.parse_obj(count),
-                    ),
-                )
-        return match_results
+        candidates: list[Analysis] = [analysis for analysis in analyses if analysis]
+        if not candidates:
+            return []
+        query: np.ndarray = get_analysis_genotype_codes(analysis=sample_analysis, panel=panel)
+        candidate_codes: np.ndarray = stack_genotype_codes(
+            codes=[
+                get_analysis_genotype_codes(analysis=analysis, panel=panel)
+                for analysis in candidates
+            ],
+            width=len(query),
+        )
+        return MatchGenotypeService.get_code_matches(
+            query=query,
+            candidate_codes=candidate_codes,
+            sample_ids=[analysis.sample_id for analysis in candidates],
+        )
+
+    @staticmethod
+    def get_code_matches(
+        query: np.ndarray,
+        candidate_codes: np.ndarray,
+        sample_ids: list[str] | np.ndarray,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
+        """Compare the genotype codes of a sample against a matrix of candidate codes.
+
+        With top_k only the k best matching candidates are returned, ranked by most matches and
+        then fewest mismatches.
+        """
+        query = stack_genotype_codes(codes=[query], width=candidate_codes.shape[1])[0]
+        matches, mismatches, unknowns = count_genotype_matches(
+            query=query, candidates=candidate_codes
+        )
+        return MatchGenotypeService._get_match_results(
+            matches=matches,
+            mismatches=mismatches,
+            unknowns=unknowns,
+            sample_ids=sample_ids,
+            top_k=top_k,
+        )
+
+    @staticmethod
+    def get_approximate_code_matches(
+        query: np.ndarray,
+        candidate_codes: np.ndarray,
+        sample_ids: list[str] | np.ndarray,
+        top_k: int | None,
+        sketch_size: int,
+        shortlist_size: int,
+    ) -> list[MatchResult]:
+        """Compare a sample in two stages, only counting exactly on a shortlist of candidates.
+
+        The candidates are first ranked on a sketch of the most informative SNPs, and only the
+        shortlist_size best ranked candidates are compared on all SNPs.
+        """
+        if len(candidate_codes) <= shortlist_size:
+            return MatchGenotypeService.get_code_matches(
+                query=query, candidate_codes=candidate_codes, sample_ids=sample_ids, top_k=top_k
+            )
+        query = stack_genotype_codes(codes=[query], width=candidate_codes.shape[1])[0]
+        columns: np.ndarray = select_informative_columns(
+            codes=candidate_codes, size=sketch_size, query=query
+        )
+        sketch_matches, sketch_mismatches, _ = count_genotype_matches(
+            query=query[columns], candidates=candidate_codes[:, columns]
+        )
+        scores: np.ndarray = MatchGenotypeService._get_match_scores(
+            matches=sketch_matches, mismatches=sketch_mismatches
+        )
+        shortlist: np.ndarray = np.sort(
+            np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+        )
+        return MatchGenotypeService.get_code_matches(
+            query=query,
+            candidate_codes=candidate_codes[shortlist],
+            sample_ids=np.asarray(sample_ids, dtype=object)[shortlist],
+            top_k=top_k,
+        )
+
+    @staticmethod
+    def merge_match_results(
+        matches: list[MatchResult], chunk_matches: list[MatchResult], top_k: int | None
+    ) -> list[MatchResult]:
+        """Merge the match results of a chunk of candidates into the results of earlier chunks.
+
+        With top_k only the k best results are kept, ranked as in get_code_matches.
+        """
+        merged: list[MatchResult] = matches + chunk_matches
+        if top_k is None:
+            return merged
+        return sorted(
+            merged, key=lambda match: (-match.match_results.match, match.match_results.mismatch)
+        )[:top_k]
+
+    @staticmethod
+    def get_batch_matches(
+        queries: list[np.ndarray],
+        candidate_codes: np.ndarray,
+        sample_ids: list[str] | np.ndarray,
+        top_k: int | None = None,
+    ) -> list[list[MatchResult]]:
+        """Compare the genotype codes of several samples against the candidates in one pass."""
+        if not queries:
+            return []
+        matches, mismatches, unknowns = count_genotype_match_matrix(
+            queries=stack_genotype_codes(codes=queries, width=candidate_codes.shape[1]),
+            candidates=candidate_codes,
+        )
+        return [
+            MatchGenotypeService._get_match_results(
+                matches=matches[row],
+                mismatches=mismatches[row],
+                unknowns=unknowns[row],
+                sample_ids=sample_ids,
+                top_k=top_k,
+            )
+            for row in range(len(queries))
+        ]
+
+    @staticmethod
+    def _get_match_results(
+        matches: np.ndarray,
+        mismatches: np.ndarray,
+        unknowns: np.ndarray,
+        sample_ids: list[str] | np.ndarray,
+        top_k: int | None,
+    ) -> list[MatchResult]:
+        selected: np.ndarray = np.flatnonzero(matches + unknowns > MIN_MATCHING_CALLS)
+        if top_k is not None:
+            selected = MatchGenotypeService._get_top_candidates(
+                candidates=selected, matches=matches, mismatches=mismatches, top_k=top_k
+            )
+        return [
+            MatchResult(
+                sample_id=sample_ids[index],
+                match_results=MatchCounts(
+                    match=int(matches[index]),
+                    mismatch=int(mismatches[index]),
+                    unknown=int(unknowns[index]),
+                ),
+            )
+            for index in selected
+        ]
+
+    @staticmethod
+    def _get_top_candidates(
+        candidates: np.ndarray, matches: np.ndarray, mismatches: np.ndarray, top_k: int
+    ) -> np.ndarray:
+        """Return the k candidates with most matches and then fewest mismatches, best first.
+
+        Ties are kept in candidate order, so that merging the top k of chunks of candidates
+        gives the top k of all candidates.
+        """
+        scores: np.ndarray = MatchGenotypeService._get_match_scores(
+            matches=matches[candidates], mismatches=mismatches[candidates]
+        )
+        if len(candidates) > top_k:
+            threshold = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            better: np.ndarray = np.flatnonzero(scores > threshold)
+            tied: np.ndarray = np.flatnonzero(scores == threshold)[: top_k - len(better)]
+            top: np.ndarray = np.sort(np.concatenate([better, tied]))
+            candidates, scores = candidates[top], scores[top]
+        return candidates[np.argsort(-scores, kind="stable")]
+
+    @staticmethod
+    def _get_match_scores(matches: np.ndarray, mismatches: np.ndarray) -> np.ndarray:
+        """Return non-negative scores ordering comparisons by most matches, then fewest mismatches."""
+        max_mismatches: int = int(mismatches.max(initial=0))
+        return matches.astype(np.int64) * (max_mismatches + 1) + max_mismatches - mismatches
+
+    @staticmethod
+    def get_top_match_pairs(
+        analysis_ids: np.ndarray,
+        codes: list[np.ndarray],
+        candidate_analysis_ids: np.ndarray,
+        candidate_codes: np.ndarray,
+        top_k: int,
+    ) -> list[Match]:
+        """Return the matches of the top k pairs of each analysis and of each candidate.
+
+        A pair is kept when the candidate is among the k best matches of the analysis, or the
+        analysis among the k best matches of the candidate. Each kept pair gives one match in
+        each direction.
+        """
+        if not codes or not len(candidate_codes):
+            return []
+        matches, mismatches, unknowns = count_genotype_match_matrix(
+            queries=stack_genotype_codes(codes=codes, width=candidate_codes.shape[1]),
+            candidates=candidate_codes,
+        )
+        pairs: set[tuple[int, int]] = set()
+        for row in range(len(codes)):
+            columns: np.ndarray = MatchGenotypeService._get_top_candidates(
+                candidates=np.flatnonzero(matches[row] + unknowns[row] > MIN_MATCHING_CALLS),
+                matches=matches[row],
+                mismatches=mismatches[row],
+                top_k=top_k,
+            )
+            pairs.update((row, int(column)) for column in columns)
+        for column in range(len(candidate_codes)):
+            rows: np.ndarray = MatchGenotypeService._get_top_candidates(
+                candidates=np.flatnonzero(
+                    matches[:, column] + unknowns[:, column] > MIN_MATCHING_CALLS
+                ),
+                matches=matches[:, column],
+                mismatches=mismatches[:, column],
+                top_k=top_k,
+            )
+            pairs.update((int(row), column) for row in rows)
+        return [
+            Match(
+                analysis_id=int(analysis_id),
+                matched_analysis_id=int(matched_analysis_id),
+                match=int(matches[row, column]),
+                mismatch=int(mismatches[row, column]),
+                unknown=int(unknowns[row, column]),
+            )
+            for row, column in sorted(pairs)
+            for analysis_id, matched_analysis_id in (
+                (analysis_ids[row], candidate_analysis_ids[column]),
+                (candidate_analysis_ids[column], analysis_ids[row]),
+            )
+        ]
+
+    @staticmethod
+    def _get_ibs_fractions(
+        ibs0: np.ndarray, ibs1: np.ndarray, ibs2: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return the SNPs compared, the IBS fractions and the fraction of shared alleles."""
+        compared: np.ndarray = ibs0 + ibs1 + ibs2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fractions = [count / compared for count in (ibs0, ibs1, ibs2)]
+        return compared, *fractions, fractions[2] + fractions[1] / 2
+
+    @staticmethod
+    def get_relatedness(
+        query: np.ndarray,
+        candidate_codes: np.ndarray,
+        sample_ids: list[str] | np.ndarray,
+        top_k: int | None = None,
+    ) -> list[RelatednessResult]:
+        """Return the identity by state of a sample with each candidate, most related first.
+
+        Candidates are ranked by the fraction of alleles shared over the SNPs called in both.
+        """
+        query = stack_genotype_codes(codes=[query], width=candidate_codes.shape[1])[0]
+        compared, ibs0, ibs1, ibs2, shared_alleles = MatchGenotypeService._get_ibs_fractions(
+            *count_shared_alleles(query=query, candidates=candidate_codes)
+        )
+        selected: np.ndarray = np.flatnonzero(compared)
+        selected = selected[np.argsort(-shared_alleles[selected], kind="stable")][:top_k]
+        return [
+            RelatednessResult(
+                sample_id=sample_ids[index],
+                compared=int(compared[index]),
+                ibs0=float(ibs0[index]),
+                ibs1=float(ibs1[index]),
+                ibs2=float(ibs2[index]),
+                shared_alleles=float(shared_alleles[index]),
+            )
+            for index in selected
+        ]
 
     @staticmethod
-    def check_sample(sample: Sample) -> SampleDetail:
-        """Check a sample for inconsistencies."""
-        status = check_snps(
-            genotype_analysis=sample.genotype_analysis,
-            sequence_analysis=sample.sequence_analysis,
+    def get_kinship(codes: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """Return the shared allele and IBS0 fraction matrices of the analyses against each other.
+
+        Pairs without SNPs called in both are NaN.
+        """
+        stacked: np.ndarray = stack_genotype_codes(
+            codes=codes, width=max((len(analysis_codes) for analysis_codes in codes), default=0)
+        )
+        _, ibs0, _, _, shared_alleles = MatchGenotypeService._get_ibs_fractions(
+            *count_shared_allele_matrix(queries=stacked, candidates=stacked)
+        )
+        return shared_alleles, ibs0
+
+    @staticmethod
+    def get_sample_swaps(
+        sample_ids: np.ndarray,
+        codes: list[np.ndarray],
+        candidate_sample_ids: np.ndarray,
+        candidate_codes: np.ndarray,
+    ) -> list[SampleSwap]:
+        """Compare all analyses against all candidates and report the likely sample swaps.
+
+        An analysis is a likely swap when its best matching candidate, by most matches and then
+        fewest mismatches, belongs to another sample. Swaps are ranked by how many more
+        matches the other sample has than the own sample.
+        """
+        if not codes or not len(candidate_codes):
+            return []
+        width: int = candidate_codes.shape[1]
+        queries: np.ndarray = stack_genotype_codes(codes=codes, width=width)
+        matches, mismatches, unknowns = count_genotype_match_matrix(
+            queries=queries, candidates=candidate_codes
+        )
+        scores: np.ndarray = np.where(
+            matches + unknowns > MIN_MATCHING_CALLS,
+            MatchGenotypeService._get_match_scores(matches=matches, mismatches=mismatches),
+            -1,
+        )
+        own_scores: np.ndarray = np.where(
+            sample_ids[:, None] == candidate_sample_ids[None, :], scores, -1
+        )
+        best: np.ndarray = scores.argmax(axis=1)
+        own: np.ndarray = own_scores.argmax(axis=1)
+        rows: np.ndarray = np.arange(len(queries))
+        has_own: np.ndarray = own_scores[rows, own] >= 0
+        swapped: np.ndarray = (scores[rows, best] >= 0) & (
+            scores[rows, best] > own_scores[rows, own]
+        )
+
+        def match_counts(row: int, column: int) -> MatchCounts:
+            return MatchCounts(
+                match=int(matches[row, column]),
+                mismatch=int(mismatches[row, column]),
+                unknown=int(unknowns[row, column]),
+            )
+
+        margins: np.ndarray = matches[rows, best] - np.where(has_own, matches[rows, own], 0)
+        return [
+            SampleSwap(
+                sample_id=sample_ids[row],
+                matched_sample_id=candidate_sample_ids[best[row]],
+                match_results=match_counts(row=row, column=best[row]),
+                own_match_results=match_counts(row=row, column=own[row]) if has_own[row] else None,
+            )
+            for row in sorted(np.flatnonzero(swapped), key=lambda row: -margins[row])
+        ]
+
+    @staticmethod
+    def check_sample(
+        sample: Sample, panel: SNPPanel | None = None, cutoffs: dict = CUTOFS
+    ) -> SampleDetail:
+        """Check a sample for inconsistencies against the cutoffs.
+
+        The analyses are compared SNP by SNP on the SNP panel. Without a panel, the SNPs of the
+        genotype analysis are used as the panel.
+        """
+        genotype_analysis: Analysis = sample.genotype_analysis
+        sequence_analysis: Analysis = sample.sequence_analysis
+        if (panel is None or not len(panel)) and genotype_analysis.genotype_blob is None:
+            panel = SNPPanel(
+                rsnumbers=[genotype.rsnumber for genotype in genotype_analysis.genotypes]
+            )
+        genotype_codes: np.ndarray = get_analysis_genotype_codes(
+            analysis=genotype_analysis, panel=panel
+        )
+        status = check_snp_codes(
+            genotype_codes=genotype_codes,
+            sequence_codes=stack_genotype_codes(
+                codes=[get_analysis_genotype_codes(analysis=sequence_analysis, panel=panel)],
+                width=len(genotype_codes),
+            )[0],
+            rsnumbers=panel.rsnumbers if panel is not None and len(panel) else None,
+            cutoffs=cutoffs,
         )
         status.update(
             {
                 "sex": check_sex(
                     sample_sex=sample.sex,
-                    sequence_analysis=sample.sequence_analysis,
-                    genotype_analysis=sample.genotype_analysis,
+                    sequence_analysis=sequence_analysis,
+                    genotype_analysis=genotype_analysis,
                 )
             }
         )
         return SampleDetail(**status)
+
+    @staticmethod
+    def check_samples(
+        samples: list[Sample], panel: SNPPanel | None = None, cutoffs: dict = CUTOFS
+    ) -> list[SampleDetail | None]:
+        """Check several samples for inconsistencies in a single vectorised pass.
+
+        Returns one result per sample, None for samples without both a genotype and a sequence
+        analysis. Without a panel, each sample is checked on its own genotype SNPs.
+        """
+        checked: list[Sample] = [sample for sample in samples if len(sample.analyses) == 2]
+        if panel is None or not len(panel):
+            results = {
+                sample.id: MatchGenotypeService.check_sample(sample=sample, cutoffs=cutoffs)
+                for sample in checked
+            }
+            return [results.get(sample.id) for sample in samples]
+        genotype_codes: np.ndarray = stack_genotype_codes(
+            codes=[
+                get_analysis_genotype_codes(analysis=sample.genotype_analysis, panel=panel)
+                for sample in checked
+            ],
+            width=len(panel),
+        )
+        sequence_codes: np.ndarray = stack_genotype_codes(
+            codes=[
+                get_analysis_genotype_codes(analysis=sample.sequence_analysis, panel=panel)
+                for sample in checked
+            ],
+            width=len(panel),
+        )
+        match, mismatch, unknown = compare_genotype_codes(
+            query=genotype_codes, candidates=sequence_codes
+        )
+        matches, mismatches, unknowns = (
+            np.count_nonzero(mask, axis=1) for mask in (match, mismatch, unknown)
+        )
+        results: dict[str, SampleDetail] = {}
+        for row, sample in enumerate(checked):
+            status: dict = get_snps_status(
+                matches=int(matches[row]),
+                mismatches=int(mismatches[row]),
+                unknown=int(unknowns[row]),
+                failed_snps=[str(rsnumber) for rsnumber in panel.rsnumbers[mismatch[row]]],
+                cutoffs=cutoffs,
+            )
+            status["sex"] = check_sex(
+                sample_sex=sample.sex,
+                sequence_analysis=sample.sequence_analysis,
+                genotype_analysis=sample.genotype_analysis,
+            )
+            results[sample.id] = SampleDetail(**status)
+        return [results.get(sample.id) for sample in samples]
@@ -0,0 +1,52 @@
+"""Module for the metrics of the approximate match mode."""
+
+from genotype_api.config import settings
+from genotype_api.models import ApproximateMatchStats, MatchResult
+
+
+class ApproximateMatchMetrics:
+    """Latency of approximate matches, and their recall and latency against the exact path.
+
+    Every validation_interval-th approximate match is also run exactly, and the recall is the
+    share of the exact matches that the approximate match returned. Each worker process holds
+    its own metrics.
+    """
+
+    def __init__(self, validation_interval: int):
+        self.validation_interval: int = validation_interval
+        self.queries: int = 0
+        self.validated: int = 0
+        self.approximate_seconds: float = 0.0
+        self.exact_seconds: float = 0.0
+        self.recall: float = 0.0
+
+    def add_query(self, seconds: float) -> bool:
+        """Record an approximate match and return whether it should be validated."""
+        self.queries += 1
+        self.approximate_seconds += seconds
+        return bool(self.validation_interval) and self.queries % self.validation_interval == 0
+
+    def add_validation(
+        self, matches: list[MatchResult], exact_matches: list[MatchResult], exact_seconds: float
+    ) -> None:
+        exact_sample_ids: set[str] = {match.sample_id for match in exact_matches}
+        found: set[str] = {match.sample_id for match in matches} & exact_sample_ids
+        self.validated += 1
+        self.exact_seconds += exact_seconds
+        self.recall += len(found) / len(exact_sample_ids) if exact_sample_ids else 1.0
+
+    def get_stats(self) -> ApproximateMatchStats:
+        return ApproximateMatchStats(
+            queries=self.queries,
+            validated=self.validated,
+            mean_recall=self.recall / self.validated if self.validated else None,
+            mean_approximate_ms=(
+                1000 * self.approximate_seconds / self.queries if self.queries else None
+            ),
+            mean_exact_ms=1000 * self.exact_seconds / self.validated if self.validated else None,
+        )
+
+
+approximate_match_metrics = ApproximateMatchMetrics(
+    validation_interval=settings.approximate_match_validation_interval
+)
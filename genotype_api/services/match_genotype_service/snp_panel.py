@@ -0,0 +1,109 @@
+"""Module for the SNP panel that defines the layout of packed genotypes."""
+
+import numpy as np
+
+from genotype_api.database.models import SNP, Analysis, Genotype
+from genotype_api.dto.genotype import GenotypeResponse
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    GENOTYPE_CODE_DTYPE,
+    MISSING_CALL,
+    encode_genotypes,
+    pack_alleles,
+    unpack_alleles,
+)
+
+
+class SNPPanel:
+    """Canonical SNP layout, mapping the rsnumbers of the SNP table to ordered columns.
+
+    Genotypes are projected into this layout once, so that analyses are compared column by
+    column whatever the order of their genotype rows. SNPs an analysis lacks are missing calls.
+    """
+
+    def __init__(self, rsnumbers: list[str]):
+        self.rsnumbers: np.ndarray = np.unique(np.asarray(rsnumbers, dtype=str))
+
+    @classmethod
+    def from_snps(cls, snps: list[SNP]) -> "SNPPanel":
+        return cls(rsnumbers=[snp.id for snp in snps])
+
+    def __len__(self) -> int:
+        return len(self.rsnumbers)
+
+    def get_columns(self, rsnumbers: list[str]) -> np.ndarray:
+        """Return the panel column of each rsnumber, -1 for rsnumbers outside the panel."""
+        rsnumbers: np.ndarray = np.asarray(rsnumbers, dtype=str)
+        if not len(self):
+            return np.full(len(rsnumbers), -1)
+        columns: np.ndarray = np.minimum(np.searchsorted(self.rsnumbers, rsnumbers), len(self) - 1)
+        return np.where(self.rsnumbers[columns] == rsnumbers, columns, -1)
+
+    def _project(self, genotypes: list[Genotype], values: np.ndarray) -> np.ndarray:
+        """Place one value per genotype in the column of its SNP, missing for other columns."""
+        return self._project_rsnumbers(
+            rsnumbers=[genotype.rsnumber for genotype in genotypes], values=values
+        )
+
+    def _project_rsnumbers(self, rsnumbers: list[str], values: np.ndarray) -> np.ndarray:
+        projected = np.full(len(self), MISSING_CALL, dtype=GENOTYPE_CODE_DTYPE)
+        columns: np.ndarray = self.get_columns(rsnumbers)
+        in_panel: np.ndarray = columns >= 0
+        projected[columns[in_panel]] = values[in_panel]
+        return projected
+
+    def project_genotypes(self, genotypes: list[Genotype]) -> np.ndarray:
+        """Return the genotype codes of the genotypes in the panel layout."""
+        return self._project(genotypes=genotypes, values=encode_genotypes(genotypes))
+
+    def pack_genotypes(self, genotypes: list[Genotype]) -> bytes | None:
+        """Return the alleles of the genotypes packed in panel order, None without a panel.
+
+        Genotypes of SNPs outside the panel are left out, SNPs without a genotype are missing.
+        """
+        if not len(self):
+            return None
+        packed_alleles: np.ndarray = np.fromiter(
+            (pack_alleles(genotype.allele_1, genotype.allele_2) for genotype in genotypes),
+            dtype=GENOTYPE_CODE_DTYPE,
+            count=len(genotypes),
+        )
+        return self._project(genotypes=genotypes, values=packed_alleles).tobytes()
+
+    def pack_allele_codes(self, rsnumbers: list[str], packed_alleles: np.ndarray) -> bytes | None:
+        """Return alleles packed one byte per rsnumber in the panel layout, None without a panel."""
+        if not len(self):
+            return None
+        return self._project_rsnumbers(rsnumbers=rsnumbers, values=packed_alleles).tobytes()
+
+    def get_genotypes(self, analysis: Analysis) -> list[GenotypeResponse]:
+        """Return the genotypes of an analysis, rebuilt from its packed genotypes when present."""
+        if analysis.genotype_blob is not None:
+            return self.unpack_genotypes(
+                genotype_blob=analysis.genotype_blob, analysis_id=analysis.id
+            )
+        return [
+            GenotypeResponse(
+                rsnumber=genotype.rsnumber,
+                analysis_id=genotype.analysis_id,
+                allele_1=genotype.allele_1,
+                allele_2=genotype.allele_2,
+            )
+            for genotype in analysis.genotypes
+        ]
+
+    def unpack_genotypes(self, genotype_blob: bytes, analysis_id: int) -> list[GenotypeResponse]:
+        """Rebuild the genotypes of an analysis from its packed genotypes."""
+        genotypes: list[GenotypeResponse] = []
+        for rsnumber, packed_alleles in zip(self.rsnumbers, genotype_blob):
+            if packed_alleles == MISSING_CALL:
+                continue
+            allele_1, allele_2 = unpack_alleles(packed_alleles)
+            genotypes.append(
+                GenotypeResponse(
+                    rsnumber=rsnumber,
+                    analysis_id=analysis_id,
+                    allele_1=allele_1,
+                    allele_2=allele_2,
+                )
+            )
+        return genotypes
@@ -1,9 +1,13 @@
 """Utils functions for the match genotype services."""
 
-from collections import Counter
+import numpy as np
 
 from genotype_api.constants import CUTOFS, Sexes
 from genotype_api.database import models
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    compare_genotype_codes,
+    encode_genotypes,
+)
 
 
 def compare_genotypes(genotype_1: models.Genotype, genotype_2: models.Genotype) -> tuple[str, str]:
@@ -28,21 +32,53 @@ def check_sex(sample_sex, genotype_analysis, sequence_analysis):
 
 
 def check_snps(genotype_analysis, sequence_analysis):
-    genotype_pairs = zip(genotype_analysis.genotypes, sequence_analysis.genotypes)
-    results = dict(
-        compare_genotypes(genotype_1, genotype_2) for genotype_1, genotype_2 in genotype_pairs
+    """Check the genotypes of the two analyses of a sample against each other by rsnumber."""
+    rsnumbers, genotype_rows, sequence_rows = np.intersect1d(
+        np.asarray([genotype.rsnumber for genotype in genotype_analysis.genotypes], dtype=str),
+        np.asarray([genotype.rsnumber for genotype in sequence_analysis.genotypes], dtype=str),
+        return_indices=True,
     )
-    count = Counter([val for key, val in results.items()])
-    unknown = count.get("unknown", 0)
-    matches = count.get("match", 0)
-    mismatches = count.get("mismatch", 0)
+    return check_snp_codes(
+        genotype_codes=encode_genotypes(genotype_analysis.genotypes)[genotype_rows],
+        sequence_codes=encode_genotypes(sequence_analysis.genotypes)[sequence_rows],
+        rsnumbers=rsnumbers.tolist(),
+    )
+
+
+def check_snp_codes(
+    genotype_codes: np.ndarray,
+    sequence_codes: np.ndarray,
+    rsnumbers: list[str] | None,
+    cutoffs: dict = CUTOFS,
+) -> dict:
+    """Check the genotype codes of the two analyses of a sample against each other."""
+    match, mismatch, unknown = compare_genotype_codes(
+        query=genotype_codes, candidates=sequence_codes
+    )
+    return get_snps_status(
+        matches=int(np.count_nonzero(match)),
+        mismatches=int(np.count_nonzero(mismatch)),
+        unknown=int(np.count_nonzero(unknown)),
+        failed_snps=(
+            [str(rsnumbers[column]) for column in np.flatnonzero(mismatch)]
+            if rsnumbers is not None
+            else None
+        ),
+        cutoffs=cutoffs,
+    )
+
+
+def get_snps_status(
+    matches: int, mismatches: int, unknown: int, failed_snps: list[str], cutoffs: dict = CUTOFS
+) -> dict:
     snps = (
         "pass"
-        if all([matches >= CUTOFS.get("min_matches") and mismatches <= CUTOFS.get("max_mismatch")])
+        if all(
+            [matches >= cutoffs.get("min_matches") and mismatches <= cutoffs.get("max_mismatch")]
+        )
         else "fail"
     )
-    nocalls = "pass" if unknown <= CUTOFS.get("max_nocalls") else "fail"
-    failed_snps = [key for key, val in results.items() if val == "mismatch"]
+    nocalls = "pass" if unknown <= cutoffs.get("max_nocalls") else "fail"
 
     return {
         "unknown": unknown,
@@ -0,0 +1,88 @@
+"""Module for the background re-evaluation of sample statuses against new cutoffs."""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from genotype_api.config import settings
+from genotype_api.database.database import get_session
+from genotype_api.database.models import Cutoff
+from genotype_api.database.store import Store
+from genotype_api.models import StatusReevaluationProgress
+from genotype_api.services.status_service.sample_status import SampleStatusService
+
+LOG = logging.getLogger(__name__)
+
+
+class StatusReevaluation:
+    """Recompute the statuses of samples evaluated with an older cutoff version.
+
+    Samples are refreshed batch_size at a time, each batch in its own session, with a pause
+    between batches to leave room for live traffic. Only pass and fail statuses are
+    re-evaluated, so cancelled samples keep their status. Each worker process runs its own job.
+    """
+
+    def __init__(self, batch_size: int, pause: float):
+        self.batch_size: int = batch_size
+        self.pause: float = pause
+        self.progress = StatusReevaluationProgress()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        """Start the re-evaluation in the background, return False if it is already running."""
+        if self.is_running:
+            return False
+        self._task = asyncio.create_task(self.run())
+        return True
+
+    async def stop(self) -> None:
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self) -> StatusReevaluationProgress:
+        """Re-evaluate all outdated samples, picking up cutoff versions added while running."""
+        self.progress = StatusReevaluationProgress(running=True, started_at=datetime.now())
+        try:
+            while reevaluated := await self._reevaluate_batch():
+                self.progress.done += reevaluated
+                LOG.info(f"Re-evaluated {self.progress.done}/{self.progress.total} samples")
+                await asyncio.sleep(self.pause)
+        except Exception as error:
+            LOG.exception("Re-evaluation of the sample statuses failed")
+            self.progress.error = str(error)
+        finally:
+            self.progress.running = False
+            self.progress.finished_at = datetime.now()
+        return self.progress
+
+    async def _reevaluate_batch(self) -> int:
+        async with get_session() as session:
+            store = Store(session)
+            cutoff: Cutoff | None = await store.get_current_cutoff()
+            if cutoff is None:
+                return 0
+            if cutoff.id != self.progress.cutoff_version:
+                self.progress.cutoff_version = cutoff.id
+                self.progress.total = self.progress.done + await store.count_outdated_samples(
+                    cutoff_version=cutoff.id
+                )
+            sample_ids: list[str] = await store.get_outdated_sample_ids(
+                cutoff_version=cutoff.id, limit=self.batch_size
+            )
+            if sample_ids:
+                await SampleStatusService(store).refresh_samples_status(sample_ids=sample_ids)
+            return len(sample_ids)
+
+
+status_reevaluation = StatusReevaluation(
+    batch_size=settings.status_reevaluation_batch_size,
+    pause=settings.status_reevaluation_pause,
+)
@@ -0,0 +1,106 @@
+"""Module for the background worker that refreshes the statuses of dirty samples."""
+
+import asyncio
+import logging
+
+from genotype_api.config import settings
+from genotype_api.database.database import get_session
+from genotype_api.database.store import Store
+from genotype_api.services.status_service.sample_status import SampleStatusService
+
+LOG = logging.getLogger(__name__)
+
+
+class StatusRefreshWorker:
+    """Refresh the statuses of samples flagged as dirty, batch_size samples at a time.
+
+    Changes flag samples as dirty in the database and notify the worker, so several changes to
+    a sample before the worker runs lead to a single refresh. The worker also polls every
+    interval seconds for samples flagged by other processes. A batch is claimed by clearing its
+    flags before the refresh. If the batch fails, its samples are refreshed one at a time, and a
+    sample that fails on its own is logged and left unflagged until it is changed again, so that
+    it does not hold up the other dirty samples.
+    """
+
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size: int = batch_size
+        self.interval: float = interval
+        self._wake_up: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def wake_up(self) -> asyncio.Event:
+        if self._wake_up is None:
+            self._wake_up = asyncio.Event()
+        return self._wake_up
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.is_running:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def notify(self) -> None:
+        """Wake the worker up to refresh the dirty samples."""
+        self.wake_up.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                while await self.refresh_batch():
+                    pass
+            except Exception:
+                LOG.exception("Refreshing the dirty sample statuses failed")
+            self.wake_up.clear()
+            try:
+                await asyncio.wait_for(self.wake_up.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def refresh_batch(self) -> int:
+        """Refresh a batch of dirty samples and return its size."""
+        async with get_session() as session:
+            store = Store(session)
+            sample_ids: list[str] = await store.claim_dirty_samples(limit=self.batch_size)
+            if not sample_ids:
+                return 0
+            status_service = SampleStatusService(store)
+            try:
+                await status_service.refresh_samples_status(sample_ids=sample_ids)
+            except Exception:
+                LOG.exception(
+                    f"Refreshing {len(sample_ids)} samples failed, refreshing them one by one"
+                )
+                await session.rollback()
+                await self._refresh_each_sample(
+                    session=session, status_service=status_service, sample_ids=sample_ids
+                )
+            LOG.debug(f"Refreshed the status of {len(sample_ids)} samples")
+            return len(sample_ids)
+
+    @staticmethod
+    async def _refresh_each_sample(
+        session, status_service: SampleStatusService, sample_ids: list[str]
+    ) -> None:
+        for sample_id in sample_ids:
+            try:
+                await status_service.refresh_samples_status(sample_ids=[sample_id])
+            except Exception:
+                await session.rollback()
+                LOG.exception(f"Refreshing the status of sample {sample_id} failed")
+
+
+status_refresh_worker = StatusRefreshWorker(
+    batch_size=settings.status_refresh_batch_size,
+    interval=settings.status_refresh_interval,
+)
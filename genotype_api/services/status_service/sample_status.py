@@ -0,0 +1,37 @@
+"""Module for the service that checks and stores the statuses of samples."""
+
+from genotype_api.constants import CUTOFS
+from genotype_api.database.models import Cutoff, Sample
+from genotype_api.database.store import Store
+from genotype_api.models import SampleDetail
+from genotype_api.services.executor_service.executor import executor_service
+from genotype_api.services.match_genotype_service.match_genotype import (
+    MatchGenotypeService,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+
+
+class SampleStatusService:
+    """Check samples against the current cutoffs off the event loop and store their statuses."""
+
+    def __init__(self, store: Store):
+        self.store: Store = store
+
+    async def refresh_samples_status(self, sample_ids: list[str]) -> list[Sample]:
+        """Recompute the status of several samples in one pass and commit them together."""
+        samples: list[Sample] = await self.store.get_samples_with_analyses(sample_ids=sample_ids)
+        return await self.refresh_status(samples=samples)
+
+    async def refresh_status(self, samples: list[Sample]) -> list[Sample]:
+        """Recompute the status of samples loaded with their analyses and genotypes."""
+        panel: SNPPanel = SNPPanel.from_snps(await self.store.get_snps())
+        cutoff: Cutoff | None = await self.store.get_current_cutoff()
+        results: list[SampleDetail | None] = await executor_service.run(
+            MatchGenotypeService.check_samples,
+            samples=samples,
+            panel=panel,
+            cutoffs=cutoff.values if cutoff else CUTOFS,
+        )
+        return await self.store.update_samples_status(
+            samples=samples, results=results, cutoff=cutoff
+        )
@@ -3,6 +3,7 @@
 from sqlalchemy.future import select
 from sqlalchemy.orm import Query
 
+from genotype_api.constants import Types
 from genotype_api.database.models import SNP, Analysis, Genotype, Plate, Sample, User
 from genotype_api.database.store import Store
 
@@ -90,23 +91,55 @@ async def test_create_plate(store: Store, test_plate: Plate):
     assert plates[0].id == test_plate.id
 
 
-async def test_create_analyses_samples(store: Store, test_analysis: Analysis):
-    # GIVEN an analysis in a store
-    samples_query: Query = select(Sample)
-    analyses_query: Query = select(Analysis)
-
-    samples = await store.fetch_all_rows(samples_query)
+async def test_create_plate_with_analyses(
+    store: Store, test_plate: Plate, test_analysis: Analysis, test_genotype: Genotype
+):
+    # GIVEN a new plate and a genotype analysis with genotypes for a sample not in the store
+    samples = await store.fetch_all_rows(select(Sample))
     assert not samples
-
-    analyses = await store.fetch_all_rows(analyses_query)
-    assert not analyses
-
-    await store.create_analysis(test_analysis)
-
-    # WHEN creating the analyses samples
-    await store.create_analyses_samples(analyses=[test_analysis])
-
-    # THEN the samples are created
-    sample: Sample = await store.fetch_all_rows(samples_query)[0]
-    assert sample
-    assert sample.id == test_analysis.sample_id
+    test_analysis.id = None
+    test_genotype.analysis_id = None
+    test_analysis.genotypes = [test_genotype]
+
+    # WHEN creating the plate with its analyses in bulk
+    await store.create_plate_with_analyses(
+        plate=test_plate, analyses=[test_analysis], analysis_type=Types.GENOTYPE
+    )
+
+    # THEN the plate, the sample, the analysis and its genotypes are created
+    analysis: Analysis = await store.get_analysis_by_id(analysis_id=test_analysis.id)
+    assert analysis.plate_id == test_plate.id
+    sample: Sample = await store.get_sample_by_id(sample_id=test_analysis.sample_id)
+    assert sample.status_dirty
+    genotypes = await store.fetch_all_rows(
+        select(Genotype).filter(Genotype.analysis_id == test_analysis.id)
+    )
+    assert [genotype.rsnumber for genotype in genotypes] == [test_genotype.rsnumber]
+
+
+async def test_create_analyses_with_genotypes_replaces_analyses(
+    store: Store, another_test_analysis: Analysis
+):
+    # GIVEN a sequence analysis of a sample in the store
+    another_test_analysis.plate_id = None
+    await store.create_analysis(analysis=another_test_analysis)
+
+    # WHEN creating a new sequence analysis of the sample with genotype rows
+    new_analysis = Analysis(
+        type=Types.SEQUENCE, source="new.vcf", sample_id=another_test_analysis.sample_id
+    )
+    await store.create_analyses_with_genotypes(
+        analyses=[new_analysis],
+        analysis_type=Types.SEQUENCE,
+        genotype_rows=[(0, "rs1", "A", "G"), (0, "rs2", "C", "C")],
+    )
+
+    # THEN the new analysis replaces the old one and holds the genotypes
+    analyses = await store.fetch_all_rows(
+        select(Analysis).filter(Analysis.sample_id == another_test_analysis.sample_id)
+    )
+    assert [analysis.id for analysis in analyses] == [new_analysis.id]
+    genotypes = await store.fetch_all_rows(
+        select(Genotype).filter(Genotype.analysis_id == new_analysis.id)
+    )
+    assert sorted(genotype.rsnumber for genotype in genotypes) == ["rs1", "rs2"]
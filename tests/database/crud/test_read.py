@@ -3,7 +3,7 @@
 from datetime import date
 
 from genotype_api.database.filter_models.plate_models import PlateOrderParams
-from genotype_api.database.models import SNP, Analysis, Genotype, Plate, User
+from genotype_api.database.models import SNP, Analysis, Genotype, Plate, Sample, User
 from genotype_api.database.store import Store
 from tests.store_helpers import StoreHelpers
 
@@ -177,6 +177,18 @@ async def test_get_snps_by_limit_and_skip(base_store: Store, test_snps: list[SNP
     assert len(snps) == len(test_snps)
 
 
+async def test_get_plate_status_counts(
+    base_store: Store, test_plate: Plate, test_analysis: Analysis, test_sample: Sample
+):
+    # GIVEN a store with a plate with one analysis of a commented sample
+
+    # WHEN counting the sample statuses on the plate
+    rows = await base_store.get_plate_status_counts(plate_ids=[test_plate.id])
+
+    # THEN the analysis is counted under the status of its sample
+    assert [tuple(row) for row in rows] == [(test_plate.id, test_sample.status, 1, 1)]
+
+
 async def test_get_ordered_plates(
     base_store: Store, test_plates: list[Plate], helpers: StoreHelpers
 ):
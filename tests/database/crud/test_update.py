@@ -4,21 +4,27 @@ from genotype_api.database.filter_models.plate_models import PlateSignOff
 from genotype_api.database.filter_models.sample_models import SampleSexesUpdate
 from genotype_api.database.models import Plate, Sample, User
 from genotype_api.database.store import Store
+from genotype_api.models import SampleDetail
 from tests.store_helpers import StoreHelpers
 
 
-async def test_refresh_sample_status(store: Store, test_sample: Sample, helpers: StoreHelpers):
+async def test_update_samples_status(store: Store, test_sample: Sample, helpers: StoreHelpers):
     # GIVEN a store with a sample with an initial status
     initial_status: str = "initial_status"
     test_sample.status = initial_status
     await helpers.ensure_sample(store=store, sample=test_sample)
 
-    # WHEN updating the sample status
-    await store.refresh_sample_status(sample=test_sample)
+    # WHEN storing a failed check of the sample
+    await store.update_samples_status(
+        samples=[test_sample],
+        results=[SampleDetail(sex="pass", snps="fail", nocalls="pass", mismatches=5)],
+        cutoff=None,
+    )
 
-    # THEN the sample status is updated
+    # THEN the sample status and its QC detail are updated
     updated_sample = await store.get_sample_by_id(sample_id=test_sample.id)
-    assert updated_sample.status != initial_status
+    assert updated_sample.status == "fail"
+    assert updated_sample.mismatches == 5
 
 
 async def test_update_sample_comment(store: Store, test_sample: Sample, helpers: StoreHelpers):
@@ -46,9 +52,10 @@ async def test_update_sample_status(store: Store, test_sample: Sample, helpers:
     new_status: str = "new_status"
     await store.update_sample_status(sample_id=test_sample.id, status=new_status)
 
-    # THEN the sample status is updated
+    # THEN the sample status is updated and marked as set by hand
     updated_sample = await store.get_sample_by_id(sample_id=test_sample.id)
     assert updated_sample.status == new_status
+    assert updated_sample.status_manual
 
 
 async def test_update_user_email(store: Store, test_user: User, helpers: StoreHelpers):
@@ -89,8 +96,21 @@ async def test_update_sample_sex(base_store: Store, sample_sex_update: SampleSex
     # WHEN updating the sex of the sample
     await base_store.update_sample_sex(sample_sex_update)
 
-    # THEN the sex of the sample and analysis is updated
+    # THEN the sex of the sample and analysis is updated and the status is pending a refresh
     updated_sample = await base_store.get_sample_by_id(sample_id=sample_sex_update.sample_id)
     assert updated_sample.sex == sample_sex_update.sex
+    assert updated_sample.status_dirty
     for analysis in updated_sample.analyses:
         assert analysis.sex == sample_sex_update.genotype_sex
+
+
+async def test_claim_dirty_samples(base_store: Store, test_sample: Sample):
+    # GIVEN a store with a sample flagged as dirty
+    await base_store.mark_samples_status_dirty(sample_ids=[test_sample.id])
+
+    # WHEN claiming the dirty samples
+    sample_ids: list[str] = await base_store.claim_dirty_samples(limit=10)
+
+    # THEN the sample is claimed once and its flag is cleared
+    assert sample_ids == [test_sample.id]
+    assert await base_store.claim_dirty_samples(limit=10) == []
@@ -6,9 +6,11 @@ from sqlalchemy.orm import Query
 from genotype_api.database.filters.plate_filters import (
     filter_plates_by_id,
     filter_plates_by_plate_id,
+    filter_plates_with_low_call_rate,
 )
-from genotype_api.database.models import Plate
+from genotype_api.database.models import Analysis, Plate
 from genotype_api.database.store import Store
+from tests.store_helpers import StoreHelpers
 
 
 async def test_filter_plates_by_id(base_store: Store, test_plate: Plate):
@@ -37,3 +39,20 @@ async def test_filter_plates_by_plate_id(base_store: Store, test_plate: Plate):
     # THEN the plate is returned
     assert plate
     assert plate.plate_id == test_plate.plate_id
+
+
+async def test_filter_plates_with_low_call_rate(
+    base_store: Store, test_plate: Plate, test_analysis: Analysis, helpers: StoreHelpers
+):
+    """Test filtering plates with an analysis below a call rate."""
+    # GIVEN a store with a plate with an analysis with a low call rate
+    test_analysis.call_rate = 0.5
+    await helpers.ensure_analysis(store=base_store, analysis=test_analysis)
+
+    # WHEN filtering plates with a call rate below 0.9
+    query: Query = select(Plate)
+    filtered_query = filter_plates_with_low_call_rate(plates=query, max_call_rate=0.9)
+    plates: list[Plate] = await base_store.fetch_all_rows(filtered_query)
+
+    # THEN only the plate of the analysis is returned
+    assert [plate.id for plate in plates] == [test_plate.id]
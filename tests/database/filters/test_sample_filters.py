@@ -10,6 +10,7 @@ from genotype_api.database.filters.sample_filters import (
     filter_samples_by_id,
     filter_samples_contain_id,
     filter_samples_having_comment,
+    filter_samples_with_outdated_cutoff,
     filter_samples_without_status,
 )
 from genotype_api.database.models import Plate, Sample
@@ -183,3 +184,40 @@ async def test_add_skip_and_limit(base_store: Store, test_sample: Sample):
     # THEN one sample is returned
     assert samples
     assert len(samples) == 1
+
+
+async def test_filter_samples_with_outdated_cutoff(
+    base_store: Store, test_sample: Sample, helpers: StoreHelpers
+):
+    """Test filtering samples with a status evaluated with an older cutoff version."""
+    # GIVEN a store with a passed sample evaluated without a cutoff version
+    outdated_sample: Sample = test_sample
+    outdated_sample.status = "pass"
+    outdated_sample.id = "outdated_sample"
+    await helpers.ensure_sample(store=base_store, sample=outdated_sample)
+
+    # WHEN filtering samples with an outdated cutoff version
+    query: Query = select(Sample)
+    filtered_query = filter_samples_with_outdated_cutoff(samples=query, cutoff_version=1)
+    samples: list[Sample] = await base_store.fetch_all_rows(filtered_query)
+
+    # THEN only the passed sample is returned
+    assert [sample.id for sample in samples] == [outdated_sample.id]
+
+
+async def test_filter_samples_with_outdated_cutoff_skips_manual_statuses(
+    base_store: Store, test_sample: Sample, helpers: StoreHelpers
+):
+    """Test that samples with a status set by hand are not re-evaluated."""
+    # GIVEN a store with a sample failed by hand without a cutoff version
+    test_sample.status = "fail"
+    test_sample.status_manual = True
+    await helpers.ensure_sample(store=base_store, sample=test_sample)
+
+    # WHEN filtering samples with an outdated cutoff version
+    query: Query = select(Sample)
+    filtered_query = filter_samples_with_outdated_cutoff(samples=query, cutoff_version=1)
+    samples: list[Sample] = await base_store.fetch_all_rows(filtered_query)
+
+    # THEN the manual status is kept out of the re-evaluation
+    assert not samples
@@ -0,0 +1,42 @@
+"""Module to test the parsing of genotype Excel plates."""
+
+from pathlib import Path
+
+from genotype_api.database.models import Analysis
+from genotype_api.file_parsing.excel import GenotypeAnalysis
+
+EXCEL_FILE: Path = Path("tests/fixtures/excel/genotype_test_plate.xlsx")
+
+
+def _get_analysis_values(analysis: Analysis) -> tuple:
+    return (
+        analysis.sample_id,
+        analysis.sex,
+        [
+            (genotype.rsnumber, genotype.allele_1, genotype.allele_2)
+            for genotype in analysis.genotypes
+        ],
+    )
+
+
+def test_read_analyses_streams_the_same_analyses():
+    # GIVEN a genotype plate parsed with the full workbook loaded
+    analyses: list[Analysis] = list(
+        GenotypeAnalysis(
+            excel_file=EXCEL_FILE, file_name=EXCEL_FILE.name, include_key="-CG-"
+        ).generate_analyses(plate_id=1)
+    )
+
+    # WHEN reading the plate in read only mode
+    streamed_analyses: list[Analysis] = GenotypeAnalysis.read_analyses(
+        excel_file=EXCEL_FILE.read_bytes(),
+        file_name=EXCEL_FILE.name,
+        include_key="-CG-",
+        plate_id=1,
+    )
+
+    # THEN the same analyses are parsed
+    assert analyses
+    assert [_get_analysis_values(analysis) for analysis in streamed_analyses] == [
+        _get_analysis_values(analysis) for analysis in analyses
+    ]
@@ -0,0 +1,182 @@
+"""Module to test the parsing of sequence VCFs."""
+
+import gzip
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import HTTPException, UploadFile, status
+
+from genotype_api.database.models import Analysis
+from genotype_api.file_parsing.files import read_upload_lines
+from genotype_api.file_parsing.vcf import SequenceAnalysis
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    count_calls,
+    encode_genotypes,
+    pack_alleles,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+
+VCF_FILE: Path = Path("tests/fixtures/vcfs/sequence.vcf")
+
+
+def _get_analysis_values(analysis: Analysis) -> tuple:
+    return (
+        analysis.sample_id,
+        [
+            (genotype.rsnumber, genotype.allele_1, genotype.allele_2)
+            for genotype in analysis.genotypes
+        ],
+    )
+
+
+async def _read_upload(
+    file: UploadFile, chunk_size: int, compressed: bool = False
+) -> list[Analysis]:
+    sequence_analysis = SequenceAnalysis(source=VCF_FILE.name)
+    async for lines in read_upload_lines(file=file, chunk_size=chunk_size, compressed=compressed):
+        sequence_analysis.read_lines(lines)
+    return list(sequence_analysis.generate_analyses())
+
+
+async def test_read_upload_lines_splits_lines_across_chunks():
+    # GIVEN an upload with multi-byte characters and no trailing newline
+    content: str = "##åäö\n#CHROM\tPOS\nlast line"
+    upload = UploadFile(file=BytesIO(content.encode("utf-8")), filename="test.vcf")
+
+    # WHEN reading its lines in chunks smaller than the lines and characters
+    lines: list[str] = [
+        line
+        async for chunk_lines in read_upload_lines(file=upload, chunk_size=3)
+        for line in chunk_lines
+    ]
+
+    # THEN the lines are the lines of the whole content
+    assert lines == content.split("\n")
+
+
+async def test_streamed_vcf_gives_the_same_analyses():
+    # GIVEN a VCF parsed from the whole decoded file
+    analyses: list[Analysis] = list(
+        SequenceAnalysis(source=VCF_FILE.name, vcf_file=VCF_FILE.read_text()).generate_analyses()
+    )
+
+    # WHEN streaming the VCF upload in small chunks
+    upload = UploadFile(file=BytesIO(VCF_FILE.read_bytes()), filename=VCF_FILE.name)
+    streamed_analyses: list[Analysis] = await _read_upload(file=upload, chunk_size=64)
+
+    # THEN the same analyses are parsed, with a genotype per sample and variant
+    assert [analysis.sample_id for analysis in analyses] == ["sample", "sample2", "sample3"]
+    assert all(len(analysis.genotypes) == 5 for analysis in analyses)
+    assert [_get_analysis_values(analysis) for analysis in streamed_analyses] == [
+        _get_analysis_values(analysis) for analysis in analyses
+    ]
+
+
+def test_genotype_field_is_picked_by_its_format_index():
+    # GIVEN a VCF whose FORMAT lists the GT field after the depth
+    vcf: str = "\n".join(
+        [
+            "##fileformat=VCFv4.1",
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tsample\tsample2",
+            "1\t100\trs1\tC\tT\t50\tPASS\t.\tDP:GT\t24:C/T\t12:T|T",
+            "2\t200\trs2\tG\tA\t50\tPASS\t.\tGT:DP\t0/0\tA/G:3",
+        ]
+    )
+
+    # WHEN parsing the VCF
+    analyses: list[Analysis] = list(
+        SequenceAnalysis(source="test.vcf", vcf_file=vcf).generate_analyses()
+    )
+
+    # THEN the alleles are read from the GT field of each record
+    assert [_get_analysis_values(analysis) for analysis in analyses] == [
+        ("sample", [("rs1", "C", "T"), ("rs2", "0", "0")]),
+        ("sample2", [("rs1", "T", "T"), ("rs2", "A", "G")]),
+    ]
+
+
+def test_generate_analyses_packs_the_genotypes_on_the_panel():
+    # GIVEN a parsed VCF and a SNP panel with one of its SNPs and another SNP
+    sequence_analysis = SequenceAnalysis(source=VCF_FILE.name, vcf_file=VCF_FILE.read_text())
+    panel = SNPPanel(rsnumbers=["rs1065772", "rs9999999"])
+
+    # WHEN generating the analyses with the panel
+    analyses: list[Analysis] = list(sequence_analysis.generate_analyses(panel=panel))
+
+    # THEN the packed genotypes and call counts are those of the genotype rows
+    for analysis in analyses:
+        assert analysis.genotype_blob == panel.pack_genotypes(analysis.genotypes)
+        codes: np.ndarray = encode_genotypes(analysis.genotypes)
+        assert (analysis.known_calls, analysis.unknown_calls) == count_calls(codes)
+
+
+def test_genotype_rows_are_the_genotypes_of_the_analyses():
+    # GIVEN a parsed VCF
+    sequence_analysis = SequenceAnalysis(source=VCF_FILE.name, vcf_file=VCF_FILE.read_text())
+
+    # WHEN generating the genotype rows for a bulk insert instead of genotype objects
+    analyses: list[Analysis] = list(sequence_analysis.generate_analyses(with_genotypes=False))
+    genotype_rows: list[tuple] = list(sequence_analysis.generate_genotype_rows())
+
+    # THEN the rows hold the genotypes the analyses otherwise get
+    assert not any(analysis.genotypes for analysis in analyses)
+    assert genotype_rows == [
+        (index, genotype.rsnumber, genotype.allele_1, genotype.allele_2)
+        for index, analysis in enumerate(sequence_analysis.generate_analyses())
+        for genotype in analysis.genotypes
+    ]
+
+
+def test_genotype_rows_keep_alleles_outside_the_alphabet():
+    # GIVEN a VCF with a missing call and lowercase alleles
+    vcf: str = "\n".join(
+        [
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tsample",
+            "1\t100\trs1\tC\tT\t50\tPASS\t.\tGT\t./.",
+            "2\t200\trs2\tG\tA\t50\tPASS\t.\tGT\ta/g",
+        ]
+    )
+    sequence_analysis = SequenceAnalysis(source="test.vcf", vcf_file=vcf)
+
+    # WHEN generating the genotype rows and the packed alleles
+    genotype_rows: list[tuple] = list(sequence_analysis.generate_genotype_rows())
+    allele_codes: np.ndarray = sequence_analysis.get_allele_codes()
+
+    # THEN the rows hold the parsed alleles, while only the packed alleles hold them as no-calls
+    assert genotype_rows == [(0, "rs1", ".", "."), (0, "rs2", "a", "g")]
+    assert allele_codes[0, 1] == pack_alleles("0", "0")
+
+
+async def test_compressed_vcf_gives_the_same_analyses():
+    # GIVEN a VCF compressed as concatenated gzip members, like the blocks of a BGZF file
+    content: bytes = VCF_FILE.read_bytes()
+    compressed: bytes = b"".join(
+        gzip.compress(content[start : start + 1000]) for start in range(0, len(content), 1000)
+    )
+    upload = UploadFile(file=BytesIO(content), filename=VCF_FILE.name)
+    compressed_upload = UploadFile(file=BytesIO(compressed), filename=f"{VCF_FILE.name}.gz")
+
+    # WHEN streaming the compressed upload in small chunks
+    analyses: list[Analysis] = await _read_upload(file=upload, chunk_size=64)
+    decompressed_analyses: list[Analysis] = await _read_upload(
+        file=compressed_upload, chunk_size=64, compressed=True
+    )
+
+    # THEN the same analyses are parsed as from the plain VCF
+    assert [_get_analysis_values(analysis) for analysis in decompressed_analyses] == [
+        _get_analysis_values(analysis) for analysis in analyses
+    ]
+
+
+async def test_truncated_compressed_vcf_is_rejected():
+    # GIVEN a gzip compressed VCF missing its end
+    compressed: bytes = gzip.compress(VCF_FILE.read_bytes())
+    upload = UploadFile(file=BytesIO(compressed[: len(compressed) // 2]), filename="test.vcf.gz")
+
+    # WHEN streaming the upload
+    # THEN it is rejected as a bad request
+    with pytest.raises(HTTPException) as error:
+        await _read_upload(file=upload, chunk_size=64, compressed=True)
+    assert error.value.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,68 @@
+"""Module to test the analysis service."""
+
+from io import BytesIO
+from pathlib import Path
+
+from fastapi import UploadFile
+
+from genotype_api.config import settings
+from genotype_api.constants import Types
+from genotype_api.database.models import SNP, Analysis
+from genotype_api.dto.analysis import AnalysisResponse
+from genotype_api.file_parsing.vcf import SequenceAnalysis
+from genotype_api.services.endpoint_services import analysis_service
+from genotype_api.services.endpoint_services.analysis_service import AnalysisService
+from genotype_api.services.match_genotype_service.fingerprint_index import FingerprintIndex
+
+VCF_FILE: Path = Path("tests/fixtures/vcfs/sequence.vcf")
+
+
+class EmptyPanelStore:
+    """Store without SNPs holding the inserted analyses in memory."""
+
+    def __init__(self):
+        self.analyses: list[Analysis] = []
+
+    async def get_snps(self) -> list[SNP]:
+        return []
+
+    async def create_analyses_with_genotypes(
+        self, analyses: list[Analysis], analysis_type: Types, genotype_rows=None
+    ) -> list[Analysis]:
+        for analysis_id, analysis in enumerate(analyses, start=1):
+            analysis.id = analysis_id
+        self.analyses = analyses
+        return analyses
+
+
+async def test_upload_sequence_analyses_without_snps_stores_unpacked_genotypes(monkeypatch):
+    # GIVEN a store without SNPs and a VCF file
+    index = FingerprintIndex()
+    monkeypatch.setattr(analysis_service, "fingerprint_index", index)
+    monkeypatch.setattr(settings, "use_match_table", False)
+    store = EmptyPanelStore()
+    upload = UploadFile(file=BytesIO(VCF_FILE.read_bytes()), filename=VCF_FILE.name)
+
+    # WHEN uploading the VCF file
+    analyses: list[AnalysisResponse] = await AnalysisService(
+        store=store
+    ).get_upload_sequence_analyses(upload)
+
+    # THEN the analyses are indexed on their genotype rows
+    assert len(index) == len(analyses)
+    assert index.codes.shape[1] > 0
+
+    # THEN the analyses are stored with their genotype rows and without packed genotypes
+    expected: list[Analysis] = SequenceAnalysis(
+        source=VCF_FILE.name, vcf_file=VCF_FILE.read_text()
+    ).generate_analyses()
+    assert len(analyses) == len(expected)
+    for analysis, expected_analysis in zip(store.analyses, expected):
+        assert analysis.genotype_blob is None
+        assert [
+            (genotype.rsnumber, genotype.allele_1, genotype.allele_2)
+            for genotype in analysis.genotypes
+        ] == [
+            (genotype.rsnumber, genotype.allele_1, genotype.allele_2)
+            for genotype in expected_analysis.genotypes
+        ]
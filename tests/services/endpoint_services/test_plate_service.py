@@ -0,0 +1,59 @@
+"""Module to test the plate service."""
+
+from genotype_api.database.filter_models.plate_models import PlateOrderParams
+from genotype_api.database.models import Plate
+from genotype_api.dto.plate import PlateResponse, PlateStatusCounts
+from genotype_api.services.endpoint_services.plate_service import PlateService
+
+
+class StatusCountsStore:
+    """Store returning fixed plate status counts."""
+
+    def __init__(self, rows: list[tuple]):
+        self.rows: list[tuple] = rows
+
+    async def get_plate_status_counts(self, plate_ids: list[int]) -> list[tuple]:
+        return [row for row in self.rows if row[0] in plate_ids]
+
+
+async def test_get_plates_status_counts():
+    # GIVEN status counts of two plates grouped by sample status
+    store = StatusCountsStore(
+        rows=[
+            (1, "pass", 3, 1),
+            (1, "fail", 2, 2),
+            (1, None, 1, 0),
+            (2, "cancel", 4, 0),
+        ]
+    )
+
+    # WHEN getting the status counts of the plates
+    counts: dict[int, PlateStatusCounts] = await PlateService(store=store).get_plates_status_counts(
+        plate_ids=[1, 2]
+    )
+
+    # THEN the counts are summed per plate
+    assert counts == {
+        1: PlateStatusCounts(total=6, passed=3, failed=2, unknown=1, commented=3),
+        2: PlateStatusCounts(total=4, cancelled=4),
+    }
+
+
+class PlatesStore(StatusCountsStore):
+    """Store returning the plate rows only."""
+
+    async def get_ordered_plates(self, order_params: PlateOrderParams) -> list[Plate]:
+        return [Plate(id=1, plate_id="ID_1")]
+
+
+async def test_get_plates_returns_status_counts_without_analyses():
+    # GIVEN a store with a plate and the status counts of its samples
+    plate_service = PlateService(store=PlatesStore(rows=[(1, "pass", 2, 1)]))
+    order_params = PlateOrderParams(order_by="id", skip=0, limit=10)
+
+    # WHEN listing the plates
+    plates: list[PlateResponse] = await plate_service.get_plates(order_params=order_params)
+
+    # THEN the plate rows are returned with their status counts and without analyses
+    assert plates[0].analyses is None
+    assert plates[0].plate_status_counts == PlateStatusCounts(total=2, passed=2, commented=1)
@@ -0,0 +1,231 @@
+"""Module to test the sample service."""
+
+import random
+from datetime import date, datetime
+from typing import AsyncIterator
+
+import pytest
+
+from genotype_api.config import settings
+from genotype_api.constants import Types
+from genotype_api.database.models import SNP, Analysis, Cutoff, Genotype, Match, Sample
+from genotype_api.models import MatchResult, SampleDetail
+from genotype_api.services.endpoint_services import base_service, sample_service
+from genotype_api.services.endpoint_services.sample_service import SampleService
+from genotype_api.services.match_genotype_service.fingerprint_index import FingerprintIndex
+from genotype_api.services.match_genotype_service.match_cache import MatchCache, MatchCacheKey
+from genotype_api.services.match_genotype_service.match_genotype import MatchGenotypeService
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+
+
+def _analysis(analysis_id: int, analysis_type: Types, randomizer: random.Random) -> Analysis:
+    genotypes: list[Genotype] = [
+        Genotype(
+            rsnumber=f"rs{snp}",
+            allele_1=randomizer.choice("AC0"),
+            allele_2=randomizer.choice("AC"),
+        )
+        for snp in range(60)
+    ]
+    return Analysis(
+        id=analysis_id,
+        sample_id=f"sample_{analysis_id}",
+        type=analysis_type,
+        created_at=datetime(2024, 1, 1),
+        genotypes=genotypes,
+    )
+
+
+@pytest.fixture
+def loaded_index(monkeypatch) -> FingerprintIndex:
+    randomizer = random.Random(3)
+    index = FingerprintIndex()
+    index.load(
+        analyses=[_analysis(0, Types.GENOTYPE, randomizer)]
+        + [_analysis(analysis_id, Types.SEQUENCE, randomizer) for analysis_id in range(1, 30)]
+    )
+    monkeypatch.setattr(base_service, "fingerprint_index", index)
+    monkeypatch.setattr(settings, "match_scan_chunk_size", 7)
+    return index
+
+
+async def _collect_match_results(sample_service: SampleService) -> list[MatchResult]:
+    return [
+        match_result
+        async for match_result in sample_service.iter_match_results(
+            sample_id="sample_0",
+            analysis_type=Types.GENOTYPE,
+            comparison_set=Types.SEQUENCE,
+            date_min=date(2023, 1, 1),
+            date_max=date(2025, 1, 1),
+        )
+    ]
+
+
+async def test_iter_match_results_streams_all_match_results(loaded_index: FingerprintIndex):
+    # GIVEN a loaded fingerprint index with a genotype analysis and sequence analyses
+
+    # WHEN streaming the match results of the genotype analysis in chunks
+    match_results: list[MatchResult] = await _collect_match_results(SampleService(store=None))
+
+    # THEN the streamed results equal matching all candidates at once
+    sample_ids, candidate_codes = loaded_index.get_analyses_between_dates(
+        analysis_type=Types.SEQUENCE, date_min=date(2023, 1, 1), date_max=date(2025, 1, 1)
+    )
+    assert match_results == MatchGenotypeService.get_code_matches(
+        query=loaded_index.get_analysis_codes(sample_id="sample_0", analysis_type=Types.GENOTYPE),
+        candidate_codes=candidate_codes,
+        sample_ids=sample_ids,
+    )
+    assert len(match_results) > 7
+
+
+async def test_approximate_match_without_index_is_cached_as_exact(monkeypatch):
+    # GIVEN a fingerprint index that is not loaded and an empty match cache
+    cache = MatchCache(max_size=10, ttl=60)
+    monkeypatch.setattr(sample_service, "fingerprint_index", FingerprintIndex())
+    monkeypatch.setattr(sample_service, "match_cache", cache)
+    monkeypatch.setattr(settings, "use_match_table", False)
+    service = SampleService(store=None)
+    exact_matches: list[MatchResult] = [MatchResult(sample_id="sample_1")]
+
+    async def _get_analysis_codes(sample_id: str, analysis_type: Types) -> list[int]:
+        return [17]
+
+    async def _get_streamed_match_results(**kwargs) -> list[MatchResult]:
+        return exact_matches
+
+    monkeypatch.setattr(service, "get_analysis_codes", _get_analysis_codes)
+    monkeypatch.setattr(service, "_get_streamed_match_results", _get_streamed_match_results)
+    match_key = dict(
+        sample_id="sample_0",
+        analysis_type=Types.GENOTYPE,
+        comparison_set=Types.SEQUENCE,
+        date_min=date(2023, 1, 1),
+        date_max=date(2025, 1, 1),
+    )
+
+    # WHEN asking for approximate matches
+    matches: list[MatchResult] = await service.get_match_results(approximate=True, **match_key)
+
+    # THEN the exact matches are returned and cached as exact matches
+    assert matches == exact_matches
+    assert cache.get(MatchCacheKey(**match_key, approximate=False)) == exact_matches
+    assert cache.get(MatchCacheKey(**match_key, approximate=True)) is None
+
+
+class CutoffStore:
+    """Store with a sample whose analyses agree on 40 SNPs and a strict current cutoff."""
+
+    def __init__(self, cutoff: Cutoff):
+        self.cutoff: Cutoff = cutoff
+
+    async def get_sample_by_id(self, sample_id: str) -> Sample:
+        analyses: list[Analysis] = [
+            Analysis(
+                id=analysis_id,
+                sample_id=sample_id,
+                type=analysis_type,
+                sex="male",
+                genotypes=[
+                    Genotype(rsnumber=f"rs{snp}", allele_1="A", allele_2="C") for snp in range(40)
+                ],
+            )
+            for analysis_id, analysis_type in ((1, Types.GENOTYPE), (2, Types.SEQUENCE))
+        ]
+        return Sample(id=sample_id, sex="male", analyses=analyses)
+
+    async def get_current_cutoff(self) -> Cutoff:
+        return self.cutoff
+
+    async def get_snps(self) -> list[SNP]:
+        return []
+
+
+async def test_get_status_detail_uses_the_current_cutoff():
+    # GIVEN a sample with 40 matching SNPs and a current cutoff requiring 50 matches
+    cutoff = Cutoff(id=2, max_nocalls=15, max_mismatch=3, min_matches=50)
+    sample_service = SampleService(store=CutoffStore(cutoff=cutoff))
+
+    # WHEN getting the status detail of the sample
+    detail: SampleDetail = await sample_service.get_status_detail(sample_id="sample_1")
+
+    # THEN the SNPs are checked against the current cutoff
+    assert detail.matches == 40
+    assert detail.snps == "fail"
+
+
+def test_sample_response_detail_is_read_from_the_sample():
+    # GIVEN a sample with two analyses and a stored QC detail
+    randomizer = random.Random(4)
+    panel = SNPPanel(rsnumbers=[f"rs{snp}" for snp in range(60)])
+    analyses: list[Analysis] = [
+        _analysis(1, Types.GENOTYPE, randomizer),
+        _analysis(2, Types.SEQUENCE, randomizer),
+    ]
+    for analysis in analyses:
+        analysis.genotype_blob = panel.pack_genotypes(analysis.genotypes)
+    sample = Sample(
+        id="sample_1",
+        sex="male",
+        analyses=analyses,
+        matches=50,
+        mismatches=1,
+        unknown=9,
+        snps_status="pass",
+        nocalls_status="pass",
+        sex_status="fail",
+        failed_snps=["rs7"],
+    )
+
+    # WHEN creating the sample response
+    response = SampleService(store=None)._get_sample_response(sample=sample, panel=panel)
+
+    # THEN the detail is the stored one
+    assert response.detail == SampleDetail(
+        matches=50,
+        mismatches=1,
+        unknown=9,
+        snps="pass",
+        nocalls="pass",
+        sex="fail",
+        failed_snps=["rs7"],
+    )
+
+
+class MatchesStore:
+    """Store with analyses of both types, recording the replaced matches."""
+
+    def __init__(self, analyses: list[Analysis]):
+        self.analyses: list[Analysis] = analyses
+        self.loaded_types: list[Types] = []
+        self.match_batches: list[list[Match]] = []
+
+    async def get_snps(self) -> list[SNP]:
+        return [SNP(id=f"rs{snp}") for snp in range(60)]
+
+    async def get_analyses_by_type(self, analysis_type: Types) -> list[Analysis]:
+        self.loaded_types.append(analysis_type)
+        return [analysis for analysis in self.analyses if analysis.type == analysis_type]
+
+    async def replace_matches(self, match_batches: AsyncIterator[list[Match]]) -> int:
+        self.match_batches = [matches async for matches in match_batches]
+        return sum(len(matches) for matches in self.match_batches)
+
+
+async def test_rebuild_matches_loads_the_candidates_once(monkeypatch):
+    # GIVEN a store with five genotype analyses and three sequence analyses
+    randomizer = random.Random(5)
+    store = MatchesStore(
+        analyses=[_analysis(analysis_id, Types.GENOTYPE, randomizer) for analysis_id in range(5)]
+        + [_analysis(analysis_id, Types.SEQUENCE, randomizer) for analysis_id in range(5, 8)]
+    )
+    monkeypatch.setattr(settings, "match_table_top_k", 2)
+
+    # WHEN rebuilding the matches in chunks of two genotype analyses
+    await SampleService(store=store).rebuild_matches(chunk_size=2)
+
+    # THEN each type is loaded once and the top matches of every chunk replace the table
+    assert store.loaded_types == [Types.GENOTYPE, Types.SEQUENCE]
+    assert len(store.match_batches) == 3
+    assert all(matches for matches in store.match_batches)
@@ -0,0 +1,78 @@
+"""Module to test the SNP service."""
+
+from genotype_api.database.models import SNP, Analysis, Genotype
+from genotype_api.services.endpoint_services import snp_service
+from genotype_api.services.endpoint_services.snp_service import SNPService
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.snp_reader_service.snp_reader import SNPReaderService
+
+
+class SNPStore:
+    """Store holding SNPs and analyses in memory."""
+
+    def __init__(self, snps: list[SNP], analyses: list[Analysis]):
+        self.snps: list[SNP] = snps
+        self.analyses: list[Analysis] = analyses
+        self.genotype_blobs: dict[int, bytes | None] = {}
+
+    async def get_snps(self) -> list[SNP]:
+        return self.snps
+
+    async def create_snps(self, snps: list[SNP]) -> list[SNP]:
+        self.snps = snps
+        return snps
+
+    async def delete_snps(self):
+        class Result:
+            rowcount: int = len(self.snps)
+
+        self.snps = []
+        return Result()
+
+    async def get_analyses_with_genotype_rows(self, after_id: int, limit: int) -> list[Analysis]:
+        return [analysis for analysis in self.analyses if analysis.id > after_id][:limit]
+
+    async def update_analyses_genotype_blobs(self, genotype_blobs: dict[int, bytes | None]) -> None:
+        self.genotype_blobs.update(genotype_blobs)
+
+
+async def test_delete_all_snps_repacks_the_genotypes():
+    # GIVEN an analysis packed on a panel of two SNPs
+    snps: list[SNP] = [SNP(id="rs1"), SNP(id="rs2")]
+    genotypes: list[Genotype] = [Genotype(rsnumber="rs1", allele_1="A", allele_2="G")]
+    analysis = Analysis(
+        id=1,
+        genotypes=genotypes,
+        genotype_blob=SNPPanel.from_snps(snps).pack_genotypes(genotypes),
+    )
+    store = SNPStore(snps=snps, analyses=[analysis])
+
+    # WHEN deleting the SNPs
+    deleted: int = await SNPService(store=store).delete_all_snps()
+
+    # THEN the packed genotypes of the analysis no longer refer to the deleted panel
+    assert deleted == 2
+    assert store.genotype_blobs == {1: None}
+
+
+async def test_upload_snps_repacks_the_genotypes_in_batches(monkeypatch):
+    # GIVEN three unpacked analyses, repacked two at a time
+    monkeypatch.setattr(snp_service, "REPACK_BATCH_SIZE", 2)
+    analyses: list[Analysis] = [
+        Analysis(id=analysis_id, genotypes=[Genotype(rsnumber="rs1", allele_1="A", allele_2="G")])
+        for analysis_id in range(1, 4)
+    ]
+    store = SNPStore(snps=[], analyses=analyses)
+    snps: list[SNP] = [SNP(id="rs1"), SNP(id="rs2")]
+
+    async def read_snps_from_file(snps_file) -> list[SNP]:
+        return snps
+
+    monkeypatch.setattr(SNPReaderService, "read_snps_from_file", read_snps_from_file)
+
+    # WHEN uploading the SNPs
+    await SNPService(store=store).upload_snps(snps_file=None)
+
+    # THEN the genotypes of all analyses are packed in the layout of the new panel
+    packed: bytes = SNPPanel.from_snps(snps).pack_genotypes(analyses[0].genotypes)
+    assert store.genotype_blobs == {1: packed, 2: packed, 3: packed}
@@ -0,0 +1,48 @@
+"""Module to test the executor of CPU heavy work."""
+
+import asyncio
+import time
+
+import pytest
+
+from genotype_api.constants import ExecutorType
+from genotype_api.exceptions import ExecutorTimeoutError
+from genotype_api.services.executor_service.executor import ExecutorService
+
+
+async def test_run_returns_result_of_function():
+    # GIVEN an executor with a thread pool
+    executor = ExecutorService(executor_type=ExecutorType.THREAD, max_workers=2, timeout=10)
+
+    # WHEN running a function with arguments in the pool
+    result: int = await executor.run(pow, 2, exp=10)
+
+    # THEN the result of the function is returned
+    assert result == 1024
+    executor.shutdown()
+
+
+async def test_run_raises_when_job_times_out():
+    # GIVEN an executor with a short timeout
+    executor = ExecutorService(executor_type=ExecutorType.THREAD, max_workers=1, timeout=0.01)
+
+    # WHEN running a function that takes longer than the timeout
+    # THEN the job times out
+    with pytest.raises(ExecutorTimeoutError):
+        await executor.run(time.sleep, 0.5)
+    executor.shutdown()
+
+
+async def test_timed_out_job_keeps_its_slot_until_it_finishes():
+    # GIVEN an executor with a single slot and a short timeout
+    executor = ExecutorService(executor_type=ExecutorType.THREAD, max_workers=1, timeout=0.01)
+
+    # WHEN a job times out while it is still running in the pool
+    with pytest.raises(ExecutorTimeoutError):
+        await executor.run(time.sleep, 0.2)
+
+    # THEN its slot is only released when the job finishes
+    assert executor.slots.locked()
+    await asyncio.sleep(0.3)
+    assert not executor.slots.locked()
+    executor.shutdown()
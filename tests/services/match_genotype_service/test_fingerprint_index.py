@@ -0,0 +1,84 @@
+"""Module to test the in memory fingerprint index."""
+
+from datetime import date, datetime
+
+import numpy as np
+
+from genotype_api.constants import Types
+from genotype_api.database.models import Analysis, Genotype
+from genotype_api.services.match_genotype_service.fingerprint_index import FingerprintIndex
+from genotype_api.services.match_genotype_service.genotype_codes import encode_genotypes
+
+
+def _analysis(analysis_id: int, sample_id: str, created_at: datetime, alleles: str) -> Analysis:
+    genotypes: list[Genotype] = [
+        Genotype(rsnumber=f"rs{index}", allele_1=allele, allele_2=allele)
+        for index, allele in enumerate(alleles)
+    ]
+    return Analysis(
+        id=analysis_id,
+        sample_id=sample_id,
+        type=Types.GENOTYPE,
+        created_at=created_at,
+        genotypes=genotypes,
+    )
+
+
+def _index(analyses: list[Analysis]) -> FingerprintIndex:
+    index = FingerprintIndex()
+    index.load(analyses=analyses)
+    return index
+
+
+def test_get_analyses_between_dates():
+    # GIVEN an index with analyses created on different dates
+    index: FingerprintIndex = _index(
+        [
+            _analysis(1, "early", datetime(2024, 1, 1, 12), alleles="AC"),
+            _analysis(2, "late", datetime(2024, 6, 1, 12), alleles="ACG"),
+        ]
+    )
+
+    # WHEN selecting analyses in a date range including only the first day
+    sample_ids, codes = index.get_analyses_between_dates(
+        analysis_type=Types.GENOTYPE, date_min=date(2024, 1, 1), date_max=date(2024, 1, 1)
+    )
+
+    # THEN only the analysis created on that day is returned, padded to the index width
+    assert sample_ids.tolist() == ["early"]
+    assert codes.shape == (1, 3)
+
+
+def test_add_analyses_replaces_analysis_of_same_sample():
+    # GIVEN an index with an analysis for a sample
+    index: FingerprintIndex = _index([_analysis(1, "sample", datetime.now(), alleles="AC")])
+
+    # WHEN adding a new analysis of the same type for the sample
+    new_analysis: Analysis = _analysis(2, "sample", datetime.now(), alleles="GT")
+    index.add_analyses(
+        analyses=[new_analysis], genotype_codes=[encode_genotypes(new_analysis.genotypes)]
+    )
+
+    # THEN the index holds only the new analysis
+    assert index.analysis_ids.tolist() == [2]
+    assert np.array_equal(
+        index.get_analysis_codes(sample_id="sample", analysis_type=Types.GENOTYPE),
+        encode_genotypes(new_analysis.genotypes),
+    )
+
+
+def test_remove_analyses():
+    # GIVEN an index with two analyses
+    index: FingerprintIndex = _index(
+        [
+            _analysis(1, "sample", datetime.now(), alleles="AC"),
+            _analysis(2, "another_sample", datetime.now(), alleles="AC"),
+        ]
+    )
+
+    # WHEN removing one of the analyses
+    index.remove_analyses(analysis_ids=[1])
+
+    # THEN only the other analysis remains
+    assert index.sample_ids.tolist() == ["another_sample"]
+    assert index.get_analysis_codes(sample_id="sample", analysis_type=Types.GENOTYPE) is None
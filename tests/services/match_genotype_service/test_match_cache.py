@@ -0,0 +1,103 @@
+"""Module to test the cache of sample match results."""
+
+from datetime import date, datetime
+
+from genotype_api.constants import Types
+from genotype_api.database.models import Analysis
+from genotype_api.models import MatchResult
+from genotype_api.services.match_genotype_service.match_cache import MatchCache, MatchCacheKey
+
+KEY = MatchCacheKey(
+    sample_id="sample",
+    analysis_type=Types.GENOTYPE,
+    comparison_set=Types.SEQUENCE,
+    date_min=date(2024, 1, 1),
+    date_max=date(2024, 1, 31),
+)
+
+
+def _cache() -> MatchCache:
+    cache = MatchCache(max_size=2, ttl=60)
+    cache.set(key=KEY, matches=[MatchResult(sample_id="matched")])
+    return cache
+
+
+def test_get_counts_hits_and_misses():
+    # GIVEN a cache with one entry
+    cache: MatchCache = _cache()
+
+    # WHEN reading the cached key and another key
+    cache.get(KEY)
+    cache.get(KEY._replace(sample_id="other"))
+
+    # THEN one hit and one miss are counted
+    assert (cache.get_stats().hits, cache.get_stats().misses) == (1, 1)
+
+
+def test_set_evicts_least_recently_used():
+    # GIVEN a full cache whose first entry was read last
+    cache: MatchCache = _cache()
+    cache.set(key=KEY._replace(sample_id="second"), matches=[])
+    cache.get(KEY)
+
+    # WHEN caching another entry
+    cache.set(key=KEY._replace(sample_id="third"), matches=[])
+
+    # THEN the least recently used entry is evicted
+    assert cache.get(KEY._replace(sample_id="second")) is None
+    assert cache.get(KEY) is not None
+
+
+def test_get_drops_expired_entries():
+    # GIVEN an entry that has expired
+    cache = MatchCache(max_size=2, ttl=-1)
+    cache.set(key=KEY, matches=[])
+
+    # WHEN reading it
+    # THEN it is a miss
+    assert cache.get(KEY) is None
+    assert len(cache) == 0
+
+
+def test_invalidate_analyses_in_window_only():
+    # GIVEN a cached entry
+    cache: MatchCache = _cache()
+
+    # WHEN writing analyses outside its comparison set and date window
+    cache.invalidate_analyses(
+        [
+            Analysis(sample_id="new", type=Types.GENOTYPE, created_at=datetime(2024, 1, 10)),
+            Analysis(sample_id="new", type=Types.SEQUENCE, created_at=datetime(2024, 3, 1)),
+        ]
+    )
+
+    # THEN the entry is kept
+    assert len(cache) == 1
+
+    # WHEN writing a sequence analysis within the window
+    cache.invalidate_analyses(
+        [Analysis(sample_id="new", type=Types.SEQUENCE, created_at=datetime(2024, 1, 10))]
+    )
+
+    # THEN the entry is dropped
+    assert len(cache) == 0
+
+
+def test_invalidate_analyses_of_matched_or_queried_sample():
+    # GIVEN cached entries
+    cache: MatchCache = _cache()
+
+    # WHEN deleting the analysis of a matched sample created outside the window
+    cache.invalidate_analyses(
+        [Analysis(sample_id="matched", type=Types.SEQUENCE, created_at=datetime(2023, 1, 1))]
+    )
+
+    # THEN the entry is dropped
+    assert len(cache) == 0
+
+    # WHEN writing a new analysis of the queried sample
+    cache = _cache()
+    cache.invalidate_analyses([Analysis(sample_id="sample", type=Types.GENOTYPE)])
+
+    # THEN the entry is dropped
+    assert len(cache) == 0
@@ -0,0 +1,418 @@
+"""Module to test the vectorised genotype matching."""
+
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from genotype_api.database.models import Analysis, Genotype, Match, Sample
+from genotype_api.dto.genotype import GenotypeResponse
+from genotype_api.dto.sample import AnalysisOnSample
+from genotype_api.models import MatchResult, RelatednessResult, SampleSwap
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    count_calls,
+    encode_alleles,
+    encode_genotypes,
+)
+from genotype_api.services.match_genotype_service.match_genotype import MatchGenotypeService
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+from genotype_api.services.match_genotype_service.utils import check_snps, compare_genotypes
+
+ALLELES: list[str] = ["A", "C", "0"]
+
+
+def _random_analysis(sample_id: str, nr_snps: int, randomizer: random.Random) -> Analysis:
+    genotypes: list[Genotype] = [
+        Genotype(
+            rsnumber=f"rs{snp}",
+            allele_1=randomizer.choice(ALLELES),
+            allele_2=randomizer.choice(ALLELES[:2]),
+        )
+        for snp in range(nr_snps)
+    ]
+    return Analysis(sample_id=sample_id, type="genotype", genotypes=genotypes)
+
+
+def _expected_matches(analyses: list[Analysis], sample_analysis: Analysis) -> list[MatchResult]:
+    expected: list[MatchResult] = []
+    for analysis in analyses:
+        results = dict(
+            compare_genotypes(genotype_1, genotype_2)
+            for genotype_1, genotype_2 in zip(analysis.genotypes, sample_analysis.genotypes)
+        )
+        count = Counter(results.values())
+        if count.get("match", 0) + count.get("unknown", 0) > 40:
+            expected.append(MatchResult(sample_id=analysis.sample_id, match_results=count))
+    return expected
+
+
+def test_get_matches_equals_pairwise_comparison():
+    # GIVEN a sample analysis and candidate analyses with varying panel sizes
+    randomizer = random.Random(1)
+    sample_analysis: Analysis = _random_analysis("query", nr_snps=60, randomizer=randomizer)
+    analyses: list[Analysis] = [
+        _random_analysis(f"sample_{index}", nr_snps=55 + index % 10, randomizer=randomizer)
+        for index in range(50)
+    ]
+    analyses.append(sample_analysis)
+
+    # WHEN matching the sample analysis against the candidates
+    matches: list[MatchResult] = MatchGenotypeService.get_matches(
+        analyses=analyses, sample_analysis=sample_analysis
+    )
+
+    # THEN the result is the same as comparing the genotypes pair by pair
+    assert matches == _expected_matches(analyses=analyses, sample_analysis=sample_analysis)
+    assert matches[-1].sample_id == "query"
+
+
+def test_get_matches_without_candidates():
+    # GIVEN a sample analysis and no candidate analyses
+    sample_analysis: Analysis = _random_analysis("query", nr_snps=60, randomizer=random.Random(1))
+
+    # WHEN matching the sample analysis
+    matches: list[MatchResult] = MatchGenotypeService.get_matches(
+        analyses=[], sample_analysis=sample_analysis
+    )
+
+    # THEN no matches are returned
+    assert matches == []
+
+
+def test_get_sample_swaps():
+    # GIVEN plate analyses of two samples and candidate analyses where the samples are swapped
+    randomizer = random.Random(2)
+    first: np.ndarray = encode_genotypes(_random_analysis("first", 60, randomizer).genotypes)
+    second: np.ndarray = encode_genotypes(_random_analysis("second", 60, randomizer).genotypes)
+    candidate_codes: np.ndarray = np.array(
+        [second, first, np.concatenate([first[:30], second[30:]])]
+    )
+
+    # WHEN screening the plate analyses for swaps
+    swaps: list[SampleSwap] = MatchGenotypeService.get_sample_swaps(
+        sample_ids=np.array(["first", "second"], dtype=object),
+        codes=[first, second],
+        candidate_sample_ids=np.array(["first", "second", "third"], dtype=object),
+        candidate_codes=candidate_codes,
+    )
+
+    # THEN both samples are reported as matching the other sample
+    assert sorted((swap.sample_id, swap.matched_sample_id) for swap in swaps) == [
+        ("first", "second"),
+        ("second", "first"),
+    ]
+    assert all(swap.match_results.mismatch == 0 for swap in swaps)
+
+
+def test_get_code_matches_top_k():
+    # GIVEN a sample analysis and qualifying candidates with an increasing number of mismatches
+    query: np.ndarray = np.full(60, encode_alleles("A", "C"), dtype=np.uint8)
+    candidate_codes: np.ndarray = np.array(
+        [
+            np.where(np.arange(60) < nr_mismatches, encode_alleles("A", "A"), query)
+            for nr_mismatches in range(10)
+        ]
+    )
+    sample_ids = np.array([f"sample_{index}" for index in range(10)], dtype=object)
+
+    # WHEN matching in reverse order with top_k
+    matches: list[MatchResult] = MatchGenotypeService.get_code_matches(
+        query=query,
+        candidate_codes=candidate_codes[::-1],
+        sample_ids=sample_ids[::-1],
+        top_k=3,
+    )
+
+    # THEN the three candidates closest to the sample are returned, best first
+    assert [match.sample_id for match in matches] == ["sample_0", "sample_1", "sample_2"]
+
+
+def test_get_batch_matches_equals_single_matches():
+    # GIVEN several samples and a set of candidates
+    randomizer = random.Random(4)
+    codes: list[np.ndarray] = [
+        encode_genotypes(_random_analysis(f"sample_{index}", 60, randomizer).genotypes)
+        for index in range(20)
+    ]
+    candidate_codes: np.ndarray = np.array(codes)
+    sample_ids = np.array([f"sample_{index}" for index in range(20)], dtype=object)
+
+    # WHEN matching the first samples in one batch
+    batch_matches: list[list[MatchResult]] = MatchGenotypeService.get_batch_matches(
+        queries=codes[:5], candidate_codes=candidate_codes, sample_ids=sample_ids, top_k=4
+    )
+
+    # THEN the results equal matching each sample on its own
+    assert batch_matches == [
+        MatchGenotypeService.get_code_matches(
+            query=query, candidate_codes=candidate_codes, sample_ids=sample_ids, top_k=4
+        )
+        for query in codes[:5]
+    ]
+
+
+def test_check_snps_aligns_genotypes_by_rsnumber():
+    # GIVEN two analyses of a sample with the same genotypes in a different row order
+    genotypes: list[GenotypeResponse] = [
+        GenotypeResponse(rsnumber=f"rs{snp}", analysis_id=1, allele_1="A", allele_2="C")
+        for snp in range(50)
+    ]
+    genotypes[7] = GenotypeResponse(rsnumber="rs7", analysis_id=1, allele_1="G", allele_2="G")
+    sequence_genotypes: list[GenotypeResponse] = [
+        GenotypeResponse(rsnumber=f"rs{snp}", analysis_id=2, allele_1="C", allele_2="A")
+        for snp in reversed(range(50))
+    ]
+
+    # WHEN checking the SNPs of the sample
+    status: dict = check_snps(
+        genotype_analysis=AnalysisOnSample(genotypes=genotypes),
+        sequence_analysis=AnalysisOnSample(genotypes=sequence_genotypes),
+    )
+
+    # THEN only the differing SNP is a mismatch
+    assert (status["matches"], status["mismatches"]) == (49, 1)
+    assert status["failed_snps"] == ["rs7"]
+
+
+def test_check_samples_equals_single_checks():
+    # GIVEN samples with a genotype and a sequence analysis and a sample with only one analysis
+    randomizer = random.Random(5)
+    samples: list[Sample] = []
+    for index in range(5):
+        genotype_analysis: Analysis = _random_analysis(f"sample_{index}", 60, randomizer)
+        sequence_analysis: Analysis = _random_analysis(f"sample_{index}", 60, randomizer)
+        genotype_analysis.sex, sequence_analysis.sex = "male", "male"
+        sequence_analysis.type = "sequence"
+        samples.append(
+            Sample(
+                id=f"sample_{index}", sex="male", analyses=[genotype_analysis, sequence_analysis]
+            )
+        )
+    samples.append(
+        Sample(id="incomplete", analyses=[_random_analysis("incomplete", 60, randomizer)])
+    )
+    panel = SNPPanel(rsnumbers=[f"rs{snp}" for snp in range(60)])
+
+    # WHEN checking all samples at once
+    results = MatchGenotypeService.check_samples(samples=samples, panel=panel)
+
+    # THEN each result equals the check of the sample on its own
+    assert results[:-1] == [
+        MatchGenotypeService.check_sample(sample=sample, panel=panel) for sample in samples[:-1]
+    ]
+    assert results[-1] is None
+
+
+def test_check_samples_uses_the_cutoffs():
+    # GIVEN a sample whose analyses have identical genotypes
+    genotype_analysis: Analysis = _random_analysis("sample", 60, random.Random(6))
+    sequence_analysis = Analysis(
+        sample_id="sample",
+        type="sequence",
+        sex="male",
+        genotypes=[
+            Genotype(
+                rsnumber=genotype.rsnumber, allele_1=genotype.allele_1, allele_2=genotype.allele_2
+            )
+            for genotype in genotype_analysis.genotypes
+        ],
+    )
+    genotype_analysis.sex = "male"
+    sample = Sample(id="sample", sex="male", analyses=[genotype_analysis, sequence_analysis])
+    panel = SNPPanel(rsnumbers=[f"rs{snp}" for snp in range(60)])
+
+    # WHEN checking it against cutoffs requiring more matches than there are SNPs
+    results = MatchGenotypeService.check_samples(
+        samples=[sample], panel=panel, cutoffs=dict(max_nocalls=60, max_mismatch=0, min_matches=61)
+    )
+
+    # THEN the SNP check fails although all called SNPs match
+    assert results[0].mismatches == 0
+    assert results[0].snps == "fail"
+    assert results[0].nocalls == "pass"
+
+
+def test_get_top_match_pairs():
+    # GIVEN two analyses and candidates closer to the first or to the second analysis
+    query: np.ndarray = np.full(60, encode_alleles("A", "C"), dtype=np.uint8)
+    candidate_codes: np.ndarray = np.array(
+        [
+            np.where(np.arange(60) < nr_mismatches, encode_alleles("A", "A"), query)
+            for nr_mismatches in (0, 1, 3, 4)
+        ]
+    )
+
+    # WHEN storing the best pair of each analysis and of each candidate
+    matches: list[Match] = MatchGenotypeService.get_top_match_pairs(
+        analysis_ids=np.array([1, 2]),
+        codes=[query, candidate_codes[-1]],
+        candidate_analysis_ids=np.arange(10, 14),
+        candidate_codes=candidate_codes,
+        top_k=1,
+    )
+
+    # THEN each candidate is paired with its closest analysis, in both directions
+    pairs: set[tuple[int, int]] = {
+        (match.analysis_id, match.matched_analysis_id) for match in matches
+    }
+    assert {pair for pair in pairs if pair[0] < 10} == {(1, 10), (1, 11), (2, 12), (2, 13)}
+    assert {(matched, analysis) for analysis, matched in pairs} == pairs
+    # AND the counts of each pair are stored
+    assert {match.mismatch for match in matches if match.matched_analysis_id == 12} == {1}
+
+
+def test_get_approximate_code_matches_finds_best_matches():
+    # GIVEN many random candidates and two near copies of the sample among them
+    randomizer = random.Random(7)
+    candidate_codes: np.ndarray = np.array(
+        [
+            encode_genotypes(_random_analysis(f"sample_{index}", 60, randomizer).genotypes)
+            for index in range(500)
+        ]
+    )
+    query: np.ndarray = candidate_codes[0].copy()
+    candidate_codes[1] = np.where(np.arange(60) < 2, encode_alleles("G", "T"), query)
+    sample_ids = np.array([f"sample_{index}" for index in range(500)], dtype=object)
+
+    # WHEN matching approximately with a short list
+    matches: list[MatchResult] = MatchGenotypeService.get_approximate_code_matches(
+        query=query,
+        candidate_codes=candidate_codes,
+        sample_ids=sample_ids,
+        top_k=2,
+        sketch_size=24,
+        shortlist_size=50,
+    )
+
+    # THEN the best matches equal those of the exact match
+    assert matches == MatchGenotypeService.get_code_matches(
+        query=query, candidate_codes=candidate_codes, sample_ids=sample_ids, top_k=2
+    )
+    assert [match.sample_id for match in matches] == ["sample_0", "sample_1"]
+
+
+def test_merge_match_results_equals_single_scan():
+    # GIVEN a sample and a set of candidates scanned in chunks
+    randomizer = random.Random(9)
+    codes: list[np.ndarray] = [
+        encode_genotypes(_random_analysis(f"sample_{index}", 60, randomizer).genotypes)
+        for index in range(100)
+    ]
+    candidate_codes: np.ndarray = np.array(codes)
+    sample_ids = np.array([f"sample_{index}" for index in range(100)], dtype=object)
+
+    # WHEN merging the top matches of each chunk
+    matches: list[MatchResult] = []
+    for start in range(0, 100, 30):
+        matches = MatchGenotypeService.merge_match_results(
+            matches=matches,
+            chunk_matches=MatchGenotypeService.get_code_matches(
+                query=codes[0],
+                candidate_codes=candidate_codes[start : start + 30],
+                sample_ids=sample_ids[start : start + 30],
+                top_k=5,
+            ),
+            top_k=5,
+        )
+
+    # THEN the results equal scanning all candidates at once
+    assert matches == MatchGenotypeService.get_code_matches(
+        query=codes[0], candidate_codes=candidate_codes, sample_ids=sample_ids, top_k=5
+    )
+
+
+def _shared_alleles(genotype_1: Genotype, genotype_2: Genotype) -> int | None:
+    if not genotype_1.is_ok or not genotype_2.is_ok:
+        return None
+    alleles_2: list[str] = list(genotype_2.alleles)
+    shared: int = 0
+    for allele in genotype_1.alleles:
+        if allele in alleles_2:
+            alleles_2.remove(allele)
+            shared += 1
+    return shared
+
+
+def test_get_relatedness_equals_pairwise_identity_by_state():
+    # GIVEN a sample and candidates with random genotypes
+    randomizer = random.Random(11)
+    analyses: list[Analysis] = [
+        Analysis(
+            sample_id=f"sample_{index}",
+            genotypes=[
+                Genotype(
+                    rsnumber=f"rs{snp}",
+                    allele_1=randomizer.choice("ACG0"),
+                    allele_2=randomizer.choice("ACG"),
+                )
+                for snp in range(60)
+            ],
+        )
+        for index in range(20)
+    ]
+    codes: list[np.ndarray] = [encode_genotypes(analysis.genotypes) for analysis in analyses]
+
+    # WHEN scoring the relatedness of the first sample with all samples
+    results: list[RelatednessResult] = MatchGenotypeService.get_relatedness(
+        query=codes[0],
+        candidate_codes=np.array(codes),
+        sample_ids=[analysis.sample_id for analysis in analyses],
+    )
+
+    # THEN the IBS fractions equal counting the shared alleles SNP by SNP
+    assert results[0].sample_id == "sample_0" and results[0].ibs2 == 1
+    for result in results:
+        analysis: Analysis = analyses[int(result.sample_id.split("_")[1])]
+        shared: Counter = Counter(
+            _shared_alleles(genotype_1, genotype_2)
+            for genotype_1, genotype_2 in zip(analyses[0].genotypes, analysis.genotypes)
+        )
+        shared.pop(None, None)
+        assert result.compared == sum(shared.values())
+        assert [result.ibs0, result.ibs1, result.ibs2] == pytest.approx(
+            [shared[nr_shared] / result.compared for nr_shared in range(3)]
+        )
+    # AND the results are ranked by the fraction of shared alleles
+    assert [result.shared_alleles for result in results] == sorted(
+        (result.shared_alleles for result in results), reverse=True
+    )
+
+
+def test_get_kinship_equals_relatedness():
+    # GIVEN the genotype codes of several samples
+    randomizer = random.Random(12)
+    codes: list[np.ndarray] = [
+        encode_genotypes(_random_analysis(f"sample_{index}", 60, randomizer).genotypes)
+        for index in range(10)
+    ]
+
+    # WHEN computing the kinship matrices
+    shared_alleles, ibs0 = MatchGenotypeService.get_kinship(codes)
+
+    # THEN they equal scoring each sample on its own
+    for row, query in enumerate(codes):
+        results: list[RelatednessResult] = MatchGenotypeService.get_relatedness(
+            query=query,
+            candidate_codes=np.array(codes),
+            sample_ids=[str(column) for column in range(10)],
+        )
+        for result in results:
+            column = int(result.sample_id)
+            assert shared_alleles[row, column] == pytest.approx(result.shared_alleles)
+            assert ibs0[row, column] == pytest.approx(result.ibs0)
+    # AND they are symmetric and every sample shares all alleles with itself
+    assert np.allclose(shared_alleles, shared_alleles.T)
+    assert np.allclose(ibs0, ibs0.T)
+    assert np.allclose(np.diag(shared_alleles), 1)
+
+
+def test_count_calls_equals_check_no_calls():
+    # GIVEN an analysis with known and unknown calls
+    analysis: Analysis = _random_analysis("sample", 60, random.Random(7))
+
+    # WHEN counting the calls of its genotype codes
+    known, unknown = count_calls(encode_genotypes(analysis.genotypes))
+
+    # THEN the counts equal those of the genotype rows
+    assert dict(known=known, unknown=unknown) == analysis.check_no_calls()
@@ -0,0 +1,23 @@
+"""Module to test the metrics of the approximate match mode."""
+
+from genotype_api.models import ApproximateMatchStats, MatchResult
+from genotype_api.services.match_genotype_service.match_metrics import ApproximateMatchMetrics
+
+
+def test_approximate_match_metrics():
+    # GIVEN metrics that validate every second approximate match
+    metrics = ApproximateMatchMetrics(validation_interval=2)
+
+    # WHEN recording two approximate matches, the second missing one of two exact matches
+    validate: list[bool] = [metrics.add_query(0.001), metrics.add_query(0.003)]
+    metrics.add_validation(
+        matches=[MatchResult(sample_id="first")],
+        exact_matches=[MatchResult(sample_id="first"), MatchResult(sample_id="second")],
+        exact_seconds=0.01,
+    )
+
+    # THEN only the second match is validated and the recall and latencies are reported
+    assert validate == [False, True]
+    assert metrics.get_stats() == ApproximateMatchStats(
+        queries=2, validated=1, mean_recall=0.5, mean_approximate_ms=2.0, mean_exact_ms=10.0
+    )
@@ -0,0 +1,98 @@
+"""Module to test the packed genotypes of the SNP panel."""
+
+import numpy as np
+
+from genotype_api.database.models import Analysis, Genotype
+from genotype_api.dto.genotype import GenotypeResponse
+from genotype_api.services.match_genotype_service.genotype_codes import (
+    MISSING_CALL,
+    UNKNOWN_CALL,
+    encode_genotypes,
+    get_packed_genotype_codes,
+)
+from genotype_api.services.match_genotype_service.snp_panel import SNPPanel
+
+
+def _genotypes() -> list[Genotype]:
+    return [
+        Genotype(rsnumber="rs3", analysis_id=1, allele_1="T", allele_2="C"),
+        Genotype(rsnumber="rs1", analysis_id=1, allele_1="0", allele_2="A"),
+        Genotype(rsnumber="rs9", analysis_id=1, allele_1="G", allele_2="G"),
+    ]
+
+
+def test_unpack_genotypes_rebuilds_genotypes():
+    # GIVEN a panel and genotypes packed in its layout, one SNP of the panel not genotyped
+    panel = SNPPanel(rsnumbers=["rs3", "rs2", "rs1"])
+    genotype_blob: bytes = panel.pack_genotypes(_genotypes())
+
+    # WHEN unpacking the genotypes
+    genotypes: list[GenotypeResponse] = panel.unpack_genotypes(
+        genotype_blob=genotype_blob, analysis_id=1
+    )
+
+    # THEN the genotypes of the panel SNPs are rebuilt in panel order with their allele order
+    assert [
+        (genotype.rsnumber, genotype.allele_1, genotype.allele_2) for genotype in genotypes
+    ] == [
+        ("rs1", "0", "A"),
+        ("rs3", "T", "C"),
+    ]
+
+
+def test_packed_genotype_codes_equal_encoded_genotypes():
+    # GIVEN genotypes packed in the layout of a panel
+    panel = SNPPanel(rsnumbers=["rs1", "rs2", "rs3"])
+    genotypes: list[Genotype] = _genotypes()[:2]
+
+    # WHEN reading the genotype codes from the packed genotypes
+    codes: np.ndarray = get_packed_genotype_codes(panel.pack_genotypes(genotypes))
+
+    # THEN they equal the encoded genotypes, with the SNP without genotype missing
+    rs1, rs3 = encode_genotypes(genotypes[::-1])
+    assert codes.tolist() == [rs1, MISSING_CALL, rs3]
+
+
+def test_pack_genotypes_without_panel():
+    # GIVEN an empty SNP panel
+    panel = SNPPanel(rsnumbers=[])
+
+    # WHEN packing genotypes
+    genotype_blob: bytes | None = panel.pack_genotypes(_genotypes())
+
+    # THEN nothing is packed and the genotype rows are used
+    assert genotype_blob is None
+    assert len(panel.get_genotypes(Analysis(id=1, genotypes=_genotypes()))) == 3
+
+
+def test_project_genotypes_is_independent_of_row_order():
+    # GIVEN a panel and the same genotypes in two row orders, with a SNP outside the panel
+    panel = SNPPanel(rsnumbers=["rs9", "rs3", "rs2", "rs1"])
+    genotypes: list[Genotype] = _genotypes() + [
+        Genotype(rsnumber="rs7", analysis_id=1, allele_1="A", allele_2="A")
+    ]
+
+    # WHEN projecting the genotypes on the panel
+    codes: np.ndarray = panel.project_genotypes(genotypes)
+
+    # THEN the codes are keyed by rsnumber, whatever the row order
+    assert codes.tolist() == panel.project_genotypes(genotypes[::-1]).tolist()
+    assert codes[panel.get_columns(["rs2"])[0]] == MISSING_CALL
+    assert panel.get_columns(["rs7", "rs0"]).tolist() == [-1, -1]
+
+
+def test_unknown_alleles_are_no_calls():
+    # GIVEN genotypes with alleles outside the allele alphabet
+    genotypes: list[Genotype] = [
+        Genotype(rsnumber="rs1", analysis_id=1, allele_1="a", allele_2="C"),
+        Genotype(rsnumber="rs2", analysis_id=1, allele_1=None, allele_2="G"),
+        Genotype(rsnumber="rs3", analysis_id=1, allele_1="T", allele_2="7"),
+    ]
+
+    # WHEN encoding and packing them
+    codes: np.ndarray = encode_genotypes(genotypes)
+    genotype_blob: bytes = SNPPanel(rsnumbers=["rs1", "rs2", "rs3"]).pack_genotypes(genotypes)
+
+    # THEN the unknown alleles are stored and compared as no-calls
+    assert codes.tolist() == [UNKNOWN_CALL] * 3
+    assert get_packed_genotype_codes(genotype_blob).tolist() == [UNKNOWN_CALL] * 3
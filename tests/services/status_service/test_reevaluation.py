@@ -0,0 +1,40 @@
+"""Module to test the background re-evaluation of sample statuses."""
+
+from genotype_api.models import StatusReevaluationProgress
+from genotype_api.services.status_service.reevaluation import StatusReevaluation
+
+
+async def test_run_counts_reevaluated_samples(monkeypatch):
+    # GIVEN a re-evaluation with two batches of outdated samples
+    reevaluation = StatusReevaluation(batch_size=3, pause=0)
+    batches: list[int] = [3, 2, 0]
+
+    async def _reevaluate_batch() -> int:
+        return batches.pop(0)
+
+    monkeypatch.setattr(reevaluation, "_reevaluate_batch", _reevaluate_batch)
+
+    # WHEN running the re-evaluation
+    progress: StatusReevaluationProgress = await reevaluation.run()
+
+    # THEN all samples are counted and the job is finished
+    assert progress.done == 5
+    assert not progress.running
+    assert progress.finished_at and progress.error is None
+
+
+async def test_run_reports_errors(monkeypatch):
+    # GIVEN a re-evaluation whose batch fails
+    reevaluation = StatusReevaluation(batch_size=3, pause=0)
+
+    async def _reevaluate_batch() -> int:
+        raise ValueError("no database")
+
+    monkeypatch.setattr(reevaluation, "_reevaluate_batch", _reevaluate_batch)
+
+    # WHEN running the re-evaluation
+    progress: StatusReevaluationProgress = await reevaluation.run()
+
+    # THEN the error is reported in the progress
+    assert progress.error == "no database"
+    assert not progress.running
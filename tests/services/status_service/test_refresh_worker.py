@@ -0,0 +1,70 @@
+"""Module to test the background refresh of dirty sample statuses."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from genotype_api.services.status_service import refresh_worker
+from genotype_api.services.status_service.refresh_worker import StatusRefreshWorker
+
+
+async def test_worker_refreshes_batches_when_notified(monkeypatch):
+    # GIVEN a worker that polls rarely, with a batch of dirty samples flagged after it started
+    worker = StatusRefreshWorker(batch_size=2, interval=60)
+    batches: list[int] = [0, 2, 1, 0]
+
+    async def _refresh_batch() -> int:
+        return batches.pop(0)
+
+    monkeypatch.setattr(worker, "refresh_batch", _refresh_batch)
+
+    # WHEN notifying the worker
+    worker.start()
+    await asyncio.sleep(0.01)
+    worker.notify()
+    await asyncio.sleep(0.01)
+    await worker.stop()
+
+    # THEN the dirty samples are refreshed until no batch is left
+    assert batches == []
+    assert not worker.is_running
+
+
+async def test_failed_batch_is_refreshed_sample_by_sample(monkeypatch):
+    # GIVEN a claimed batch of dirty samples where one sample fails to refresh
+    refreshed: list[str] = []
+
+    class DirtySamplesStore:
+        def __init__(self, session):
+            pass
+
+        async def claim_dirty_samples(self, limit: int) -> list[str]:
+            return ["sample_1", "bad_sample", "sample_2"]
+
+    class FailingSampleStatusService:
+        def __init__(self, store):
+            pass
+
+        async def refresh_samples_status(self, sample_ids: list[str]) -> None:
+            if "bad_sample" in sample_ids:
+                raise ValueError("bad_sample")
+            refreshed.extend(sample_ids)
+
+    class Session:
+        async def rollback(self) -> None:
+            pass
+
+    @asynccontextmanager
+    async def _get_session():
+        yield Session()
+
+    monkeypatch.setattr(refresh_worker, "Store", DirtySamplesStore)
+    monkeypatch.setattr(refresh_worker, "SampleStatusService", FailingSampleStatusService)
+    monkeypatch.setattr(refresh_worker, "get_session", _get_session)
+    worker = StatusRefreshWorker(batch_size=3, interval=60)
+
+    # WHEN refreshing the batch
+    count: int = await worker.refresh_batch()
+
+    # THEN the other samples are refreshed and the batch is done, so it does not block the queue
+    assert refreshed == ["sample_1", "sample_2"]
+    assert count == 3